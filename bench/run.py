@@ -0,0 +1,554 @@
+# Headless benchmarks for Lavida's hot paths.
+#
+#     python -m bench.run                      # all sizes, compare to baselines
+#     python -m bench.run --sizes 1k,10k       # subset
+#     python -m bench.run --update-baseline    # record current numbers
+#
+# Every (size, scenario) pair runs in a fresh interpreter against a copy of a
+# synthetic database, under QT_QPA_PLATFORM=offscreen, with title fetches
+# answered by a local stub server. Exits non-zero when a scenario is slower
+# than its baseline by more than the threshold.
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+THRESHOLD = 1.25
+REPEAT = 3
+NOISE_FLOOR_MS = 5.0
+DELETED_SHARE = 0.1
+BATCH = 200
+BULK_DROP = 500
+GESTURE_EVENTS = 100_000
+IPC_CLIENTS = 8
+PLAYLIST_LENGTH = 1000
+WAIT_TIMEOUT = 60.0
+WORDS = ("lofi beats jazz piano study rain chill ambient guitar live concert "
+         "tutorial python qt sqlite music mix talk review trailer").split()
+
+# -- synthetic data ---------------------------------------------------------
+
+def video_url(n):
+    return f"https://youtu.be/{n:011d}"
+
+def build_database(path, count):
+    from src.migrations import migrate
+    from src.ordering import ORDER_GAP
+
+    rng = random.Random(count)
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrate(conn)
+    rows = []
+    for n in range(1, count + 1):
+        rows.append((n, f"{n:032x}", video_url(n), f"Synthetic video {n} " + " ".join(rng.sample(WORDS, 3)),
+                     int(rng.random() < 0.3), n % 3, n * ORDER_GAP, int(rng.random() < DELETED_SHARE)))
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO videos (id, uid, url, title, watched, tab_index, row_order, is_deleted) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.close()
+
+def check_query_plans(path):
+    from src.database import HOT_QUERIES
+    from src.migrations import query_plan, scans_table
+
+    conn = sqlite3.connect(path)
+    failures = {name: query_plan(conn, sql, params) for name, (sql, params) in HOT_QUERIES.items()
+                if scans_table(query_plan(conn, sql, params))}
+    conn.close()
+    return failures
+
+# -- scenarios (run inside the worker process) ------------------------------
+
+def pump(app, done, timeout=WAIT_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("benchmark condition not reached")
+        app.processEvents()
+        time.sleep(0.001)
+
+def qt_objects(window):
+    from PyQt6.QtCore import QObject
+    return len(window.findChildren(QObject))
+
+def drop_event(urls=None, text=None):
+    from PyQt6.QtCore import QMimeData, QPointF, QUrl, Qt
+    from PyQt6.QtGui import QDropEvent
+
+    mime = QMimeData()
+    if urls:
+        mime.setUrls([QUrl(url) for url in urls])
+    if text:
+        mime.setText(text)
+    # The event does not own the mime data; keep it alive alongside.
+    event = QDropEvent(QPointF(10, 10), Qt.DropAction.CopyAction, mime,
+                       Qt.MouseButton.NoButton, Qt.KeyboardModifier.NoModifier)
+    return event, mime
+
+def thumbnail_jpeg():
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt6.QtGui import QColor, QImage
+
+    image = QImage(320, 180, QImage.Format.Format_RGB32)
+    image.fill(QColor(40, 90, 160))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "JPEG")
+    return bytes(data)
+
+class CommitWatch:
+    # Follows write_committed on the writer thread itself: waiting for a
+    # write then delivers no other GUI events, which would add painting to
+    # whatever a scenario times.
+    def __init__(self, db):
+        from PyQt6.QtCore import Qt
+
+        self.ticket = 0
+        self.cond = threading.Condition()
+        db.write_committed.connect(self.committed, Qt.ConnectionType.DirectConnection)
+
+    def committed(self, ticket):
+        with self.cond:
+            self.ticket = ticket
+            self.cond.notify_all()
+
+    def wait(self, ticket, timeout=WAIT_TIMEOUT):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.ticket >= ticket, timeout):
+                raise TimeoutError(f"write {ticket} not committed")
+
+def wait_committed(ctx, window):
+    # Until every write queued so far is on disk.
+    ctx["commits"].wait(window.db.ticket)
+
+def open_window(ctx, finish=True):
+    from src.ui.main_window import LavidaApp
+
+    window = LavidaApp(db_path=ctx["db_path"], fetcher_options=ctx["fetcher_options"],
+                       expander_options=ctx["expander_options"], enable_listener=False)
+    ctx["commits"] = CommitWatch(window.db)
+    if finish:
+        window.finish_startup()
+        # Start-up's own writes (the one-time title-cache seed) land before
+        # anything else is timed; `startup` times them too.
+        wait_committed(ctx, window)
+    return window
+
+def scenario_startup(ctx):
+    start = time.perf_counter()
+    window = open_window(ctx)
+    elapsed = time.perf_counter() - start
+    return window, elapsed
+
+def scenario_load_data(ctx):
+    window = open_window(ctx)
+    start = time.perf_counter()
+    window.load_data()
+    return window, time.perf_counter() - start
+
+def scenario_drop_single(ctx):
+    window = open_window(ctx)
+    event, mime = drop_event(urls=[video_url(10_000_000)])
+    start = time.perf_counter()
+    window.dropEvent(event)
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_drop_bulk(ctx):
+    window = open_window(ctx)
+    model = window.tab_list(window.tabs.currentIndex()).video_model
+    expected = model.rowCount() + BULK_DROP
+    event, mime = drop_event(text="\n".join(video_url(20_000_000 + n) for n in range(BULK_DROP)))
+    start = time.perf_counter()
+    window.dropEvent(event)
+    pump(ctx["app"], lambda: model.rowCount() >= expected)
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_reorder(ctx):
+    window = open_window(ctx)
+    lst = window.tab_list(0)
+    model = lst.video_model
+    rng = random.Random(7)
+    moves = [(rng.randrange(model.rowCount()), rng.randrange(model.rowCount() + 1)) for _ in range(BATCH)]
+    start = time.perf_counter()
+    for source, destination in moves:
+        lst.update_db_order(model.move_row(source, destination))
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_title_burst(ctx):
+    window = open_window(ctx)
+    model = window.tab_list(0).video_model
+    jobs = [(row.vid_id, row.url) for row in model.rows[:BATCH]]
+    done = []
+    window.get_fetcher().title_fetched.connect(lambda *args: done.append(args))
+    start = time.perf_counter()
+    window.get_fetcher().fetch_many(jobs)
+    pump(ctx["app"], lambda: len(done) >= len(jobs))
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_scroll(ctx):
+    # Page through the first tab with synchronous repaints; thumbnails are
+    # downloaded and decoded off-thread, so no frame should wait on them.
+    window = open_window(ctx)
+    lst = window.tab_list(0)
+    window.tabs.setCurrentIndex(0)
+    window.show()
+    bar = lst.verticalScrollBar()
+    steps = 0
+    start = time.perf_counter()
+    while steps < BATCH and bar.value() < bar.maximum():
+        bar.setValue(bar.value() + lst.viewport().height())
+        lst.viewport().repaint()
+        ctx["app"].processEvents()
+        steps += 1
+    return window, time.perf_counter() - start
+
+def scenario_paint_cards(ctx):
+    # Per-card cost: paint BATCH * 5 cards through the delegate into an image.
+    from PyQt6.QtCore import QRect
+    from PyQt6.QtGui import QImage, QPainter
+    from PyQt6.QtWidgets import QStyleOptionViewItem
+    from src.thumbnails import FETCH_STACK
+
+    window = open_window(ctx)
+    lst = window.tab_list(0)
+    model = lst.video_model
+    image = QImage(320, 40, QImage.Format.Format_ARGB32_Premultiplied)
+    painter = QPainter(image)
+    option = QStyleOptionViewItem()
+    option.rect = QRect(0, 0, 320, 40)
+    count = min(BATCH * 5, model.rowCount())
+    # The first pass sends for thumbnails, a stack's worth at a time as
+    # scrolling would; time the steady state after.
+    for first in range(0, count, FETCH_STACK):
+        for row in range(first, min(first + FETCH_STACK, count)):
+            lst.delegate.paint(painter, option, model.index(row))
+        pump(ctx["app"], lambda: not window.thumbnails.pending)
+    start = time.perf_counter()
+    for row in range(count):
+        lst.delegate.paint(painter, option, model.index(row))
+    elapsed = time.perf_counter() - start
+    painter.end()
+    return window, elapsed
+
+def scenario_toggle_watched(ctx):
+    window = open_window(ctx)
+    window.tabs.setCurrentIndex(0)
+    window.show()
+    lst = window.tab_list(0)
+    ids = [row.vid_id for row in lst.video_model.rows[:BATCH]]
+    start = time.perf_counter()
+    for vid_id in ids:
+        window.mark_as_watched(vid_id)
+        window.mark_as_unwatched(vid_id)
+    lst.viewport().repaint()
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_search_filter(ctx):
+    # Keystroke to repainted list for a query typed a letter at a time and
+    # then cleared. The debounce delay is skipped; everything after it (the
+    # FTS query, filtering the list and the repaint) is timed.
+    window = open_window(ctx)
+    window.tabs.setCurrentIndex(0)
+    window.show()
+    lst = window.tab_list(0)
+    # Connected after the window, so this runs once the filter is applied.
+    answered = []
+    window.search_service.results_ready.connect(lambda generation, ids: answered.append(generation))
+    start = time.perf_counter()
+    for text in ("l", "lo", "lof", "lofi", "lofi b", "lofi be", "lofi", ""):
+        window.search_box.setText(text)
+        window.search_timer.stop()
+        window.run_search()
+        pump(ctx["app"], lambda: answered and answered[-1] == window.search_generation)
+        lst.viewport().repaint()
+    return window, time.perf_counter() - start
+
+def mouse_event(kind, window, local, button=None):
+    from PyQt6.QtCore import QPointF, Qt
+    from PyQt6.QtGui import QMouseEvent
+
+    button = button or Qt.MouseButton.LeftButton
+    buttons = Qt.MouseButton.NoButton if kind == "release" else Qt.MouseButton.LeftButton
+    event_type = {"press": QMouseEvent.Type.MouseButtonPress, "move": QMouseEvent.Type.MouseMove,
+                  "release": QMouseEvent.Type.MouseButtonRelease}[kind]
+    position = QPointF(local)
+    return QMouseEvent(event_type, position, position, QPointF(window.mapToGlobal(local)),
+                       Qt.MouseButton.NoButton if kind == "move" else button, buttons,
+                       Qt.KeyboardModifier.NoModifier)
+
+def scenario_resize_window(ctx):
+    # Drag the bottom-right corner with a 1000 Hz mouse. Wall time is fixed
+    # by the pacing, so this reports the CPU time the drag cost instead.
+    from PyQt6.QtCore import QPoint
+
+    window = open_window(ctx)
+    window.show()
+    ctx["app"].processEvents()
+    corner = QPoint(window.width() - 3, window.height() - 3)
+    window.mousePressEvent(mouse_event("press", window, corner))
+    start = time.process_time()
+    for step in range(BATCH * 2):
+        offset = step % 100
+        point = corner + QPoint(offset, offset)
+        window.mouseMoveEvent(mouse_event("move", window, point))
+        ctx["app"].processEvents()
+        time.sleep(0.001)
+    window.mouseReleaseEvent(mouse_event("release", window, corner))
+    ctx["app"].processEvents()
+    return window, time.process_time() - start
+
+def scenario_delete_to_history(ctx):
+    window = open_window(ctx)
+    ids = [row.vid_id for row in window.tab_list(0).video_model.rows[:BATCH]]
+    start = time.perf_counter()
+    for vid_id in ids:
+        window.delete_video(vid_id)
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_batch_to_history(ctx):
+    # The same number of rows as delete_to_history, scattered through the
+    # tab and sent to HISTORY as one selection.
+    window = open_window(ctx)
+    window.list_for(window.history_tab)
+    ids = [row.vid_id for row in window.tab_list(0).video_model.rows[:BATCH * 2:2]]
+    start = time.perf_counter()
+    window.batch_delete(ids)
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_expand_playlist(ctx):
+    # A playlist link dropped on the current tab, until its last page of
+    # videos is stored and shown.
+    window = open_window(ctx)
+    model = window.tab_list(window.tabs.currentIndex()).video_model
+    expected = model.rowCount() + PLAYLIST_LENGTH
+    event, mime = drop_event(urls=[f"https://www.youtube.com/playlist?list=PLstub{PLAYLIST_LENGTH}"])
+    start = time.perf_counter()
+    window.dropEvent(event)
+    pump(ctx["app"], lambda: model.rowCount() >= expected and not window.expansions)
+    wait_committed(ctx, window)
+    return window, time.perf_counter() - start
+
+def scenario_gesture_hook(ctx):
+    # Scroll ticks from other applications, as the global hook sees them:
+    # mostly vertical, with the odd horizontal swipe.
+    from src.workers import GlobalInputListener, SyntheticInputDriver
+
+    window = open_window(ctx)
+    listener = GlobalInputListener("scroll:x+;scroll:y-:ctrl")
+    driver = SyntheticInputDriver(listener)
+    rng = random.Random(0)
+    events = [(rng.choice((-1, 1)), 0) if rng.random() < 0.05 else (0, rng.choice((-1, 1)))
+              for _ in range(GESTURE_EVENTS)]
+    return window, driver.measure(events) * len(events)
+
+def scenario_ipc_add(ctx):
+    # Several command-line clients adding links at once; each request is a
+    # fresh connection, as with `main.py add`.
+    from src.ipc import request
+
+    window = open_window(ctx)
+    address = window.command_server.address
+    replies = []
+
+    def client(start):
+        for n in range(start, start + BATCH // IPC_CLIENTS):
+            replies.append(request(address, {"cmd": "add", "urls": [video_url(20_000_000 + n)]}))
+
+    threads = [threading.Thread(target=client, args=(i * BATCH,)) for i in range(IPC_CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    pump(ctx["app"], lambda: len(replies) == BATCH)
+    wait_committed(ctx, window)
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+    return window, elapsed
+
+def scenario_sync_delta(ctx):
+    # A day of use on one machine, then export the delta and import it into
+    # a second copy of the library.
+    from src import journal
+
+    peer = ctx["db_path"] + ".peer"
+    shutil.copy(ctx["db_path"], peer)
+    window = open_window(ctx)
+    peer_conn = sqlite3.connect(peer, isolation_level=None)
+    journal.migrate(peer_conn)
+    peer_conn.execute("UPDATE settings SET value = 'peer' WHERE key = 'machine_id'")
+    since = journal.last_seq(window.db.conn)
+
+    window.ingest_urls([video_url(30_000_000 + n) for n in range(BULK_DROP)], 0)
+    rows = window.tab_list(1).video_model.rows
+    for row in rows[:BATCH]:
+        window.mark_as_watched(row.vid_id)
+    for row in rows[BATCH:BATCH * 2]:
+        window.delete_video(row.vid_id)
+    # The day includes the new links' titles arriving.
+    pump(ctx["app"], lambda: window.db.query_one("SELECT 1 FROM pending_fetches LIMIT 1") is None)
+    wait_committed(ctx, window)
+
+    path = ctx["db_path"] + ".changes"
+    start = time.perf_counter()
+    journal.export_changes(window.db.conn, path, since)
+    journal.import_changes(peer_conn, path)
+    elapsed = time.perf_counter() - start
+    peer_conn.close()
+    return window, elapsed
+
+SCENARIOS = {
+    "startup": scenario_startup,
+    "load_data": scenario_load_data,
+    "drop_single": scenario_drop_single,
+    "drop_bulk": scenario_drop_bulk,
+    "reorder": scenario_reorder,
+    "title_burst": scenario_title_burst,
+    "scroll": scenario_scroll,
+    "paint_cards": scenario_paint_cards,
+    "toggle_watched": scenario_toggle_watched,
+    "search_filter": scenario_search_filter,
+    "resize_window": scenario_resize_window,
+    "delete_to_history": scenario_delete_to_history,
+    "batch_to_history": scenario_batch_to_history,
+    "expand_playlist": scenario_expand_playlist,
+    "gesture_hook": scenario_gesture_hook,
+    "ipc_add": scenario_ipc_add,
+    "sync_delta": scenario_sync_delta,
+}
+
+def run_worker(db_path, scenario):
+    from PyQt6.QtWidgets import QApplication
+    from bench.stub_server import StubServer
+
+    app = QApplication([])
+    with StubServer(thumbnail_jpeg()) as stub:
+        ctx = {
+            "app": app,
+            "db_path": db_path,
+            "fetcher_options": {
+                "oembed_endpoint": stub.base_url + "/oembed",
+                "thumbnail_url": stub.base_url + "/vi/{video_id}/mqdefault.jpg",
+                "host_interval": 0,
+                "retries": 0,
+            },
+            "expander_options": {
+                "base_url": stub.base_url,
+                "browse_endpoint": stub.base_url + "/youtubei/v1/browse",
+            },
+        }
+        window, elapsed = SCENARIOS[scenario](ctx)
+        result = {
+            "wall_ms": elapsed * 1000,
+            "qt_objects": qt_objects(window),
+            # ru_maxrss is KiB on Linux, bytes on macOS.
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        }
+        window.close_application()
+    print(json.dumps(result))
+
+# -- driver -----------------------------------------------------------------
+
+def run_case(template, workdir, scenario, repeat=REPEAT):
+    # Best of `repeat` fresh runs: the minimum is the least disturbed by
+    # whatever else the machine is doing.
+    results = []
+    for _ in range(repeat):
+        db_path = os.path.join(workdir, f"{scenario}.db")
+        shutil.copyfile(template, db_path)
+        proc = subprocess.run([sys.executable, "-m", "bench.run", "--worker", db_path, scenario],
+                              cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{scenario} failed with exit code {proc.returncode}:\n{proc.stderr}")
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        shutil.rmtree(os.path.join(workdir, "thumbnails"), ignore_errors=True)
+    return min(results, key=lambda result: result["wall_ms"])
+
+def compare(results, baselines, threshold):
+    regressions = []
+    for key, result in results.items():
+        base = baselines.get(key)
+        if not base:
+            continue
+        limit = max(base["wall_ms"] * threshold, base["wall_ms"] + NOISE_FLOOR_MS)
+        if result["wall_ms"] > limit:
+            regressions.append(f"{key}: {result['wall_ms']:.1f} ms vs baseline {base['wall_ms']:.1f} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lavida headless benchmarks")
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--worker", nargs=2, metavar=("DB", "SCENARIO"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(*args.worker)
+        return 0
+
+    results, plan_failures = {}, {}
+    with tempfile.TemporaryDirectory(prefix="lavida-bench-") as workdir:
+        for size in args.sizes.split(","):
+            template = os.path.join(workdir, f"template-{size}.db")
+            build_database(template, SIZES[size])
+            for name, plan in check_query_plans(template).items():
+                plan_failures[f"{size}/{name}"] = plan
+            for scenario in args.scenarios.split(","):
+                result = run_case(template, workdir, scenario, args.repeat)
+                results[f"{size}/{scenario}"] = result
+                print(f"{size + '/' + scenario:<24}{result['wall_ms']:>10.1f} ms"
+                      f"{result['peak_rss_mb']:>9.1f} MB{result['qt_objects']:>7} objs", flush=True)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baselines written to {args.baseline}")
+        return 0
+
+    failures = compare(results, baselines, args.threshold)
+    failures += [f"{key}: table scan in {plan}" for key, plan in plan_failures.items()]
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if not baselines:
+        print("No baselines recorded yet; run with --update-baseline.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
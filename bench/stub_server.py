@@ -0,0 +1,115 @@
+import json
+import re
+import threading
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Lists are shaped like YouTube's: a playlist page carries its first 100
+# videos in ytInitialData and a channel's videos tab its first 30, each
+# ending in a continuation token; POSTs to /youtubei/v1/browse return the
+# following pages. A list's length is the number at the end of its id or
+# handle (/playlist?list=PLstub1000, /@stub250/videos), 100 without one.
+PLAYLIST_PAGE = 100
+CHANNEL_PAGE = 30
+DEFAULT_LIST_LENGTH = 100
+STUB_CLIENT = {"INNERTUBE_API_KEY": "stub-key", "INNERTUBE_CLIENT_VERSION": "2.20240101.00.00"}
+
+def list_length(name):
+    match = re.search(r"(\d+)$", name)
+    return int(match.group(1)) if match else DEFAULT_LIST_LENGTH
+
+def list_items(kind, name, offset):
+    # One page of renderers, with a continuation item unless it is the last.
+    size = PLAYLIST_PAGE if kind == "playlist" else CHANNEL_PAGE
+    length = list_length(name)
+    prefix = zlib.crc32(name.encode()) % 10000
+    items = []
+    for n in range(offset, min(offset + size, length)):
+        video = {"videoId": f"{prefix:04d}{n:07d}", "title": {"runs": [{"text": f"Stub {kind} video {n}"}]}}
+        if kind == "playlist":
+            items.append({"playlistVideoRenderer": video})
+        else:
+            items.append({"richItemRenderer": {"content": {"videoRenderer": video}}})
+    if offset + size < length:
+        token = f"{kind}:{name}:{offset + size}"
+        items.append({"continuationItemRenderer": {"continuationEndpoint": {"continuationCommand": {"token": token}}}})
+    return items
+
+def list_page(kind, name):
+    items = list_items(kind, name, 0)
+    if kind == "playlist":
+        content = {"sectionListRenderer": {"contents": [{"itemSectionRenderer": {"contents": [
+            {"playlistVideoListRenderer": {"contents": items}}]}}]}}
+    else:
+        content = {"richGridRenderer": {"contents": items}}
+    data = {"contents": {"twoColumnBrowseResultsRenderer": {"tabs": [{"tabRenderer": {"selected": True, "content": content}}]}}}
+    return (f"<html><head><title>{name} - YouTube</title><script>ytcfg.set({json.dumps(STUB_CLIENT)});</script></head>"
+            f"<body><script>var ytInitialData = {json.dumps(data)};</script>" + "x" * 4096 + "</body></html>")
+
+class StubHandler(BaseHTTPRequestHandler):
+    # /oembed?url=... answers like YouTube's oEmbed endpoint, /vi/<id>/...
+    # serves the server's thumbnail bytes, /playlist and /@<handle>/videos
+    # are list pages, and any other path is a watch page with the title
+    # early in <head>.
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this Nagle holds
+    # the body back for a delayed ACK and every request costs ~40 ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/oembed":
+            url = parse_qs(parts.query).get("url", [""])[0]
+            body = json.dumps({"title": f"Stub video {url.rsplit('/', 1)[-1]}", "type": "video"}).encode()
+            content_type = "application/json"
+        elif parts.path.startswith("/vi/"):
+            body = self.server.thumbnail
+            content_type = "image/jpeg"
+        elif parts.path == "/playlist":
+            body = list_page("playlist", parse_qs(parts.query).get("list", [""])[0]).encode()
+            content_type = "text/html; charset=utf-8"
+        elif parts.path.startswith("/@") and parts.path.endswith("/videos"):
+            body = list_page("channel", parts.path[2:-len("/videos")]).encode()
+            content_type = "text/html; charset=utf-8"
+        else:
+            body = (f"<html><head><title>Stub page {parts.path} - YouTube</title></head>"
+                    "<body>" + "x" * 4096 + "</body></html>").encode()
+            content_type = "text/html; charset=utf-8"
+        self.reply(body, content_type)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        kind, rest = request.get("continuation", "playlist::0").split(":", 1)
+        name, offset = rest.rsplit(":", 1)
+        body = json.dumps({"onResponseReceivedActions": [
+            {"appendContinuationItemsAction": {"continuationItems": list_items(kind, name, int(offset))}}]}).encode()
+        self.reply(body, "application/json")
+
+    def reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class StubServer:
+    def __init__(self, thumbnail=b""):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.thumbnail = thumbnail
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,9 +1,53 @@
+import time
+started_at = time.perf_counter()
+
 import sys
-from PyQt6.QtWidgets import QApplication
-from src.ui.main_window import LavidaApp
+
+from src import ipc, journal
 
 if __name__ == "__main__":
+    # Client mode: hand the command to the running instance without
+    # loading Qt at all.
+    if len(sys.argv) > 1 and sys.argv[1] in ipc.COMMANDS:
+        sys.exit(ipc.main(sys.argv[1:]))
+    if len(sys.argv) > 1 and sys.argv[1] in journal.COMMANDS:
+        sys.exit(journal.main(sys.argv[1:]))
+    # Single instance: a second launch brings the first one forward.
+    if ipc.request(ipc.server_address(), {"cmd": "show"}, timeout=1.0) is not None:
+        sys.exit(0)
+
+    from PyQt6.QtWidgets import QApplication
+    from src.profiling import StartupProfile
+
+    profile = None
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        profile = StartupProfile(started_at)
+        profile.mark("import_qt")
+    report_frames = "--frame-stats" in sys.argv
+    if report_frames:
+        sys.argv.remove("--frame-stats")
+    if "--trace" in sys.argv or "--trace-log" in sys.argv:
+        from src import instrumentation
+        trace_log = None
+        if "--trace-log" in sys.argv:
+            position = sys.argv.index("--trace-log")
+            trace_log = sys.argv[position + 1]
+            del sys.argv[position:position + 2]
+        if "--trace" in sys.argv:
+            sys.argv.remove("--trace")
+        instrumentation.RECORDER.enable(trace_log)
+
     app = QApplication(sys.argv)
-    window = LavidaApp()
+    if profile: profile.mark("qapplication")
+
+    from src.ui.main_window import LavidaApp
+    if profile: profile.mark("import_ui")
+
+    window = LavidaApp(profile, report_frames=report_frames)
+    if profile:
+        profile.mark("window_init")
+        # Time-to-first-paint needs a window on screen.
+        window.show()
     # window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
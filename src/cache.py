@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+
+from src.database import LOADING_TITLE
+from src.urls import extract_video_id
+
+CACHE_TTL = 30 * 24 * 3600
+CACHE_CAPACITY = 1024
+
+class MetadataCache:
+    # Titles keyed by canonical YouTube video id: a bounded in-memory LRU in
+    # front of the persistent `metadata_cache` table. GUI thread only.
+    def __init__(self, db, ttl=CACHE_TTL, capacity=CACHE_CAPACITY):
+        self.db = db
+        self.ttl = ttl
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, video_id):
+        if not video_id:
+            return None
+        now = time.time()
+
+        entry = self.entries.get(video_id)
+        if entry and now - entry[1] < self.ttl:
+            self.entries.move_to_end(video_id)
+            self.memory_hits += 1
+            return entry[0]
+
+        row = self.db.query_one("SELECT title, fetched_at FROM metadata_cache WHERE video_id = ?", (video_id,))
+        if row and now - row[1] < self.ttl:
+            self.remember(video_id, row[0], row[1])
+            self.db_hits += 1
+            return row[0]
+
+        self.entries.pop(video_id, None)
+        self.misses += 1
+        return None
+
+    def put(self, video_id, title):
+        if not video_id:
+            return
+        fetched_at = time.time()
+        self.remember(video_id, title, fetched_at)
+        self.db.cache_title(video_id, title, fetched_at)
+
+    def remember(self, video_id, title, fetched_at):
+        self.entries[video_id] = (title, fetched_at)
+        self.entries.move_to_end(video_id)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def seed_from_videos(self):
+        # First run with the cache table: reuse titles we already have.
+        if self.db.query_one("SELECT 1 FROM metadata_cache LIMIT 1"):
+            return
+        now = time.time()
+        rows = []
+        for url, title in self.db.query("SELECT url, title FROM videos WHERE title IS NOT NULL AND title NOT IN (url, ?)", (LOADING_TITLE,)):
+            video_id = extract_video_id(url or "")
+            if video_id:
+                rows.append((video_id, title, now))
+        if rows:
+            self.db.cache_titles(rows)
+
+    def stats(self):
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            "size": len(self.entries),
+        }
@@ -0,0 +1,539 @@
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from src import instrumentation, journal
+from src.journal import LOADING_TITLE, encode
+from src.migrations import migrate, query_plan
+from src.search import build_match_query
+
+DB_PATH = "lavida.db"
+BATCH_LIMIT = 512
+MAX_ID = 2 ** 63 - 1
+AUTO_VACUUM_INCREMENTAL = 2
+COMPACT_MIN_PAGES = 256
+
+LIVE_SQL = "SELECT id, title, url, watched, row_order FROM videos WHERE is_deleted=0 AND tab_index = ? ORDER BY row_order ASC, id DESC"
+HISTORY_PAGE_SQL = "SELECT id, title, url, watched, row_order FROM videos WHERE is_deleted=1 AND id < ? ORDER BY id DESC LIMIT ?"
+COLLECTIONS_SQL = "SELECT id, uid, name, position FROM collections ORDER BY position, id"
+MIN_ORDER_SQL = "SELECT MIN(row_order) FROM videos WHERE is_deleted=0 AND tab_index = ?"
+JOURNAL_SQL = "INSERT INTO changes (uid, op, data, at) SELECT uid, ?, ?, ? FROM videos WHERE id = ?"
+# Binds a whole id list as one JSON parameter: one statement for any number
+# of rows, with no limit on bound variables.
+IDS = "(SELECT value FROM json_each(?))"
+MOVE_JOURNAL_SQL = f"""
+    INSERT INTO changes (uid, op, data, at)
+    SELECT v.uid, 'move', json_object('tab', c.uid, 'order', v.row_order, 'deleted', v.is_deleted), ?
+    FROM videos v LEFT JOIN collections c ON c.id = v.tab_index WHERE v.id IN {IDS}
+"""
+COLLECTION_JOURNAL_SQL = """
+    INSERT INTO changes (uid, op, data, at)
+    SELECT uid, 'collection', json_object('name', name, 'position', position), ? FROM collections WHERE id = ?
+"""
+SEARCH_SQL = """
+    SELECT v.id, v.title, v.url, v.watched, v.tab_index FROM videos_fts f JOIN videos v ON v.id = f.rowid
+    WHERE videos_fts MATCH ? AND v.is_deleted = 0 ORDER BY f.rank LIMIT ?
+"""
+
+# Queries on the start-up and drop paths, with representative parameters;
+# none of them may fall back to a table scan (see migrations.scans_table).
+HOT_QUERIES = {
+    "live": (LIVE_SQL, (0,)),
+    "history": (HISTORY_PAGE_SQL, (MAX_ID, 200)),
+    "min_order": (MIN_ORDER_SQL, (0,)),
+}
+
+_STOP = object()
+
+class VideoRepository(QObject):
+    # Writes are queued to a single writer thread and grouped into one
+    # transaction per wake-up. Each write gets a ticket; `write_committed`
+    # reports the highest ticket that is on disk, `write_failed` reports a
+    # ticket whose statements were rolled back.
+    write_committed = pyqtSignal(int)
+    write_failed = pyqtSignal(int, str)
+
+    def __init__(self, path=DB_PATH):
+        super().__init__()
+        self.path = path
+
+        # Read connection: owned by the GUI thread only.
+        self.conn = self.connect()
+        migrate(self.conn)
+
+        row = self.conn.execute("SELECT MAX(id) FROM videos").fetchone()
+        seq = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name='videos'").fetchone()
+        self.next_id = max(row[0] or 0, seq[0] if seq else 0) + 1
+        self.id_lock = threading.Lock()
+
+        self.queue = queue.Queue()
+        self.collecting = None
+        self.collecting_thread = None
+        self.ticket = 0
+        self.pending = 0
+        self.pending_cond = threading.Condition()
+
+        self.writer = threading.Thread(target=self.writer_loop, name="lavida-db-writer", daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # -- reads (GUI thread) -------------------------------------------------
+
+    def query(self, sql, params=(), fresh=False):
+        # Reads see what is committed; the GUI's models already show the
+        # writes still queued. `fresh` waits for those writes first, for the
+        # few callers that read rows back from disk.
+        if fresh and self.pending:
+            self.flush()
+        with instrumentation.span("db.query"):
+            return self.conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=(), fresh=False):
+        rows = self.query(sql, params, fresh)
+        return rows[0] if rows else None
+
+    def live_videos(self, tab_index):
+        return self.query(LIVE_SQL, (tab_index,), fresh=True)
+
+    def history_page(self, before_id=None, limit=200):
+        # Keyset pagination: the next page starts below the last id shown.
+        return self.query(HISTORY_PAGE_SQL, (MAX_ID if before_id is None else before_id, limit), fresh=True)
+
+    def expired_history(self, max_rows=None, max_age=None, limit=5000):
+        # Ids HISTORY no longer keeps: past the newest `max_rows`, or sent
+        # there more than `max_age` seconds ago.
+        ids = []
+        if max_rows:
+            ids += [row[0] for row in self.query(
+                "SELECT id FROM videos WHERE is_deleted=1 ORDER BY id DESC LIMIT ? OFFSET ?", (limit, max_rows))]
+        if max_age:
+            ids += [row[0] for row in self.query(
+                "SELECT id FROM videos WHERE is_deleted=1 AND deleted_at < ? LIMIT ?", (time.time() - max_age, limit))]
+        return sorted(set(ids), reverse=True)[:limit]
+
+    def min_order(self, tab_index):
+        row = self.query_one(MIN_ORDER_SQL, (tab_index,), fresh=True)
+        return row[0] if row and row[0] is not None else 0
+
+    def explain(self, sql, params=()):
+        return query_plan(self.conn, sql, params)
+
+    def pending_fetches(self):
+        return self.query("""
+            SELECT p.video_id, p.url, p.attempts FROM pending_fetches p
+            JOIN videos v ON v.id = p.video_id
+        """)
+
+    def pending_expansions(self, max_attempts):
+        return self.query("""
+            SELECT id, path, tab_index, state, next_order, added FROM pending_expansions
+            WHERE attempts < ? ORDER BY id
+        """, (max_attempts,))
+
+    def expansion_urls(self, tab_index, first_order, next_order):
+        # The rows an expansion stored so far hold its block of sort keys,
+        # in HISTORY by now or not. Runs once per resumed expansion.
+        return [row[0] for row in self.query("""
+            SELECT url FROM videos WHERE is_deleted = 0 AND tab_index = ? AND row_order >= ? AND row_order < ?
+            UNION ALL
+            SELECT url FROM videos WHERE is_deleted = 1 AND tab_index = ? AND row_order >= ? AND row_order < ?
+        """, (tab_index, first_order, next_order) * 2)]
+
+    def snapshot(self, vid_ids):
+        # Rows as they are now, for restore_videos().
+        return self.query(f"""
+            SELECT id, uid, url, title, tab_index, row_order, watched, is_deleted, deleted_at
+            FROM videos WHERE id IN {IDS}
+        """, (encode(list(vid_ids)),), fresh=True)
+
+    def collections(self):
+        return self.query(COLLECTIONS_SQL)
+
+    def has_videos(self):
+        return self.query_one("SELECT EXISTS (SELECT 1 FROM videos)", fresh=True)[0] == 1
+
+    def load_settings(self):
+        return dict(self.query("SELECT key, value FROM settings"))
+
+    def search_videos(self, text, limit=20):
+        match = build_match_query(text)
+        return self.query(SEARCH_SQL, (match, limit), fresh=True) if match else []
+
+    def find_live(self, video_id):
+        # Ids of live rows for a YouTube video id. The FTS index already
+        # tokenizes urls, so the id is looked up as a phrase there instead
+        # of scanning every url; callers still check the exact match.
+        return self.query("""
+            SELECT v.id, v.url FROM videos_fts f JOIN videos v ON v.id = f.rowid
+            WHERE videos_fts MATCH ? AND v.is_deleted = 0
+        """, (f'url : "{video_id}"',), fresh=True)
+
+    # -- writes (any thread, applied by the writer) -------------------------
+
+    def allocate_id(self):
+        # Ids are handed out up-front so the UI can show a row before its
+        # INSERT is committed.
+        with self.id_lock:
+            vid_id = self.next_id
+            self.next_id += 1
+            return vid_id
+
+    @contextmanager
+    def batch(self):
+        # Writes made by this thread inside the block are queued as a single
+        # job, so they commit or roll back together.
+        self.collecting, self.collecting_thread = [], threading.get_ident()
+        try:
+            yield
+        finally:
+            statements, self.collecting, self.collecting_thread = self.collecting, None, None
+            if statements:
+                self.submit(statements)
+
+    def submit(self, statements):
+        if self.collecting is not None and not callable(statements) and self.collecting_thread == threading.get_ident():
+            self.collecting.extend(statements)
+            return None
+        # Queued under the lock, so tickets reach the writer in order and
+        # the highest one committed covers every one before it.
+        with self.pending_cond:
+            self.ticket += 1
+            ticket = self.ticket
+            self.pending += 1
+            depth = self.pending
+            self.queue.put((ticket, statements))
+        instrumentation.record("db.queue", depth)
+        return ticket
+
+    def execute(self, sql, params=()):
+        return self.submit([(sql, params, False)])
+
+    def executemany(self, sql, seq_of_params):
+        return self.submit([(sql, list(seq_of_params), True)])
+
+    def journal_entry(self, op, vid_id, **data):
+        # The change-log entry for a write, run in the same transaction. It
+        # reads the row's uid, so it goes before a DELETE and after an INSERT.
+        return (JOURNAL_SQL, (op, encode(data) if data else None, time.time(), vid_id), False)
+
+    def insert_videos(self, rows, fetch_jobs=()):
+        # rows: [(id, url, title, tab_index, row_order), ...] in one transaction.
+        # fetch_jobs: [(id, url), ...] recorded up front so a fetch cut short
+        # by quitting is retried on the next start. The journal names the
+        # collection by uid, since ids differ between machines.
+        at = time.time()
+        rows = [(vid_id, uuid.uuid4().hex, url, title, tab_index, row_order)
+                for vid_id, url, title, tab_index, row_order in rows]
+        statements = [("INSERT INTO videos (id, uid, url, title, tab_index, row_order, is_deleted) VALUES (?, ?, ?, ?, ?, ?, 0)",
+                       rows, True),
+                      ("INSERT INTO changes (uid, op, data, at) SELECT ?, 'insert', json_set(?, '$.tab', uid), ? FROM collections WHERE id = ?",
+                       [(uid, encode({"url": url, "title": title, "order": row_order, "watched": 0}), at, tab_index)
+                        for _, uid, url, title, tab_index, row_order in rows], True)]
+        if fetch_jobs:
+            statements.append(("INSERT OR IGNORE INTO pending_fetches (video_id, url) VALUES (?, ?)", list(fetch_jobs), True))
+        return self.submit(statements)
+
+    def set_title(self, vid_id, title):
+        return self.submit([("UPDATE videos SET title = ? WHERE id = ?", (title, vid_id), False),
+                            self.journal_entry("title", vid_id, title=title),
+                            ("DELETE FROM pending_fetches WHERE video_id = ?", (vid_id,), False)])
+
+    def record_fetch_failure(self, vid_id, url, error):
+        return self.execute("""
+            INSERT INTO pending_fetches (video_id, url, attempts, last_error) VALUES (?, ?, 1, ?)
+            ON CONFLICT(video_id) DO UPDATE SET attempts = attempts + 1, last_error = excluded.last_error
+        """, (vid_id, url, error))
+
+    def set_watched(self, vid_id, watched):
+        return self.submit([("UPDATE videos SET watched = ? WHERE id = ?", (watched, vid_id), False),
+                            self.journal_entry("watched", vid_id, watched=watched)])
+
+    def set_order(self, vid_id, row_order):
+        return self.submit([("UPDATE videos SET row_order = ? WHERE id = ?", (row_order, vid_id), False),
+                            self.journal_entry("order", vid_id, order=row_order)])
+
+    def set_orders(self, orders):
+        # One transaction for a whole rebalance: [(row_order, id), ...]
+        orders = list(orders)
+        at = time.time()
+        return self.submit([("UPDATE videos SET row_order = ? WHERE id = ?", orders, True),
+                            (JOURNAL_SQL, [("order", encode({"order": row_order}), at, vid_id) for row_order, vid_id in orders], True)])
+
+    def soft_delete(self, vid_id):
+        return self.submit([("UPDATE videos SET is_deleted=1, deleted_at=? WHERE id = ?", (time.time(), vid_id), False),
+                            self.journal_entry("delete", vid_id)])
+
+    def hard_delete(self, vid_id):
+        return self.submit([self.journal_entry("purge", vid_id),
+                            ("DELETE FROM videos WHERE id = ?", (vid_id,), False),
+                            ("DELETE FROM pending_fetches WHERE video_id = ?", (vid_id,), False)])
+
+    # Batch versions: one job, and so one transaction, for any number of rows.
+
+    def set_watched_many(self, vid_ids, watched):
+        ids, at = encode(list(vid_ids)), time.time()
+        return self.submit([
+            (f"UPDATE videos SET watched = ? WHERE id IN {IDS}", (watched, ids), False),
+            (f"INSERT INTO changes (uid, op, data, at) SELECT uid, 'watched', json_object('watched', ?), ? FROM videos WHERE id IN {IDS}",
+             (watched, at, ids), False),
+        ])
+
+    def move_videos(self, moves, collection_id):
+        # moves: [(row_order, id), ...]. Rows moved out of HISTORY are live
+        # again.
+        moves = list(moves)
+        return self.submit([
+            ("UPDATE videos SET tab_index = ?, row_order = ?, is_deleted = 0, deleted_at = NULL WHERE id = ?",
+             [(collection_id, row_order, vid_id) for row_order, vid_id in moves], True),
+            (MOVE_JOURNAL_SQL, (time.time(), encode([vid_id for _, vid_id in moves])), False),
+        ])
+
+    def soft_delete_many(self, vid_ids):
+        ids, at = encode(list(vid_ids)), time.time()
+        return self.submit([
+            (f"UPDATE videos SET is_deleted = 1, deleted_at = ? WHERE is_deleted = 0 AND id IN {IDS}", (at, ids), False),
+            (f"INSERT INTO changes (uid, op, data, at) SELECT uid, 'delete', NULL, ? FROM videos WHERE id IN {IDS}", (at, ids), False),
+        ])
+
+    def hard_delete_many(self, vid_ids):
+        ids, at = encode(list(vid_ids)), time.time()
+        return self.submit([
+            (f"INSERT INTO changes (uid, op, data, at) SELECT uid, 'purge', NULL, ? FROM videos WHERE id IN {IDS}", (at, ids), False),
+            (f"DELETE FROM videos WHERE id IN {IDS}", (ids,), False),
+            (f"DELETE FROM pending_fetches WHERE video_id IN {IDS}", (ids,), False),
+        ])
+
+    def restore_videos(self, snapshot):
+        # Puts rows back as snapshot() saw them, purged ones included, and
+        # journals the result: an insert for a row that was gone, a move and
+        # its watched state for the rest. Both say whether the row is back
+        # in HISTORY; a separate delete would carry the same stamp and lose
+        # to them on import.
+        rows = [tuple(row) for row in snapshot]
+        ids, at = encode([row[0] for row in rows]), time.time()
+        existing = {row[0] for row in self.query(f"SELECT id FROM videos WHERE id IN {IDS}", (ids,), fresh=True)}
+        purged = [row for row in rows if row[0] not in existing]
+        statements = [("UPDATE videos SET tab_index = ?, row_order = ?, watched = ?, is_deleted = ?, deleted_at = ? WHERE id = ?",
+                       [(tab_index, row_order, watched, is_deleted, deleted_at, vid_id)
+                        for vid_id, _, _, _, tab_index, row_order, watched, is_deleted, deleted_at in rows if vid_id in existing], True),
+                      (MOVE_JOURNAL_SQL, (at, encode(sorted(existing))), False),
+                      (f"INSERT INTO changes (uid, op, data, at) SELECT uid, 'watched', json_object('watched', watched), ? FROM videos WHERE id IN {IDS}",
+                       (at, encode(sorted(existing))), False)]
+        if purged:
+            purged_ids = encode([row[0] for row in purged])
+            statements += [
+                ("INSERT INTO videos (id, uid, url, title, tab_index, row_order, watched, is_deleted, deleted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                 purged, True),
+                (f"""INSERT INTO changes (uid, op, data, at)
+                     SELECT v.uid, 'insert', json_object('url', v.url, 'title', v.title, 'tab', c.uid, 'order', v.row_order,
+                                                         'watched', v.watched, 'deleted', v.is_deleted), ?
+                     FROM videos v LEFT JOIN collections c ON c.id = v.tab_index WHERE v.id IN {IDS}""", (at, purged_ids), False),
+            ]
+        return self.submit(statements)
+
+    def purge(self, vid_ids):
+        # Retention is a local policy and is not journalled; other machines
+        # keep their own HISTORY.
+        params = [(vid_id,) for vid_id in vid_ids]
+        return self.submit([("DELETE FROM videos WHERE id = ?", params, True),
+                            ("DELETE FROM pending_fetches WHERE video_id = ?", params, True)])
+
+    def create_collection(self, name, position):
+        # The new id is needed at once for the tab, so this waits for the
+        # writer like import_changes does; it only runs on a user action.
+        result = {}
+        def task(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute("INSERT INTO collections (uid, name, position) VALUES (?, ?, ?)",
+                                      (uuid.uuid4().hex, name, position))
+                conn.execute(COLLECTION_JOURNAL_SQL, (time.time(), cursor.lastrowid))
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            result["id"] = cursor.lastrowid
+        self.submit(task)
+        self.flush()
+        return result.get("id")
+
+    def rename_collection(self, collection_id, name):
+        return self.submit([("UPDATE collections SET name = ? WHERE id = ?", (name, collection_id), False),
+                            (COLLECTION_JOURNAL_SQL, (time.time(), collection_id), False)])
+
+    def delete_collection(self, collection_id):
+        # Its rows go to HISTORY, each journalled like a single delete.
+        at = time.time()
+        return self.submit([
+            ("INSERT INTO changes (uid, op, data, at) SELECT uid, 'delete', NULL, ? FROM videos WHERE is_deleted = 0 AND tab_index = ?",
+             (at, collection_id), False),
+            ("UPDATE videos SET is_deleted = 1, deleted_at = ? WHERE is_deleted = 0 AND tab_index = ?", (at, collection_id), False),
+            ("INSERT INTO changes (uid, op, data, at) SELECT uid, 'collection_delete', NULL, ? FROM collections WHERE id = ?",
+             (at, collection_id), False),
+            ("DELETE FROM collections WHERE id = ?", (collection_id,), False),
+        ])
+
+    # Expansions are local bookkeeping and are not journalled; the rows they
+    # add are, as ordinary inserts.
+
+    def start_expansion(self, path, tab_index, next_order):
+        # Waits for the id like create_collection; one per dropped list.
+        result = {}
+        def task(conn):
+            cursor = conn.execute("INSERT INTO pending_expansions (path, tab_index, next_order) VALUES (?, ?, ?)",
+                                  (path, tab_index, next_order))
+            result["id"] = cursor.lastrowid
+        self.submit(task)
+        self.flush()
+        return result.get("id")
+
+    def expansion_progress(self, expansion_id, state, next_order, added):
+        # Queued next to the page's inserts, so the stored state always
+        # matches the rows that made it to disk. No state means the list
+        # is done.
+        if state is None:
+            return self.finish_expansion(expansion_id)
+        return self.execute("UPDATE pending_expansions SET state = ?, next_order = ?, added = ?, last_error = NULL WHERE id = ?",
+                            (state, next_order, added, expansion_id))
+
+    def record_expansion_failure(self, expansion_id, error):
+        return self.execute("UPDATE pending_expansions SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                            (error, expansion_id))
+
+    def finish_expansion(self, expansion_id):
+        return self.execute("DELETE FROM pending_expansions WHERE id = ?", (expansion_id,))
+
+    def compact(self, min_free_pages=COMPACT_MIN_PAGES):
+        # Runs on the writer between transactions. Freed pages are returned
+        # to the filesystem once enough of them pile up; a file created
+        # before incremental auto-vacuum needs one full VACUUM to switch.
+        def task(conn):
+            if conn.execute("PRAGMA freelist_count").fetchone()[0] < min_free_pages:
+                return
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            else:
+                # Frees one page per step, so it has to be run to completion.
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return self.submit(task)
+
+    def import_changes(self, path):
+        # Applies a change file on the writer, between transactions, and
+        # returns once it is on disk. Imported rows take ids from the same
+        # sequence as rows created here.
+        result = {}
+        def task(conn):
+            try:
+                result.update(journal.import_changes(conn, path, self.allocate_id))
+            except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+                result["error"] = str(e)
+        self.submit(task)
+        self.flush()
+        return result
+
+    def cache_title(self, video_id, title, fetched_at):
+        return self.cache_titles([(video_id, title, fetched_at)])
+
+    def cache_titles(self, rows):
+        return self.executemany("INSERT OR REPLACE INTO metadata_cache (video_id, title, fetched_at) VALUES (?, ?, ?)", rows)
+
+    def save_settings(self, values):
+        return self.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                                [(key, str(value)) for key, value in values.items()])
+
+    def flush(self, timeout=None):
+        # Time the GUI thread spends blocked on the writer.
+        with instrumentation.span("db.flush"), self.pending_cond:
+            return self.pending_cond.wait_for(lambda: self.pending == 0, timeout)
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.writer.join()
+        self.conn.close()
+
+    # -- writer thread ------------------------------------------------------
+
+    def writer_loop(self):
+        conn = self.connect()
+        job = None
+        while True:
+            if job is None:
+                job = self.queue.get()
+            if job is _STOP:
+                break
+            if callable(job[1]):
+                self.run_task(conn, *job)
+                job = None
+                continue
+
+            # Maintenance tasks and _STOP end a batch and are handled on the
+            # next pass.
+            batch, job = [job], None
+            while len(batch) < BATCH_LIMIT:
+                try:
+                    job = self.queue.get_nowait()
+                except queue.Empty:
+                    job = None
+                    break
+                if job is _STOP or callable(job[1]):
+                    break
+                batch.append(job)
+                job = None
+
+            try:
+                self.apply(conn, batch)
+                self.write_committed.emit(batch[-1][0])
+            except sqlite3.Error:
+                # Isolate the offending job so the rest of the batch lands.
+                for ticket, statements in batch:
+                    try:
+                        self.apply(conn, [(ticket, statements)])
+                        self.write_committed.emit(ticket)
+                    except sqlite3.Error as e:
+                        self.write_failed.emit(ticket, str(e))
+            finally:
+                with self.pending_cond:
+                    self.pending -= len(batch)
+                    self.pending_cond.notify_all()
+        conn.close()
+
+    def run_task(self, conn, ticket, task):
+        # Outside any transaction: VACUUM refuses to run inside one.
+        try:
+            task(conn)
+            self.write_committed.emit(ticket)
+        except sqlite3.Error as e:
+            self.write_failed.emit(ticket, str(e))
+        finally:
+            with self.pending_cond:
+                self.pending -= 1
+                self.pending_cond.notify_all()
+
+    def apply(self, conn, batch):
+        with instrumentation.span("db.commit"):
+            self.apply_batch(conn, batch)
+
+    def apply_batch(self, conn, batch):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for _, statements in batch:
+                for sql, params, many in statements:
+                    if many: conn.executemany(sql, params)
+                    else: conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
@@ -0,0 +1,271 @@
+import codecs
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from src import instrumentation
+from src.thumbnails import FETCH_THREADS, THUMBNAIL_URL, MAX_THUMB_BYTES
+
+USER_AGENT = "Mozilla/5.0"
+OEMBED_ENDPOINT = "https://www.youtube.com/oembed"
+OEMBED_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be"}
+
+MAX_WORKERS = 4
+TIMEOUT = 5
+RETRIES = 2
+BACKOFF = 0.5
+HOST_INTERVAL = 0.2
+CHUNK_SIZE = 16 * 1024
+MAX_HTML_BYTES = 2 * 1024 * 1024
+
+class FetchError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+class _TitleFound(Exception):
+    pass
+
+class TitleParser(HTMLParser):
+    # Fed incrementally; raises _TitleFound as soon as either <title> or
+    # og:title is complete so the rest of the page is never downloaded.
+    def __init__(self):
+        super().__init__()
+        self.title = None
+        self.in_title = False
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self.in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            if attrs.get("property") == "og:title" and attrs.get("content"):
+                self.title = attrs["content"]
+                raise _TitleFound()
+        elif tag == "body":
+            raise _TitleFound()
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self.in_title:
+            self.in_title = False
+            title = "".join(self.parts).strip()
+            if title:
+                self.title = title
+                raise _TitleFound()
+
+def clean_title(title):
+    title = " ".join(title.split())
+    if title.endswith("- YouTube"):
+        title = title[:-len("- YouTube")].strip()
+    return title
+
+class RateLimiter:
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def reserve(self, host):
+        # Takes the host's next slot and returns how long until it is due.
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, 0.0))
+            self.next_slot[host] = slot + self.interval
+        return slot - now
+
+    def delay(self, host):
+        # How long until the host's next slot, without taking it.
+        with self.lock:
+            return max(0.0, self.next_slot.get(host, 0.0) - time.monotonic())
+
+    def wait(self, host):
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+class MetadataFetcher(QObject):
+    title_fetched = pyqtSignal(int, str, str)
+    fetch_failed = pyqtSignal(int, str, str)
+    thumbnail_fetched = pyqtSignal(str)
+    thumbnail_failed = pyqtSignal(str)
+
+    def __init__(self, max_workers=MAX_WORKERS, oembed_endpoint=OEMBED_ENDPOINT, oembed_hosts=OEMBED_HOSTS,
+                 retries=RETRIES, backoff=BACKOFF, host_interval=HOST_INTERVAL, timeout=TIMEOUT,
+                 thumbnails=None, thumbnail_url=THUMBNAIL_URL):
+        super().__init__()
+        self.oembed_endpoint = oembed_endpoint
+        self.thumbnails = thumbnails
+        self.thumbnail_url = thumbnail_url
+        self.thumbnail_host = urlsplit(thumbnail_url).hostname
+        self.oembed_hosts = set(oembed_hosts)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = RateLimiter(host_interval)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers + FETCH_THREADS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lavida-fetch")
+        # Thumbnails have threads of their own, so scrolling never holds up
+        # titles.
+        self.thumbnail_executor = ThreadPoolExecutor(max_workers=FETCH_THREADS, thread_name_prefix="lavida-thumb")
+        # Jobs submitted and not yet finished, for the fetch.queue gauge.
+        self.outstanding = 0
+        self.outstanding_lock = threading.Lock()
+
+    def submit(self, job, *args):
+        with self.outstanding_lock:
+            self.outstanding += 1
+            depth = self.outstanding
+        instrumentation.record("fetch.queue", depth)
+        future = self.executor.submit(job, *args)
+        future.add_done_callback(self.job_done)
+        return future
+
+    def job_done(self, future):
+        with self.outstanding_lock:
+            self.outstanding -= 1
+
+    def fetch(self, vid_id, url):
+        return self.submit(self.run_job, vid_id, url)
+
+    def fetch_many(self, jobs):
+        return [self.fetch(vid_id, url) for vid_id, url in jobs]
+
+    def thumbnail_delay(self):
+        return self.limiter.delay(self.thumbnail_host)
+
+    def fetch_thumbnail(self, video_id):
+        # The caller paces these by thumbnail_delay(): the slot is taken
+        # here and the thread never waits for it.
+        self.limiter.reserve(self.thumbnail_host)
+        return self.thumbnail_executor.submit(self.run_thumbnail_job, video_id)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.thumbnail_executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def run_job(self, vid_id, url):
+        try:
+            with instrumentation.span("fetch.title"):
+                title = self.fetch_title(url)
+        except Exception as e:
+            self.fetch_failed.emit(vid_id, url, str(e))
+            return None
+        self.title_fetched.emit(vid_id, url, title)
+        return title
+
+    def run_thumbnail_job(self, video_id):
+        if self.thumbnails is None:
+            self.thumbnail_failed.emit(video_id)
+            return False
+        try:
+            with instrumentation.span("fetch.thumbnail"):
+                data = self.fetch_thumbnail_bytes(video_id)
+            self.thumbnails.write(video_id, data)
+        except Exception:
+            self.thumbnail_failed.emit(video_id)
+            return False
+        self.thumbnail_fetched.emit(video_id)
+        return True
+
+    def fetch_thumbnail_bytes(self, video_id):
+        url = self.thumbnail_url.format(video_id=video_id)
+        with self.get(url, stream=True, paced=False) as response:
+            data = b""
+            for chunk in response.iter_content(CHUNK_SIZE):
+                data += chunk
+                if len(data) > MAX_THUMB_BYTES:
+                    raise FetchError(f"Thumbnail too large: {url}")
+        if not data:
+            raise FetchError(f"Empty thumbnail: {url}")
+        return data
+
+    def fetch_title(self, url):
+        return self.retrying(self.fetch_title_once, url)
+
+    def fetch_title_once(self, url):
+        title = None
+        if urlsplit(url).hostname in self.oembed_hosts:
+            title = self.fetch_oembed_title(url)
+        if not title:
+            title = self.fetch_page_title(url)
+        return clean_title(title) if title else url
+
+    def retrying(self, fetch, *args):
+        # Network errors and retryable HTTP statuses are tried again with
+        # jittered exponential backoff.
+        attempt = 0
+        while True:
+            try:
+                return fetch(*args)
+            except (FetchError, requests.RequestException) as e:
+                retryable = getattr(e, "retryable", True)
+                if not retryable or attempt >= self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random() / 4))
+                attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method, url, paced=True, **kwargs):
+        # `paced=False` when the caller already took the host's slot.
+        if paced:
+            self.limiter.wait(urlsplit(url).hostname)
+        response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.close()
+            raise FetchError(f"HTTP {response.status_code} for {url}", retryable=True)
+        if response.status_code >= 400:
+            response.close()
+            raise FetchError(f"HTTP {response.status_code} for {url}")
+        return response
+
+    def fetch_oembed_title(self, url):
+        try:
+            response = self.get(self.oembed_endpoint, params={"url": url, "format": "json"})
+        except FetchError as e:
+            # Private or non-embeddable videos have no oEmbed entry; the
+            # page itself may still carry a title.
+            if e.retryable:
+                raise
+            return None
+        try:
+            return response.json().get("title")
+        except ValueError:
+            return None
+
+    def fetch_page_title(self, url):
+        parser = TitleParser()
+        received = 0
+        with self.get(url, stream=True) as response:
+            content_type = response.headers.get("Content-Type", "").lower()
+            encoding = response.encoding if "charset" in content_type else "utf-8"
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    parser.feed(decoder.decode(chunk))
+                    received += len(chunk)
+                    if received >= MAX_HTML_BYTES:
+                        break
+            except _TitleFound:
+                pass
+        return parser.title
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import os
+import re
+
+from src.urls import is_youtube_url, extract_video_id
+
+URL_RE = re.compile(r"(?:https?://)?(?:[\w-]+\.)?(?:youtube\.com|youtube-nocookie\.com|youtu\.be)/[^\s\"'<>\]\[(){},]+",
+                    re.IGNORECASE)
+MAX_IMPORT_BYTES = 16 * 1024 * 1024
+
+def extract_urls(text):
+    return [m.group(0).rstrip(".;:!?") for m in URL_RE.finditer(text)]
+
+def walk_json(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from walk_json(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from walk_json(item)
+
+def extract_urls_from_file(path):
+    if os.path.getsize(path) > MAX_IMPORT_BYTES:
+        return []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        try:
+            return [url for s in walk_json(json.loads(text)) for url in extract_urls(s)]
+        except ValueError:
+            pass
+    elif ext == ".csv":
+        return [url for row in csv.reader(io.StringIO(text)) for cell in row for url in extract_urls(cell)]
+    return extract_urls(text)
+
+def dedupe_urls(urls):
+    seen = set()
+    unique = []
+    for url in urls:
+        url = url.strip()
+        key = extract_video_id(url) or url
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+def urls_from_mime(mime):
+    urls = []
+    if mime.hasUrls():
+        for qurl in mime.urls():
+            if qurl.isLocalFile():
+                path = qurl.toLocalFile()
+                if os.path.isfile(path):
+                    urls.extend(extract_urls_from_file(path))
+            else:
+                urls.append(qurl.toString())
+    if mime.hasText():
+        urls.extend(extract_urls(mime.text()))
+    return dedupe_urls(url for url in urls if is_youtube_url(url))
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from collections import deque
+
+CAPACITY = 20000
+
+# Timing spans and gauges from any thread, kept in a fixed-size ring buffer
+# and optionally appended to a JSONL file. While disabled, span() hands out
+# one shared do-nothing context manager and record() returns at its first
+# line, so instrumented code pays about one attribute lookup and a call.
+#
+#     with instrumentation.span("db.flush"):
+#         ...
+#     instrumentation.record("db.queue", depth)
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    __slots__ = ("recorder", "name", "started")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+class Recorder:
+    def __init__(self, capacity=CAPACITY):
+        self.enabled = False
+        self.events = deque(maxlen=capacity)
+        self.sink = None
+        self.lock = threading.Lock()
+
+    def enable(self, log_path=None):
+        with self.lock:
+            if log_path and self.sink is None:
+                self.sink = open(log_path, "a", encoding="utf-8")
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        with self.lock:
+            if self.sink is not None:
+                self.sink.close()
+                self.sink = None
+
+    def span(self, name):
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def record(self, name, value):
+        # Spans are milliseconds; gauges are whatever they count.
+        if not self.enabled:
+            return
+        at = time.time()
+        # deque.append is atomic, so only the file needs the lock.
+        self.events.append((name, at, value))
+        if self.sink is not None:
+            with self.lock:
+                if self.sink is not None:
+                    self.sink.write(f'{{"name":{json.dumps(name)},"at":{at:.6f},"value":{value:.4f}}}\n')
+
+    def clear(self):
+        self.events.clear()
+
+    def stats(self):
+        values = {}
+        for name, _, value in list(self.events):
+            values.setdefault(name, []).append(value)
+        result = {}
+        for name, samples in sorted(values.items()):
+            samples.sort()
+            def percentile(p):
+                return samples[min(len(samples) - 1, int(len(samples) * p))]
+            result[name] = {
+                "count": len(samples),
+                "p50": round(percentile(0.5), 3),
+                "p99": round(percentile(0.99), 3),
+                "max": round(samples[-1], 3),
+            }
+        return result
+
+RECORDER = Recorder()
+span = RECORDER.span
+record = RECORDER.record
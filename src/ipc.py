@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+
+from src.ingest import extract_urls, extract_urls_from_file
+
+# Imported by the command-line client before anything else, so this module
+# (and what it imports) must stay free of Qt, requests and bs4. The running
+# instance serves the same protocol from src/ipc_server.py: one JSON object
+# per line in each direction.
+
+# Same default as src.database, which cannot be imported from here.
+DB_PATH = "lavida.db"
+TIMEOUT = 30.0
+MAX_LINE_BYTES = 16 * 1024 * 1024
+COMMANDS = ("add", "bulk-add", "mark-watched", "mark-unwatched", "query", "ping")
+
+def server_address(db_path=DB_PATH):
+    # One server per database, so instances on different files never meet.
+    # On Unix this is the socket's full path, on Windows a pipe name; the
+    # same string is handed to QLocalServer.listen().
+    digest = hashlib.sha1(os.path.abspath(db_path).encode("utf-8")).hexdigest()[:12]
+    if sys.platform == "win32":
+        return f"lavida-{digest}"
+    return os.path.join(tempfile.gettempdir(), f"lavida-{os.getuid()}-{digest}.sock")
+
+def request(address, message, timeout=TIMEOUT):
+    # Returns the reply, or None when no instance is listening.
+    data = json.dumps(message).encode("utf-8") + b"\n"
+    try:
+        if sys.platform == "win32":
+            with open("\\\\.\\pipe\\" + address, "r+b", buffering=0) as pipe:
+                pipe.write(data)
+                line = pipe.readline(MAX_LINE_BYTES)
+        else:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(address)
+                sock.sendall(data)
+                with sock.makefile("rb") as reply:
+                    line = reply.readline(MAX_LINE_BYTES)
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+def parse_args(argv):
+    # add URL... [--tab N] | bulk-add FILE|- [--tab N] | mark-watched URL...
+    # mark-unwatched URL... | query TEXT... [--limit N] | ping
+    command, args = argv[0], list(argv[1:])
+    options = {}
+    for flag in ("--tab", "--limit", "--db"):
+        if flag in args:
+            position = args.index(flag)
+            options[flag[2:]] = args[position + 1]
+            del args[position:position + 2]
+
+    if command == "add":
+        message = {"cmd": "add", "urls": args}
+    elif command == "bulk-add":
+        urls = []
+        for path in args or ["-"]:
+            urls += extract_urls(sys.stdin.read()) if path == "-" else extract_urls_from_file(path)
+        message = {"cmd": "add", "urls": urls}
+    elif command in ("mark-watched", "mark-unwatched"):
+        message = {"cmd": "watched", "urls": args, "watched": command == "mark-watched"}
+    elif command == "query":
+        message = {"cmd": "query", "text": " ".join(args), "limit": int(options.get("limit", 20))}
+    else:
+        message = {"cmd": "ping"}
+    if "tab" in options:
+        message["tab"] = int(options["tab"])
+    return message, options.get("db", DB_PATH)
+
+def main(argv):
+    try:
+        message, db_path = parse_args(argv)
+    except (IndexError, ValueError, OSError) as e:
+        print(f"lavida {argv[0]}: {e}", file=sys.stderr)
+        return 2
+    reply = request(server_address(db_path), message)
+    if reply is None:
+        print("Lavida is not running.", file=sys.stderr)
+        return 1
+    if not reply.get("ok"):
+        print(reply.get("error", "Request failed."), file=sys.stderr)
+        return 1
+
+    if message["cmd"] == "query":
+        for row in reply["results"]:
+            print(f"{row['id']}\t{'x' if row['watched'] else ' '}\t{row['title']}\t{row['url']}")
+    elif message["cmd"] == "add":
+        print(f"Added {reply['added']} link(s).")
+    elif message["cmd"] == "watched":
+        print(f"Updated {reply['updated']} link(s).")
+    return 0
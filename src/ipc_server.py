@@ -0,0 +1,94 @@
+import json
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+from src.ipc import request, MAX_LINE_BYTES
+
+# Requests arriving this long after the first pending one join its batch.
+# Every batch costs one model update per tab, which dominates on large lists.
+COALESCE_MS = 10
+
+class CommandServer(QObject):
+    # The running instance's end of src/ipc.py. Requests are handed to
+    # `handler` in batches, which applies their writes as one transaction,
+    # and each gets its reply in order.
+    def __init__(self, address, handler):
+        super().__init__()
+        self.address = address
+        self.handler = handler
+        self.pending = []
+        self.scheduled = False
+        # Open sockets. Their wrappers must be referenced from here: the
+        # lambdas below alone would let the cycle collector drop them, and
+        # their signal connections with them.
+        self.connections = set()
+
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def listen(self):
+        if self.server.listen(self.address):
+            return True
+        # A socket file left by a crashed instance blocks listen(); remove it
+        # unless something still answers on it.
+        if request(self.address, {"cmd": "ping"}, timeout=1.0) is not None:
+            return False
+        QLocalServer.removeServer(self.address)
+        return self.server.listen(self.address)
+
+    def close(self):
+        self.server.close()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            self.connections.add(connection)
+            connection.readyRead.connect(lambda c=connection: self.on_ready_read(c))
+            connection.disconnected.connect(lambda c=connection: self.release(c))
+            # The request may already be buffered, and then no readyRead follows.
+            self.on_ready_read(connection)
+
+    def on_ready_read(self, connection):
+        while connection.canReadLine():
+            line = bytes(connection.readLine())
+            try:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self.reply(connection, {"ok": False, "error": f"Bad request: {e}"})
+                continue
+            self.pending.append((connection, message))
+        if connection.bytesAvailable() > MAX_LINE_BYTES:
+            self.reply(connection, {"ok": False, "error": "Request too large."})
+            connection.abort()
+            return
+
+        if self.pending and not self.scheduled:
+            self.scheduled = True
+            QTimer.singleShot(COALESCE_MS, self.process)
+
+    def process(self):
+        self.scheduled = False
+        batch, self.pending = self.pending, []
+        replies = self.handler([message for _, message in batch])
+        for (connection, _), reply in zip(batch, replies):
+            self.reply(connection, reply)
+        for connection in {connection for connection, _ in batch}:
+            self.release(connection)
+
+    def reply(self, connection, message):
+        if connection.state() == QLocalSocket.LocalSocketState.ConnectedState:
+            connection.write(json.dumps(message).encode("utf-8") + b"\n")
+            connection.flush()
+
+    def release(self, connection):
+        # A client may hang up before its requests ran; the socket is kept
+        # until then so the batch can still reply to it.
+        if connection in self.connections and \
+                connection.state() == QLocalSocket.LocalSocketState.UnconnectedState and \
+                not any(pending is connection for pending, _ in self.pending):
+            self.connections.discard(connection)
+            connection.deleteLater()
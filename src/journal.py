@@ -0,0 +1,271 @@
+import gzip
+import json
+import os
+import sqlite3
+import sys
+
+from src.migrations import migrate
+
+# Export and import of the change journal (see migrations.add_change_journal).
+# Like src/ipc.py this is used by the command-line client, so it must not
+# import Qt.
+#
+# A change file is gzipped JSON lines: a header object, then one
+# [origin, origin_seq, uid, op, data, at] array per change. Every machine
+# numbers its own changes; an import skips whatever it has already seen
+# from each origin, so importing the same file twice changes nothing.
+#
+# Concurrent edits resolve field by field, last writer wins: a change only
+# overwrites a field whose last journalled change is older by (at, origin),
+# the origin breaking ties. Every machine compares the same stamps, so two
+# machines that have exchanged the same changes agree whatever the order.
+
+FORMAT = "lavida-changes"
+VERSION = 1
+LOADING_TITLE = "Loading info..."
+COMMANDS = ("export", "import")
+# Only the last of these per row matters; earlier ones are left out of an
+# export. Collection changes are kept whole: dropping the one that created a
+# collection would move it after the inserts that need it.
+OVERWRITES = {"title", "watched", "order", "move"}
+# The fields of a row (or of a collection) each change writes.
+FIELDS = {
+    "insert": ("title", "watched", "order", "place"),
+    "title": ("title",),
+    "watched": ("watched",),
+    "order": ("order",),
+    "move": ("order", "place"),
+    "delete": ("place",),
+    "collection": ("collection",),
+    "collection_delete": ("collection",),
+}
+# Uids per stamp lookup, under SQLite's default limit on bound parameters.
+STAMP_BATCH = 500
+
+# One encoder for every call: json.dumps() with custom separators builds a
+# new one each time, which costs more than the encoding.
+encode = json.JSONEncoder(separators=(",", ":")).encode
+
+def machine_id(conn):
+    return conn.execute("SELECT value FROM settings WHERE key = 'machine_id'").fetchone()[0]
+
+def last_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+def export_changes(conn, path, since=0):
+    me = machine_id(conn)
+    rows = conn.execute("""
+        SELECT seq, COALESCE(origin, ?), COALESCE(origin_seq, seq), uid, op, data, at
+        FROM changes WHERE seq > ? ORDER BY seq
+    """, (me, since)).fetchall()
+
+    # The winning change per row and op, which need not be the last one
+    # journalled: an import records changes it found out of date too.
+    latest = {}
+    for position, (_, origin, _, uid, op, _, at) in enumerate(rows):
+        if op in OVERWRITES:
+            best = latest.get((uid, op))
+            if best is None or (at, origin) >= (rows[best][6], rows[best][1]):
+                latest[uid, op] = position
+    until = rows[-1][0] if rows else since
+
+    partial = path + ".part"
+    with gzip.open(partial, "wt", encoding="utf-8") as f:
+        f.write(encode({"format": FORMAT, "version": VERSION, "origin": me, "since": since, "until": until}) + "\n")
+        count = 0
+        for position, (_, origin, origin_seq, uid, op, data, at) in enumerate(rows):
+            if op in OVERWRITES and latest[uid, op] != position:
+                continue
+            f.write(encode([origin, origin_seq, uid, op, json.loads(data) if data else None, at]) + "\n")
+            count += 1
+    os.replace(partial, path)
+    return {"changes": count, "since": since, "until": until}
+
+def read_changes(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "null")
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a Lavida change file")
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported change file version: {header.get('version')}")
+        return header, [json.loads(line) for line in f]
+
+def collection_id(conn, uid):
+    # Rows of a collection this machine does not have land in the first one.
+    row = conn.execute("SELECT id FROM collections WHERE uid = ?", (str(uid),)).fetchone()
+    if row is None:
+        row = conn.execute("SELECT id FROM collections ORDER BY position, id LIMIT 1").fetchone()
+    return row[0] if row else 0
+
+def field_stamps(conn, me, uids):
+    # (uid, field) -> (at, origin) of the last change to each field of
+    # `uids`, read in one query per batch rather than one per change.
+    stamps = {}
+    uids = list(uids)
+    for start in range(0, len(uids), STAMP_BATCH):
+        batch = uids[start:start + STAMP_BATCH]
+        for uid, op, at, origin in conn.execute(f"""
+            SELECT uid, op, at, COALESCE(origin, ?) FROM changes WHERE uid IN ({", ".join("?" * len(batch))})
+        """, (me, *batch)):
+            note_stamp(stamps, uid, op, origin, at)
+    return stamps
+
+def note_stamp(stamps, uid, op, origin, at):
+    for field in FIELDS.get(op, ()):
+        last = stamps.get((uid, field))
+        if last is None or (at, origin) > last:
+            stamps[uid, field] = (at, origin)
+
+def winning_fields(stamps, uid, op, origin, at):
+    # The fields `op` writes whose last change is older than this one, or
+    # None for changes that are not field writes (insert, purge).
+    if op == "insert" or op not in FIELDS:
+        return None
+    return [field for field in FIELDS[op]
+            if (uid, field) not in stamps or (at, origin) > stamps[uid, field]]
+
+def apply_change(conn, uid, op, data, at, allocate_id, fields=None):
+    # Returns the (id, url) of a row that still needs its title fetched.
+    # Video changes are keyed by the video's uid, collection changes by the
+    # collection's. `fields` limits a change to the fields it still wins
+    # (see winning_fields); None applies all of it.
+    def wins(field):
+        return fields is None or field in fields
+
+    if op == "insert":
+        if conn.execute("SELECT 1 FROM videos WHERE uid = ?", (uid,)).fetchone():
+            return None
+        deleted = data.get("deleted", 0)
+        cursor = conn.execute("""
+            INSERT INTO videos (id, uid, url, title, tab_index, row_order, watched, is_deleted, deleted_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (allocate_id() if allocate_id else None, uid, data["url"], data["title"],
+              collection_id(conn, data["tab"]), data["order"], data["watched"], deleted, at if deleted else None))
+        if data["title"] == LOADING_TITLE:
+            conn.execute("INSERT OR IGNORE INTO pending_fetches (video_id, url) VALUES (?, ?)", (cursor.lastrowid, data["url"]))
+            return cursor.lastrowid, data["url"]
+    elif op == "title":
+        if wins("title"):
+            conn.execute("UPDATE videos SET title = ? WHERE uid = ?", (data["title"], uid))
+            conn.execute("DELETE FROM pending_fetches WHERE video_id = (SELECT id FROM videos WHERE uid = ?)", (uid,))
+    elif op == "watched":
+        if wins("watched"):
+            conn.execute("UPDATE videos SET watched = ? WHERE uid = ?", (data["watched"], uid))
+    elif op == "order":
+        if wins("order"):
+            conn.execute("UPDATE videos SET row_order = ? WHERE uid = ?", (data["order"], uid))
+    elif op == "move":
+        # Also how a row comes back out of HISTORY, or goes back into it on
+        # undo.
+        if wins("place"):
+            deleted = data.get("deleted", 0)
+            conn.execute("UPDATE videos SET tab_index = ?, is_deleted = ?, deleted_at = ? WHERE uid = ?",
+                         (collection_id(conn, data["tab"]), deleted, at if deleted else None, uid))
+        if wins("order"):
+            conn.execute("UPDATE videos SET row_order = ? WHERE uid = ?", (data["order"], uid))
+    elif op == "delete":
+        if wins("place"):
+            conn.execute("UPDATE videos SET is_deleted = 1, deleted_at = ? WHERE uid = ?", (at, uid))
+    elif op == "collection":
+        if wins("collection"):
+            conn.execute("""
+                INSERT INTO collections (uid, name, position) VALUES (?, ?, ?)
+                ON CONFLICT(uid) DO UPDATE SET name = excluded.name, position = excluded.position
+            """, (uid, data["name"], data["position"]))
+    elif op == "collection_delete":
+        # Whatever is still in it here goes to HISTORY, as it did there. The
+        # last collection on this machine is kept.
+        if not wins("collection") or conn.execute("SELECT COUNT(*) FROM collections").fetchone()[0] <= 1:
+            return None
+        conn.execute("""
+            UPDATE videos SET is_deleted = 1, deleted_at = ?
+            WHERE is_deleted = 0 AND tab_index = (SELECT id FROM collections WHERE uid = ?)
+        """, (at, uid))
+        conn.execute("DELETE FROM collections WHERE uid = ?", (uid,))
+    elif op == "purge":
+        conn.execute("DELETE FROM pending_fetches WHERE video_id = (SELECT id FROM videos WHERE uid = ?)", (uid,))
+        conn.execute("DELETE FROM videos WHERE uid = ?", (uid,))
+    else:
+        raise ValueError(f"Unknown change: {op!r}")
+    return None
+
+def import_changes(conn, path, allocate_id=None):
+    # `conn` must be in autocommit mode; the whole file is applied in one
+    # transaction. Applied changes are journalled here under their origin,
+    # so they travel on to the next machine. `allocate_id` hands out row
+    # ids when the running app owns the id sequence.
+    header, changes = read_changes(path)
+    me = machine_id(conn)
+    applied, skipped, fetches = 0, 0, []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        seen = dict(conn.execute("SELECT origin, last_seq FROM sync_state"))
+        stamps = field_stamps(conn, me, {change[2] for change in changes})
+        for origin, origin_seq, uid, op, data, at in changes:
+            if origin == me or origin_seq <= seen.get(origin, 0):
+                skipped += 1
+                continue
+            # A change that lost every field is still journalled, so it
+            # travels on like the rest, but it counts as skipped.
+            fields = winning_fields(stamps, uid, op, origin, at)
+            if fields == []:
+                skipped += 1
+            else:
+                fetch = apply_change(conn, uid, op, data, at, allocate_id, fields)
+                if fetch:
+                    fetches.append(fetch)
+                applied += 1
+            conn.execute("INSERT INTO changes (origin, origin_seq, uid, op, data, at) VALUES (?, ?, ?, ?, ?, ?)",
+                         (origin, origin_seq, uid, op, encode(data) if data is not None else None, at))
+            note_stamp(stamps, uid, op, origin, at)
+            seen[origin] = origin_seq
+        conn.executemany("INSERT OR REPLACE INTO sync_state (origin, last_seq) VALUES (?, ?)", seen.items())
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return {"applied": applied, "skipped": skipped, "origin": header["origin"], "fetches": fetches}
+
+def main(argv):
+    # export FILE [--since SEQ] [--db PATH] | import FILE [--db PATH]
+    from src.ipc import DB_PATH, request, server_address
+
+    command, args = argv[0], list(argv[1:])
+    options = {}
+    for flag in ("--since", "--db"):
+        if flag in args:
+            position = args.index(flag)
+            options[flag[2:]] = args[position + 1]
+            del args[position:position + 2]
+    if len(args) != 1:
+        print(f"usage: main.py {command} FILE [--since SEQ] [--db PATH]", file=sys.stderr)
+        return 2
+    path = os.path.abspath(args[0])
+    db_path = options.get("db", DB_PATH)
+
+    try:
+        if command == "export":
+            # Reading alongside a running instance is safe under WAL.
+            conn = sqlite3.connect(db_path, isolation_level=None)
+            migrate(conn)
+            result = export_changes(conn, path, int(options.get("since", 0)))
+            conn.close()
+            print(f"Exported {result['changes']} change(s) up to {result['until']}.")
+            return 0
+
+        # A running instance owns the database, so it applies the file.
+        result = request(server_address(db_path), {"cmd": "import", "path": path})
+        if result is None:
+            conn = sqlite3.connect(db_path, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            migrate(conn)
+            result = import_changes(conn, path)
+            conn.close()
+        elif not result.get("ok"):
+            print(result.get("error", "Import failed."), file=sys.stderr)
+            return 1
+        print(f"Applied {result['applied']} change(s), skipped {result['skipped']}.")
+        return 0
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        print(f"{command} failed: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,203 @@
+# Schema migrations keyed on PRAGMA user_version. MIGRATIONS[n] upgrades a
+# database from version n to n + 1; each step runs in its own transaction
+# together with the version bump, so a failed step leaves the previous
+# version intact. Append new steps, never edit shipped ones.
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def create_base_tables(conn):
+    # Databases from before migrations existed may lack the later columns.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT,
+            title TEXT,
+            watched INTEGER DEFAULT 0,
+            tab_index INTEGER DEFAULT 0,
+            row_order INTEGER DEFAULT 0,
+            is_deleted INTEGER DEFAULT 0
+        )
+    """)
+    existing = columns(conn, "videos")
+    for column in ("tab_index", "row_order", "is_deleted"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE videos ADD COLUMN {column} INTEGER DEFAULT 0")
+    conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+
+def create_fetch_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS metadata_cache (
+            video_id TEXT PRIMARY KEY,
+            title TEXT,
+            fetched_at REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pending_fetches (
+            video_id INTEGER PRIMARY KEY,
+            url TEXT,
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT
+        )
+    """)
+
+def create_search_index(conn):
+    # Full-text index over titles and URLs, kept in sync by triggers.
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(title, url, content='videos', content_rowid='id')")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+            INSERT INTO videos_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+            INSERT INTO videos_fts(videos_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF title, url ON videos BEGIN
+            INSERT INTO videos_fts(videos_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+            INSERT INTO videos_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+        END
+    """)
+    conn.execute("INSERT INTO videos_fts(videos_fts) VALUES ('rebuild')")
+
+def add_covering_indexes(conn):
+    # Tabs past the three fixed ones were always shown in the first; fold
+    # them once so the live query can be a plain index range.
+    conn.execute("UPDATE videos SET tab_index = 0 WHERE tab_index >= 3 OR tab_index < 0 OR tab_index IS NULL")
+    # Partial indexes: a row lives in exactly one of them, and each carries
+    # every column its query reads (is_deleted included, or SQLite goes back
+    # to the table to re-check the predicate).
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_videos_live
+        ON videos(tab_index, row_order, id DESC, watched, title, url, is_deleted)
+        WHERE is_deleted = 0
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_videos_history
+        ON videos(id DESC, watched, row_order, title, url, is_deleted)
+        WHERE is_deleted = 1
+    """)
+
+def add_deletion_times(conn):
+    # Retention by age needs to know when a row went to HISTORY; rows already
+    # there start their clock at the upgrade.
+    if "deleted_at" not in columns(conn, "videos"):
+        conn.execute("ALTER TABLE videos ADD COLUMN deleted_at REAL")
+    conn.execute("UPDATE videos SET deleted_at = strftime('%s', 'now') WHERE is_deleted = 1 AND deleted_at IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_deleted_at ON videos(deleted_at) WHERE is_deleted = 1")
+
+def add_change_journal(conn):
+    # Sync between machines: every row gets a global uid, and every change
+    # is appended to `changes` (origin NULL for changes made here). Rows
+    # that predate the journal are entered as inserts, so exporting from 0
+    # carries the whole library. Nothing is ever deleted from `changes`, so
+    # a plain rowid key is already monotonic without AUTOINCREMENT's extra
+    # write per change.
+    if "uid" not in columns(conn, "videos"):
+        conn.execute("ALTER TABLE videos ADD COLUMN uid TEXT")
+    conn.execute("UPDATE videos SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_videos_uid ON videos(uid)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY,
+            origin TEXT,
+            origin_seq INTEGER,
+            uid TEXT NOT NULL,
+            op TEXT NOT NULL,
+            data TEXT,
+            at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS sync_state (origin TEXT PRIMARY KEY, last_seq INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('machine_id', lower(hex(randomblob(8))))")
+    conn.execute("""
+        INSERT INTO changes (uid, op, data, at)
+        SELECT uid, 'insert', json_object('url', url, 'title', title, 'tab', tab_index, 'order', row_order, 'watched', watched),
+               strftime('%s', 'now')
+        FROM videos ORDER BY id
+    """)
+    conn.execute("""
+        INSERT INTO changes (uid, op, data, at)
+        SELECT uid, 'delete', NULL, COALESCE(deleted_at, strftime('%s', 'now')) FROM videos WHERE is_deleted = 1 ORDER BY id
+    """)
+
+def add_collections(conn):
+    # Tabs become rows of their own. videos.tab_index now holds a collection
+    # id; the three fixed tabs are seeded with their old indexes as ids, and
+    # with those indexes as uids so journal entries written before this step
+    # resolve to the same tab on every machine. Rows in HISTORY keep the id
+    # of the collection they came from, so ids are never reused.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS collections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            uid TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            position INTEGER NOT NULL
+        )
+    """)
+    conn.executemany("INSERT OR IGNORE INTO collections (id, uid, name, position) VALUES (?, ?, ?, ?)",
+                     [(i, str(i), f"TAB {i + 1}", i) for i in range(3)])
+
+def add_pending_expansions(conn):
+    # Playlist and channel links still being expanded into videos. `state`
+    # is what the next page needs (NULL until the first page is stored);
+    # the row goes once the last page is in.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pending_expansions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL,
+            tab_index INTEGER NOT NULL,
+            state TEXT,
+            next_order INTEGER NOT NULL,
+            added INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    """)
+
+def add_change_stamps(conn):
+    # Imports look up the newest change to each row's fields before
+    # applying any (journal.field_stamps).
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_uid ON changes(uid, at)")
+
+MIGRATIONS = [
+    create_base_tables,
+    create_fetch_tables,
+    create_search_index,
+    add_covering_indexes,
+    add_deletion_times,
+    add_change_journal,
+    add_collections,
+    add_pending_expansions,
+    add_change_stamps,
+]
+
+def migrate(conn):
+    # `conn` must be in autocommit mode (isolation_level=None).
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0 and conn.execute("SELECT 1 FROM sqlite_master").fetchone() is None:
+        # Only possible before the first table exists; older files are
+        # switched over by VideoRepository.compact().
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return version
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def scans_table(plan, table="videos"):
+    # "SCAN videos" reads every row; "SCAN videos USING COVERING INDEX" and
+    # "SEARCH ..." lines do not.
+    return any(line == f"SCAN {table}" or (line.startswith(f"SCAN {table} ") and "INDEX" not in line)
+               for line in plan)
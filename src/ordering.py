@@ -0,0 +1,20 @@
+# Rows are ordered by sparse integer keys. New keys are spaced ORDER_GAP
+# apart, so a move normally only needs the midpoint of its neighbours and
+# a single UPDATE. When two neighbours are adjacent the tab is rebalanced.
+ORDER_GAP = 1024
+
+def order_between(before, after):
+    # `before`/`after` are the keys of the neighbouring rows, None at the
+    # ends of the list. Returns None when there is no room left.
+    if before is None and after is None:
+        return 0
+    if before is None:
+        return after - ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    if after - before > 1:
+        return (before + after) // 2
+    return None
+
+def spaced_orders(count, start=0):
+    return [start + i * ORDER_GAP for i in range(count)]
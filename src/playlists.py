@@ -0,0 +1,198 @@
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from src import instrumentation
+from src.fetcher import FetchError
+from src.urls import VIDEO_ID_RE
+
+YOUTUBE_URL = "https://www.youtube.com"
+BROWSE_ENDPOINT = "https://www.youtube.com/youtubei/v1/browse"
+CLIENT_NAME = "WEB"
+CLIENT_VERSION = "2.20240101.00.00"
+# Skips the EU consent interstitial, which has no ytInitialData.
+PAGE_COOKIES = {"CONSENT": "YES+"}
+PAGE_HEADERS = {"Accept-Language": "en"}
+
+MAX_WORKERS = 2
+PAGE_CHUNK = 64 * 1024
+MAX_PAGE_BYTES = 8 * 1024 * 1024
+
+INITIAL_DATA_RE = re.compile(r"""(?:var\s+ytInitialData|window\[["']ytInitialData["']\])\s*=\s*""")
+API_KEY_RE = re.compile(r'"INNERTUBE_API_KEY"\s*:\s*"([^"]+)"')
+CLIENT_VERSION_RE = re.compile(r'"INNERTUBE_CLIENT_VERSION"\s*:\s*"([^"]+)"')
+VIDEO_RENDERERS = ("playlistVideoRenderer", "videoRenderer", "gridVideoRenderer")
+
+def initial_data(html):
+    # The page's first batch of videos, as the JSON object it assigns to
+    # ytInitialData.
+    match = INITIAL_DATA_RE.search(html)
+    if match is None:
+        raise FetchError("No video list in page")
+    try:
+        return json.JSONDecoder().raw_decode(html, match.end())[0]
+    except ValueError:
+        raise FetchError("Malformed video list in page")
+
+def client_state(html):
+    # What continuation requests need from the page: the API key and the
+    # client version it was served for.
+    key = API_KEY_RE.search(html)
+    version = CLIENT_VERSION_RE.search(html)
+    return {"key": key.group(1) if key else None, "version": version.group(1) if version else CLIENT_VERSION}
+
+def text_of(value):
+    # {"simpleText": ...}, {"runs": [{"text": ...}, ...]} or {"content": ...}
+    if not isinstance(value, dict):
+        return None
+    if "simpleText" in value:
+        return value["simpleText"]
+    if "runs" in value:
+        return "".join(run.get("text", "") for run in value["runs"])
+    return value.get("content")
+
+def continuation_token(value):
+    if isinstance(value, dict):
+        command = value.get("continuationCommand")
+        if isinstance(command, dict) and command.get("token"):
+            return command["token"]
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            token = continuation_token(item)
+            if token:
+                return token
+    return None
+
+def page_entries(data):
+    # A list page or continuation response -> ([(video_id, title), ...],
+    # token for the next page or None). The tree is walked rather than
+    # followed down one fixed path: YouTube moves these renderers around
+    # often, but the renderers themselves stay put.
+    entries, tokens = [], []
+
+    def walk(value):
+        if isinstance(value, list):
+            for item in value:
+                walk(item)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                if not isinstance(item, (dict, list)):
+                    continue
+                if key in VIDEO_RENDERERS and isinstance(item, dict) and "videoId" in item:
+                    entries.append((item["videoId"], text_of(item.get("title"))))
+                elif key == "lockupViewModel" and isinstance(item, dict) and item.get("contentType") == "LOCKUP_CONTENT_TYPE_VIDEO":
+                    metadata = item.get("metadata", {}).get("lockupMetadataViewModel", {})
+                    entries.append((item.get("contentId"), text_of(metadata.get("title"))))
+                elif key == "continuationItemRenderer":
+                    token = continuation_token(item)
+                    if token:
+                        tokens.append(token)
+                else:
+                    walk(item)
+
+    walk(data)
+    entries = [(video_id, title or None) for video_id, title in entries
+               if isinstance(video_id, str) and VIDEO_ID_RE.match(video_id)]
+    return entries, tokens[-1] if tokens else None
+
+def new_entries(entries, seen):
+    # Entries whose video is not in `seen`, which they are added to. A
+    # playlist may hold a video more than once, and pages can overlap when
+    # the list changes between requests.
+    fresh = []
+    for video_id, title in entries:
+        if video_id not in seen:
+            seen.add(video_id)
+            fresh.append((video_id, title))
+    return fresh
+
+class PlaylistExpander(QObject):
+    # Turns playlist and channel pages into pages of (video_id, title).
+    # Expansions share a small pool of their own so title and thumbnail
+    # fetches keep flowing. A list's pages are chained by continuation
+    # tokens, so each expansion fetches its next page while the GUI thread
+    # stores the last one. `state` is what a resumed expansion needs to
+    # fetch on: the next token and the client it belongs to ("" after the
+    # last page). `videos` are the ones it already delivered.
+    page_ready = pyqtSignal(int, list, str)
+    expansion_failed = pyqtSignal(int, str)
+
+    def __init__(self, fetcher, max_workers=MAX_WORKERS, base_url=YOUTUBE_URL, browse_endpoint=BROWSE_ENDPOINT):
+        super().__init__()
+        self.fetcher = fetcher
+        self.base_url = base_url
+        self.browse_endpoint = browse_endpoint
+        self.cancelled = set()
+        self.stopped = False
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lavida-expand")
+
+    def start(self, expansion_id, path, state=None, videos=()):
+        self.cancelled.discard(expansion_id)
+        return self.executor.submit(self.run, expansion_id, path, state, videos)
+
+    def cancel(self, expansion_id):
+        # Takes effect before the next page is fetched; a page already in
+        # flight is dropped by the receiver.
+        self.cancelled.add(expansion_id)
+
+    def shutdown(self):
+        self.stopped = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def active(self, expansion_id):
+        return not self.stopped and expansion_id not in self.cancelled
+
+    def run(self, expansion_id, path, state, videos=()):
+        try:
+            if state:
+                state = json.loads(state)
+                data = self.fetch_continuation(state)
+            else:
+                html = self.fetch_page(self.base_url + path)
+                data, state = initial_data(html), client_state(html)
+            seen, videos = set(), set(videos)
+            while self.active(expansion_id):
+                entries, token = page_entries(data)
+                if token in seen:
+                    token = None
+                state = dict(state, continuation=token)
+                self.page_ready.emit(expansion_id, new_entries(entries, videos), json.dumps(state) if token else "")
+                if token is None:
+                    return
+                seen.add(token)
+                data = self.fetch_continuation(state)
+        except Exception as e:
+            if self.active(expansion_id):
+                self.expansion_failed.emit(expansion_id, str(e))
+
+    def fetch_page(self, url):
+        with instrumentation.span("fetch.list_page"):
+            return self.fetcher.retrying(self.fetch_page_once, url)
+
+    def fetch_page_once(self, url):
+        data = bytearray()
+        with self.fetcher.get(url, stream=True, headers=PAGE_HEADERS, cookies=PAGE_COOKIES) as response:
+            for chunk in response.iter_content(PAGE_CHUNK):
+                data += chunk
+                if len(data) > MAX_PAGE_BYTES:
+                    raise FetchError(f"Page too large: {url}")
+        return data.decode("utf-8", errors="replace")
+
+    def fetch_continuation(self, state):
+        with instrumentation.span("fetch.list_page"):
+            return self.fetcher.retrying(self.fetch_continuation_once, state)
+
+    def fetch_continuation_once(self, state):
+        params = {"prettyPrint": "false"}
+        if state.get("key"):
+            params["key"] = state["key"]
+        payload = {"context": {"client": {"clientName": CLIENT_NAME, "clientVersion": state["version"], "hl": "en"}},
+                   "continuation": state["continuation"]}
+        with self.fetcher.request("POST", self.browse_endpoint, params=params, json=payload, headers=PAGE_HEADERS) as response:
+            try:
+                return response.json()
+            except ValueError:
+                raise FetchError(f"Malformed continuation page for {self.browse_endpoint}")
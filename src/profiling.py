@@ -0,0 +1,77 @@
+import sys
+import time
+from collections import deque
+
+PROFILE_PATH = "startup_profile.txt"
+FRAME_HISTORY = 1000
+
+class StartupProfile:
+    # Records named phases relative to process start-up (the moment main.py
+    # began importing) and writes a per-phase breakdown once start-up is done.
+    def __init__(self, started_at=None, path=PROFILE_PATH):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.path = path
+        self.marks = []
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter()))
+
+    def elapsed(self, phase):
+        for name, at in self.marks:
+            if name == phase:
+                return (at - self.started_at) * 1000
+        return None
+
+    def report(self):
+        lines = [f"{'phase':<28}{'delta ms':>10}{'total ms':>10}"]
+        previous = self.started_at
+        for phase, at in self.marks:
+            lines.append(f"{phase:<28}{(at - previous) * 1000:>10.1f}{(at - self.started_at) * 1000:>10.1f}")
+            previous = at
+        return "\n".join(lines)
+
+    def write(self):
+        report = self.report()
+        with open(self.path, "w") as f:
+            f.write(report + "\n")
+        print(report, file=sys.stderr)
+
+class NullProfile:
+    def mark(self, phase):
+        pass
+
+    def write(self):
+        pass
+
+class FrameTimer:
+    # Render time of each whole-window frame and the gap since the previous
+    # one, for the last FRAME_HISTORY frames.
+    def __init__(self, capacity=FRAME_HISTORY):
+        self.durations = deque(maxlen=capacity)
+        self.intervals = deque(maxlen=capacity)
+        self.last_started = None
+
+    def record(self, started, ended):
+        if self.last_started is not None:
+            self.intervals.append(started - self.last_started)
+        self.last_started = started
+        self.durations.append(ended - started)
+
+    def reset(self):
+        self.durations.clear()
+        self.intervals.clear()
+        self.last_started = None
+
+    def stats(self):
+        if not self.durations:
+            return {"frames": 0}
+        durations = sorted(self.durations)
+        def percentile(p):
+            return durations[min(len(durations) - 1, int(len(durations) * p))] * 1000
+        return {
+            "frames": len(durations),
+            "mean_ms": round(sum(durations) / len(durations) * 1000, 2),
+            "p50_ms": round(percentile(0.5), 2),
+            "p95_ms": round(percentile(0.95), 2),
+            "max_ms": round(durations[-1] * 1000, 2),
+        }
@@ -0,0 +1,67 @@
+import queue
+import re
+import sqlite3
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_STOP = object()
+
+def build_match_query(text):
+    # "lofi bea" -> '"lofi"* "bea"*': every word must match as a prefix.
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+class SearchService(QObject):
+    # Runs FTS5 queries on its own connection and thread. Only the newest
+    # query is executed; stale ones queued behind it are dropped.
+    results_ready = pyqtSignal(int, object)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.requests = queue.Queue()
+        self.generation = 0
+        self.thread = threading.Thread(target=self.run, name="lavida-search", daemon=True)
+        self.thread.start()
+
+    def search(self, text):
+        self.generation += 1
+        self.requests.put((self.generation, text))
+        return self.generation
+
+    def close(self):
+        self.requests.put(_STOP)
+
+    def run(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA busy_timeout=5000")
+        while True:
+            request = self.requests.get()
+            while request is not _STOP:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    break
+            if request is _STOP:
+                break
+
+            generation, text = request
+            ids = self.match(conn, text)
+            self.results_ready.emit(generation, ids)
+        conn.close()
+
+    def match(self, conn, text):
+        match = build_match_query(text)
+        if match is None:
+            return None
+        try:
+            return {row[0] for row in conn.execute("SELECT rowid FROM videos_fts WHERE videos_fts MATCH ?", (match,))}
+        except sqlite3.Error:
+            return set()
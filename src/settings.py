@@ -0,0 +1,54 @@
+from PyQt6.QtCore import QObject, QTimer
+
+FLUSH_DELAY_MS = 1000
+
+class Settings(QObject):
+    # In-memory view of the `settings` table. Loaded with one query; changes
+    # are tracked per key and written back in a single transaction after
+    # FLUSH_DELAY_MS of quiet, or immediately on flush().
+    def __init__(self, db, delay=FLUSH_DELAY_MS):
+        super().__init__()
+        self.db = db
+        self.values = db.load_settings()
+        self.dirty = set()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.flush)
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_int(self, key, default=None):
+        try:
+            return int(self.values[key])
+        except (KeyError, ValueError):
+            return default
+
+    def get_bool(self, key, default=False):
+        value = self.values.get(key)
+        if value is None:
+            return default
+        return value in ("1", "true", "True")
+
+    def set(self, key, value):
+        if isinstance(value, bool):
+            value = int(value)
+        value = str(value)
+        if self.values.get(key) == value:
+            return
+        self.values[key] = value
+        self.dirty.add(key)
+        self.timer.start()
+
+    def update(self, values):
+        for key, value in values.items():
+            self.set(key, value)
+
+    def flush(self):
+        self.timer.stop()
+        if not self.dirty:
+            return
+        self.db.save_settings({key: self.values[key] for key in self.dirty})
+        self.dirty.clear()
@@ -0,0 +1,212 @@
+import os
+import threading
+from collections import deque
+
+from PyQt6.QtCore import QObject, QRect, QRunnable, QSize, QThreadPool, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap, QPixmapCache
+
+THUMBNAIL_URL = "https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"
+THUMB_DIR = "thumbnails"
+THUMB_SIZE = QSize(56, 32)
+DISK_CAPACITY = 64 * 1024 * 1024
+MEMORY_CAPACITY_KB = 4 * 1024
+MAX_THUMB_BYTES = 512 * 1024
+DECODE_THREADS = 2
+FETCH_THREADS = 2
+# Downloads waiting for a fetch thread. Rows painted longest ago fall off
+# the bottom once more than this are waiting.
+FETCH_STACK = 64
+
+class ThumbnailStore:
+    # Thumbnail files on disk keyed by video id. Reads refresh the mtime and
+    # writes evict the least recently used files once the directory grows
+    # past `capacity`. Shared by fetch and decode threads.
+    def __init__(self, directory, capacity=DISK_CAPACITY):
+        self.directory = directory
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.sizes = None
+        self.total = 0
+
+    def path(self, video_id):
+        return os.path.join(self.directory, video_id + ".jpg")
+
+    def contains(self, video_id):
+        return os.path.exists(self.path(video_id))
+
+    def touch(self, video_id):
+        try:
+            os.utime(self.path(video_id))
+        except OSError:
+            pass
+
+    def write(self, video_id, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(video_id)
+        partial = f"{path}.{threading.get_ident()}.part"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+
+        with self.lock:
+            # The directory is only scanned once something is written, so
+            # start-up never pays for it.
+            if self.sizes is None:
+                self.scan()
+            self.total += len(data) - self.sizes.get(video_id, 0)
+            self.sizes[video_id] = len(data)
+            if self.total > self.capacity:
+                self.evict()
+
+    def scan(self):
+        self.sizes = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name.endswith(".jpg"):
+                self.sizes[entry.name[:-4]] = entry.stat().st_size
+        self.total = sum(self.sizes.values())
+
+    def evict(self):
+        def last_used(video_id):
+            try:
+                return os.stat(self.path(video_id)).st_mtime
+            except OSError:
+                return 0
+        # Trim to 90% so a full cache does not evict on every write.
+        for video_id in sorted(self.sizes, key=last_used):
+            if self.total <= self.capacity * 0.9:
+                break
+            try:
+                os.remove(self.path(video_id))
+            except OSError:
+                pass
+            self.total -= self.sizes.pop(video_id)
+
+class DecodeTask(QRunnable):
+    def __init__(self, loader, video_id):
+        super().__init__()
+        self.loader = loader
+        self.video_id = video_id
+
+    def run(self):
+        path = self.loader.store.path(self.video_id)
+        self.loader.store.touch(self.video_id)
+        # Let the JPEG decoder scale while decoding and crop to the card's
+        # aspect ratio, so the full-size image never exists in memory.
+        reader = QImageReader(path)
+        target = self.loader.size
+        source = reader.size()
+        if source.isValid():
+            scaled = source.scaled(target, Qt.AspectRatioMode.KeepAspectRatioByExpanding)
+            reader.setScaledSize(scaled)
+            reader.setScaledClipRect(QRect((scaled.width() - target.width()) // 2,
+                                           (scaled.height() - target.height()) // 2,
+                                           target.width(), target.height()))
+        self.loader.decoded.emit(self.video_id, reader.read())
+
+class ThumbnailLoader(QObject):
+    # GUI-side front of the thumbnail cache. pixmap() is called from paint
+    # and never blocks: it answers from QPixmapCache or returns None and
+    # starts a download or a decode, emitting `ready` when the pixmap is in.
+    # Downloads wait on a stack, newest on top, and go out FETCH_THREADS at
+    # a time as the host's rate limit allows; the fetch threads never sleep
+    # on it. prune() drops the ones for rows scrolled out of view.
+    ready = pyqtSignal(str)
+    decoded = pyqtSignal(str, QImage)
+
+    def __init__(self, store, size=THUMB_SIZE, memory_kb=MEMORY_CAPACITY_KB, threads=DECODE_THREADS,
+                 fetch_threads=FETCH_THREADS, stack_size=FETCH_STACK):
+        super().__init__()
+        self.store = store
+        self.size = size
+        self.fetcher = None
+        self.pending = set()
+        self.failed = set()
+        self.waiting = deque()
+        self.fetching = 0
+        self.fetch_threads = fetch_threads
+        self.stack_size = stack_size
+        self.fetch_timer = QTimer(self)
+        self.fetch_timer.setSingleShot(True)
+        self.fetch_timer.timeout.connect(self.start_fetches)
+
+        QPixmapCache.setCacheLimit(memory_kb)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(threads)
+        self.decoded.connect(self.on_decoded)
+
+    def key(self, video_id):
+        return "thumb:" + video_id
+
+    def set_fetcher(self, fetcher):
+        self.fetcher = fetcher
+        fetcher.thumbnail_fetched.connect(self.on_fetched)
+        fetcher.thumbnail_failed.connect(self.on_failed)
+
+    def pixmap(self, video_id):
+        pixmap = QPixmapCache.find(self.key(video_id))
+        if pixmap is not None or video_id in self.pending or video_id in self.failed:
+            return pixmap
+
+        if self.store.contains(video_id):
+            self.pending.add(video_id)
+            self.pool.start(DecodeTask(self, video_id))
+        elif self.fetcher is not None:
+            # Before start-up finishes there is no fetcher; the row asks
+            # again the next time it is painted.
+            self.pending.add(video_id)
+            self.waiting.append(video_id)
+            if len(self.waiting) > self.stack_size:
+                self.pending.discard(self.waiting.popleft())
+            self.start_fetches()
+        return None
+
+    def prune(self, visible):
+        # Waiting downloads for video ids not in `visible` are dropped; a
+        # row asks again if it is painted again.
+        kept = deque()
+        for video_id in self.waiting:
+            if video_id in visible:
+                kept.append(video_id)
+            else:
+                self.pending.discard(video_id)
+        self.waiting = kept
+
+    def start_fetches(self):
+        while self.waiting and self.fetching < self.fetch_threads and not self.fetch_timer.isActive():
+            delay = self.fetcher.thumbnail_delay()
+            if delay > 0:
+                self.fetch_timer.start(int(delay * 1000) + 1)
+                return
+            self.fetching += 1
+            self.fetcher.fetch_thumbnail(self.waiting.pop())
+
+    def on_fetched(self, video_id):
+        self.fetching -= 1
+        self.start_fetches()
+        if video_id in self.pending:
+            self.pool.start(DecodeTask(self, video_id))
+
+    def on_failed(self, video_id):
+        self.fetching -= 1
+        self.start_fetches()
+        self.pending.discard(video_id)
+        self.failed.add(video_id)
+
+    def on_decoded(self, video_id, image):
+        self.pending.discard(video_id)
+        if image.isNull():
+            self.failed.add(video_id)
+            return
+        QPixmapCache.insert(self.key(video_id), QPixmap.fromImage(image))
+        self.ready.emit(video_id)
+
+    def shutdown(self):
+        # A decode still running would emit into a deleted loader.
+        self.fetch_timer.stop()
+        self.waiting.clear()
+        self.pool.clear()
+        self.pool.waitForDone(1000)
@@ -0,0 +1,71 @@
+from PyQt6.QtCore import Qt, QRect, QRectF
+from PyQt6.QtGui import QImage, QPainter, QPixmap
+from PyQt6.QtWidgets import QGraphicsScene, QGraphicsBlurEffect
+
+GLOW_BLUR = 20
+FRAME_RADIUS = 12
+
+def build_glow_patch(color, blur=GLOW_BLUR, radius=FRAME_RADIUS):
+    # A blurred rounded rect just large enough for four corners and a 1px
+    # edge; any frame size is drawn from it as a nine-patch. The blur runs
+    # once here instead of on every repaint.
+    inner = 2 * radius + 1
+    size = inner + 2 * blur
+    shape = QPixmap(size, size)
+    shape.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(shape)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.setBrush(color)
+    painter.drawRoundedRect(QRectF(blur, blur, inner, inner), radius, radius)
+    painter.end()
+
+    scene = QGraphicsScene()
+    item = scene.addPixmap(shape)
+    effect = QGraphicsBlurEffect()
+    effect.setBlurRadius(blur)
+    effect.setBlurHints(QGraphicsBlurEffect.BlurHint.QualityHint)
+    item.setGraphicsEffect(effect)
+
+    image = QImage(size, size, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    scene.render(painter, QRectF(0, 0, size, size), QRectF(0, 0, size, size))
+    painter.end()
+    return QPixmap.fromImage(image)
+
+def paint_nine_patch(painter, target, patch, corner):
+    # Corners are copied as-is, edges and centre are stretched.
+    w, h = patch.width(), patch.height()
+    xs = [(0, corner, target.left(), corner),
+          (corner, w - 2 * corner, target.left() + corner, target.width() - 2 * corner),
+          (w - corner, corner, target.right() + 1 - corner, corner)]
+    ys = [(0, corner, target.top(), corner),
+          (corner, h - 2 * corner, target.top() + corner, target.height() - 2 * corner),
+          (h - corner, corner, target.bottom() + 1 - corner, corner)]
+    for sx, sw, tx, tw in xs:
+        for sy, sh, ty, th in ys:
+            if tw > 0 and th > 0:
+                painter.drawPixmap(QRect(tx, ty, tw, th), patch, QRect(sx, sy, sw, sh))
+
+class GlowCache:
+    # The glow around a frame of a given size, composed from the nine-patch
+    # and kept until the size (or colour) changes.
+    def __init__(self, color, blur=GLOW_BLUR, radius=FRAME_RADIUS):
+        self.blur = blur
+        self.radius = radius
+        self.set_color(color)
+
+    def set_color(self, color):
+        self.patch = build_glow_patch(color, self.blur, self.radius)
+        self.pixmap = None
+
+    def for_size(self, size):
+        width, height = size.width() + 2 * self.blur, size.height() + 2 * self.blur
+        if self.pixmap is None or self.pixmap.width() != width or self.pixmap.height() != height:
+            self.pixmap = QPixmap(width, height)
+            self.pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(self.pixmap)
+            paint_nine_patch(painter, QRect(0, 0, width, height), self.patch, self.blur + self.radius)
+            painter.end()
+        return self.pixmap
@@ -1,22 +1,81 @@
-import sqlite3
-import requests
-import threading
-from bs4 import BeautifulSoup
+import os
+import time
 
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QLabel, QPushButton, QTabWidget, 
-                             QVBoxLayout, QHBoxLayout, QFrame, QGraphicsDropShadowEffect, 
-                             QApplication, QListWidgetItem) 
-from PyQt6.QtCore import Qt, pyqtSignal, QPoint, QRect, QSize
-from PyQt6.QtGui import QColor, QCursor
+                             QVBoxLayout, QHBoxLayout, QFrame,
+                             QApplication, QLineEdit, QMenu, QInputDialog, QMessageBox) 
+from PyQt6.QtCore import Qt, QPoint, QRect, QTimer, QEvent
+from PyQt6.QtGui import QCursor, QKeySequence, QPainter
 
-from src.workers import GlobalInputListener
-from src.ui.widgets import VideoCard, DraggableListWidget
+from src import instrumentation
+from src.cache import MetadataCache
+from src.database import VideoRepository, DB_PATH, LOADING_TITLE
+from src.ordering import ORDER_GAP
+from src.ingest import urls_from_mime, dedupe_urls
+from src.ipc import server_address
+from src.urls import extract_video_id, is_youtube_url, canonical_url, list_page_path
+from src.ui.widgets import DraggableListWidget, TabPage
+from src.profiling import NullProfile, FrameTimer
+from src.search import SearchService
+from src.settings import Settings
+from src.thumbnails import ThumbnailStore, ThumbnailLoader, THUMB_DIR
+from src.ui.models import VideoRow, VideoIndex, newest_first
+from src.ui.theme import Theme, available_themes, set_state, DEFAULT_THEME
+from src.ui.effects import GlowCache
+from src.ui.overlay import InstrumentationOverlay, StallDetector
 
-class LavidaApp(QMainWindow):
-    update_title_signal = pyqtSignal(str, int, int) 
+MAX_FETCH_ATTEMPTS = 5
+MAX_EXPANSION = 5000
+INSERT_CHUNK = 100
+SEARCH_DEBOUNCE_MS = 150
+HISTORY_PAGE = 200
+# Retention is opt-in: 0 keeps every row (settings history_max_rows/_days).
+HISTORY_MAX_ROWS = 0
+HISTORY_MAX_DAYS = 0
+PURGE_BATCH = 5000
+PURGE_INTERVAL_MS = 60 * 60 * 1000
+TAB_IDLE_MS = 10 * 60 * 1000
+RELEASE_CHECK_MS = 60 * 1000
+THEME_SHORTCUT = "Ctrl+Shift+T"
+LOW_POWER_SHORTCUT = "Ctrl+Shift+L"
+OVERLAY_SHORTCUT = "Ctrl+Shift+P"
+SELECT_WATCHED_SHORTCUT = "Ctrl+Shift+W"
+DEFAULT_REFRESH_RATE = 60
+LOW_POWER_FPS = 30
+
+def is_int(value):
+    # JSON true and false arrive as bools, which isinstance counts as ints.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def command_failed(request, error):
+    return {"ok": False, "error": f"{request.get('cmd')!r} failed: {error}"}
 
-    def __init__(self):
+class LavidaApp(QMainWindow):
+    def __init__(self, profile=None, db_path=DB_PATH, fetcher_options=None, expander_options=None,
+                 enable_listener=True, report_frames=False):
         super().__init__()
+        self.profile = profile or NullProfile()
+        self.frame_timer = FrameTimer()
+        self.report_frames = report_frames
+        self.fetcher_options = fetcher_options or {}
+        self.expander_options = expander_options or {}
+        self.enable_listener = enable_listener
+        self.startup_done = False
+        self.first_paint_done = False
+        self.fetcher = None
+        self.expander = None
+        # Playlists and channels being expanded: id -> collection, the sort
+        # key of its first and next row, and how many rows are in.
+        self.expansions = {}
+        self.listener = None
+        self.command_server = None
+        # The one-step undo: how the rows of the last batch looked before it.
+        self.last_batch = None
+        # Tracing that was on from the command line outlives the overlay.
+        self.traced = instrumentation.RECORDER.enabled
+        self.stall_detector = StallDetector(self)
+        if self.traced:
+            self.stall_detector.start()
         
         self.setWindowTitle("Lavida")
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | 
@@ -30,25 +89,167 @@ class LavidaApp(QMainWindow):
         self.setAcceptDrops(True)
         self.setMouseTracking(True) 
 
-        self.init_db()
+        self.video_index = VideoIndex()
+        self.db = VideoRepository(db_path)
+        self.db.write_committed.connect(self.on_write_committed)
+        self.db.write_failed.connect(self.on_write_failed)
+        self.metadata_cache = MetadataCache(self.db)
+        self.search_service = SearchService(self.db.path)
+        self.search_service.results_ready.connect(self.on_search_results)
+        self.search_generation = 0
+        self.search_ids = None
+        self.thumbnail_store = ThumbnailStore(os.path.join(os.path.dirname(os.path.abspath(db_path)), THUMB_DIR))
+        self.thumbnails = ThumbnailLoader(self.thumbnail_store)
+        self.thumbnails.ready.connect(self.on_thumbnail_ready)
+        self.profile.mark("database")
         
         if not self.load_settings():
             self.position_left_center()
+        self.theme = Theme(self.settings.get("theme", DEFAULT_THEME))
+        self.theme.install()
+        self.low_power = self.settings.get_bool("low_power")
 
         self.setup_ui()
-        self.load_data()
-
-        self.update_title_signal.connect(self.update_item_title)
-
-        self.listener = GlobalInputListener()
-        self.listener.toggle_signal.connect(self.toggle_visibility)
-        self.listener.start()
+        self.tabs.setCurrentIndex(self.settings.get_int("current_tab", 0))
+        self.profile.mark("setup_ui")
+        # Only the tab on screen is read; the rest wait until they are shown.
+        self.current_page = None
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.on_tab_changed(self.tabs.currentIndex())
+        # Snapshot before any drop of this session can add its own entries.
+        self.startup_fetches = self.db.pending_fetches()
+        self.profile.mark("active_tab")
         
         self.resize_margin = 10       
         self.current_edge = None      
         self.is_resizing = False      
         self.old_pos = None           
 
+        # Drags and resizes only record where the window should go; the
+        # geometry is applied at most once per display frame.
+        self.pending_geometry = None
+        self.last_geometry_at = 0.0
+        self.geometry_timer = QTimer(self)
+        self.geometry_timer.setSingleShot(True)
+        self.geometry_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.geometry_timer.timeout.connect(self.apply_pending_geometry)
+
+        # Everything else waits until the first frame is on screen (or, if
+        # the window starts hidden, until the event loop is running).
+        QTimer.singleShot(0, self.schedule_startup)
+
+    def event(self, event):
+        # UpdateRequest is one whole-window frame: every widget that asked
+        # for a repaint is drawn and the result is flushed.
+        if event.type() != QEvent.Type.UpdateRequest:
+            return super().event(event)
+        started = time.perf_counter()
+        result = super().event(event)
+        ended = time.perf_counter()
+        self.frame_timer.record(started, ended)
+        instrumentation.record("gui.frame", (ended - started) * 1000)
+        return result
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.low_power:
+            painter = QPainter(self)
+            frame = self.main_frame.geometry().translated(self.central_widget.pos())
+            painter.drawPixmap(frame.x() - self.glow.blur, frame.y() - self.glow.blur, self.glow.for_size(frame.size()))
+            painter.end()
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            self.profile.mark("first_paint")
+            QTimer.singleShot(0, self.finish_startup)
+
+    def schedule_startup(self):
+        if not self.isVisible() or self.first_paint_done:
+            self.finish_startup()
+
+    def finish_startup(self):
+        if self.startup_done:
+            return
+        self.startup_done = True
+
+        self.check_empty_state()
+        self.release_timer = QTimer(self)
+        self.release_timer.setInterval(RELEASE_CHECK_MS)
+        self.release_timer.timeout.connect(self.release_idle_tabs)
+        self.release_timer.start()
+
+        self.metadata_cache.seed_from_videos()
+        self.get_fetcher()
+        self.retry_pending_fetches(self.startup_fetches)
+        self.resume_expansions()
+        self.profile.mark("fetcher")
+
+        self.start_listener()
+        self.profile.mark("listener")
+
+        from src.ipc_server import CommandServer
+        self.command_server = CommandServer(server_address(self.db.path), self.run_commands)
+        if not self.command_server.listen():
+            print(f"Command socket unavailable: {self.command_server.server.errorString()}")
+        self.profile.mark("command_server")
+
+        self.purge_timer = QTimer(self)
+        self.purge_timer.setInterval(PURGE_INTERVAL_MS)
+        self.purge_timer.timeout.connect(self.purge_history)
+        self.purge_timer.start()
+        QTimer.singleShot(0, self.purge_history)
+        self.profile.write()
+
+    def get_fetcher(self):
+        if self.fetcher is None:
+            # requests is only imported once something needs the network.
+            from src.fetcher import MetadataFetcher
+            self.fetcher = MetadataFetcher(thumbnails=self.thumbnail_store, **self.fetcher_options)
+            self.fetcher.title_fetched.connect(self.on_title_fetched)
+            self.fetcher.fetch_failed.connect(self.on_fetch_failed)
+            self.thumbnails.set_fetcher(self.fetcher)
+        return self.fetcher
+
+    def get_expander(self):
+        if self.expander is None:
+            from src.playlists import PlaylistExpander
+            self.expander = PlaylistExpander(self.get_fetcher(), **self.expander_options)
+            self.expander.page_ready.connect(self.on_expansion_page)
+            self.expander.expansion_failed.connect(self.on_expansion_failed)
+        return self.expander
+
+    def start_listener(self):
+        if not self.enable_listener:
+            return
+        from src.workers import GlobalInputListener, DEFAULT_TRIGGERS, DEBOUNCE
+        debounce = self.settings.get_int("gesture_debounce_ms", int(DEBOUNCE * 1000)) / 1000
+        try:
+            listener = GlobalInputListener(self.settings.get("gesture_triggers", DEFAULT_TRIGGERS), debounce)
+        except ValueError as e:
+            print(f"{e}; using {DEFAULT_TRIGGERS!r}")
+            listener = GlobalInputListener(DEFAULT_TRIGGERS, debounce)
+        listener.toggle_signal.connect(self.toggle_visibility)
+        if self.isActiveWindow() and self.settings.get_bool("gesture_pause_on_focus", True):
+            listener.pause()
+        try:
+            listener.start()
+        except Exception as e:
+            # pynput needs a running display server; the widget still works
+            # without the global gesture.
+            print(f"Global input listener unavailable: {e}")
+            return
+        self.listener = listener
+
+    def changeEvent(self, event):
+        # While the window has focus the gesture is not needed, so the scroll
+        # hook is removed instead of filtering every tick.
+        if (event.type() == QEvent.Type.ActivationChange and self.listener
+                and self.settings.get_bool("gesture_pause_on_focus", True)):
+            if self.isActiveWindow():
+                self.listener.pause()
+            else:
+                self.listener.resume()
+        super().changeEvent(event)
+
     def position_left_center(self):
         screen = QApplication.primaryScreen().geometry()
         new_y = (screen.height() - self.height()) // 2
@@ -65,6 +266,7 @@ class LavidaApp(QMainWindow):
             else:
                 self.is_resizing = False
                 self.old_pos = event.globalPosition().toPoint()
+                self.start_pos = self.pos()
 
     def mouseMoveEvent(self, event):
         if not self.is_resizing and not self.old_pos:
@@ -91,15 +293,45 @@ class LavidaApp(QMainWindow):
                 h += dy
             
             if w > self.minimumWidth() and h > self.minimumHeight():
-                self.setGeometry(int(x), int(y), int(w), int(h))
+                self.schedule_geometry(QRect(int(x), int(y), int(w), int(h)))
 
         elif self.old_pos:
             delta = QPoint(event.globalPosition().toPoint() - self.old_pos)
-            self.move(self.x() + delta.x(), self.y() + delta.y())
-            self.old_pos = event.globalPosition().toPoint()
+            self.schedule_geometry(QRect(self.start_pos + delta, self.size()))
+
+    def frame_interval(self):
+        screen = self.screen()
+        rate = (screen.refreshRate() if screen else 0) or DEFAULT_REFRESH_RATE
+        if self.low_power:
+            rate = min(rate, LOW_POWER_FPS)
+        return 1.0 / rate
+
+    def schedule_geometry(self, rect):
+        # The first event of a burst applies at once; later ones only
+        # replace the target until the next frame is due.
+        self.pending_geometry = rect
+        if self.geometry_timer.isActive():
+            return
+        wait = self.last_geometry_at + self.frame_interval() - time.perf_counter()
+        if wait <= 0:
+            self.apply_pending_geometry()
+        else:
+            self.geometry_timer.start(max(1, round(wait * 1000)))
+
+    def apply_pending_geometry(self):
+        self.geometry_timer.stop()
+        if self.pending_geometry is None:
+            return
+        rect, self.pending_geometry = self.pending_geometry, None
+        self.last_geometry_at = time.perf_counter()
+        if rect.size() == self.size():
+            self.move(rect.topLeft())
+        else:
+            self.setGeometry(rect)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
+            self.apply_pending_geometry()
             self.is_resizing = False
             self.old_pos = None
             self.current_edge = None
@@ -135,58 +367,31 @@ class LavidaApp(QMainWindow):
             self.setCursor(Qt.CursorShape.SizeVerCursor)
 
     def save_settings(self):
-        self.cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('pos_x', ?)", (str(self.x()),))
-        self.cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('pos_y', ?)", (str(self.y()),))
-        self.cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('width', ?)", (str(self.width()),))
-        self.cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('height', ?)", (str(self.height()),))
-        self.conn.commit()
+        # Only changed keys are marked dirty; the store coalesces the write.
+        self.settings.update({"pos_x": self.x(), "pos_y": self.y(),
+                              "width": self.width(), "height": self.height()})
 
     def load_settings(self):
-        try:
-            self.cursor.execute("SELECT value FROM settings WHERE key='pos_x'")
-            row_x = self.cursor.fetchone()
-            self.cursor.execute("SELECT value FROM settings WHERE key='pos_y'")
-            row_y = self.cursor.fetchone()
-            
-            self.cursor.execute("SELECT value FROM settings WHERE key='width'")
-            row_w = self.cursor.fetchone()
-            self.cursor.execute("SELECT value FROM settings WHERE key='height'")
-            row_h = self.cursor.fetchone()
+        self.settings = Settings(self.db)
+        x, y = self.settings.get_int("pos_x"), self.settings.get_int("pos_y")
+        w, h = self.settings.get_int("width"), self.settings.get_int("height")
 
-            if row_x and row_y:
-                self.move(int(row_x[0]), int(row_y[0]))
-            
-            if row_w and row_h:
-                self.resize(int(row_w[0]), int(row_h[0]))
+        if x is not None and y is not None:
+            self.move(x, y)
+        
+        if w is not None and h is not None:
+            self.resize(w, h)
                 
-            return (row_x is not None)
-        except:
-            return False
+        return x is not None
 
-    def init_db(self):
-        self.conn = sqlite3.connect("lavida.db", check_same_thread=False)
-        self.cursor = self.conn.cursor()
-        
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS videos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT,
-                title TEXT,
-                watched INTEGER DEFAULT 0,
-                tab_index INTEGER DEFAULT 0,
-                row_order INTEGER DEFAULT 0,
-                is_deleted INTEGER DEFAULT 0
-            )
-        """)
-        try: self.cursor.execute("ALTER TABLE videos ADD COLUMN tab_index INTEGER DEFAULT 0")
-        except: pass
-        try: self.cursor.execute("ALTER TABLE videos ADD COLUMN row_order INTEGER DEFAULT 0")
-        except: pass
-        try: self.cursor.execute("ALTER TABLE videos ADD COLUMN is_deleted INTEGER DEFAULT 0")
-        except: pass
-        
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
-        self.conn.commit()
+    def on_write_committed(self, ticket):
+        # How many writes the UI already shows are still not on disk.
+        instrumentation.record("db.uncommitted", self.db.ticket - ticket)
+
+    def on_write_failed(self, ticket, error):
+        # The UI was updated optimistically; resync it with what is on disk.
+        print(f"Write {ticket} failed: {error}")
+        self.load_data()
 
     def setup_ui(self):
         self.central_widget = QWidget()
@@ -196,22 +401,12 @@ class LavidaApp(QMainWindow):
         m = 2 
         self.layout.setContentsMargins(m, m, m, m)
         self.layout.setSpacing(0)
-        self.central_widget.setStyleSheet("QWidget { font-family: 'Segoe UI', sans-serif; }")
 
         self.main_frame = QFrame()
         self.main_frame.setObjectName("MainFrame")
-        self.main_frame.setStyleSheet("""
-            QFrame#MainFrame {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #1e1e2e, stop:1 #161625);
-                border-radius: 12px;
-                border: 2px solid #00d4ff;
-            }
-        """)
-        shadow = QGraphicsDropShadowEffect(self)
-        shadow.setBlurRadius(20)
-        shadow.setColor(QColor(0, 212, 255, 80))
-        shadow.setOffset(0, 0)
-        self.main_frame.setGraphicsEffect(shadow)
+        # Painted behind the frame from a cached nine-patch; a live
+        # QGraphicsDropShadowEffect re-blurred the whole frame every repaint.
+        self.glow = GlowCache(self.theme.color("glow"))
 
         self.frame_layout = QVBoxLayout(self.main_frame)
         self.frame_layout.setContentsMargins(12, 12, 12, 12)
@@ -220,55 +415,70 @@ class LavidaApp(QMainWindow):
 
         top_bar = QHBoxLayout()
         title_lbl = QLabel("LAVIDA")
-        title_lbl.setStyleSheet("color: #00d4ff; font-weight: 900; font-size: 18px; letter-spacing: 2px; border: none; background: transparent;")
+        title_lbl.setObjectName("TitleLabel")
         top_bar.addWidget(title_lbl)
         top_bar.addStretch()
 
+        self.expand_btn = QPushButton()
+        self.expand_btn.setObjectName("ExpandButton")
+        self.expand_btn.setToolTip("Links added from playlists and channels; click to stop")
+        self.expand_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.expand_btn.clicked.connect(self.cancel_expansions)
+        self.expand_btn.hide()
+        top_bar.addWidget(self.expand_btn)
+
         disable_lbl = QLabel("DISABLE")
-        disable_lbl.setStyleSheet("color: rgba(255, 255, 255, 0.3); font-size: 10px; font-weight: bold; margin-right: 4px;")
+        disable_lbl.setObjectName("DisableLabel")
         top_bar.addWidget(disable_lbl)
 
         close_btn = QPushButton("✕")
         close_btn.setFixedSize(24, 24)
         close_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         close_btn.clicked.connect(self.close_application)
-        close_btn.setStyleSheet("QPushButton { background-color: rgba(255, 255, 255, 0.05); color: white; border-radius: 12px; font-weight: bold; border: none; font-size: 12px; } QPushButton:hover { background-color: #ff4757; }")
+        close_btn.setObjectName("CloseButton")
         top_bar.addWidget(close_btn)
         self.frame_layout.addLayout(top_bar)
 
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search titles and links")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.setObjectName("SearchBox")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_box.textChanged.connect(self.search_timer.start)
+        self.frame_layout.addWidget(self.search_box)
+
         self.tabs = QTabWidget()
-        self.tabs.setStyleSheet("""
-            QTabWidget::pane { border: 0; background: transparent; margin-top: 15px; }
-            QTabBar::tab { background: rgba(255, 255, 255, 0.05); color: #888; padding: 4px 0px; width: 50px; height: 22px; margin-right: 8px; border-radius: 11px; font-weight: bold; font-size: 11px; border: 1px solid transparent; }
-            QTabBar::tab:selected { background: rgba(0, 212, 255, 0.15); color: #00d4ff; border: 1px solid rgba(0, 212, 255, 0.4); }
-            QTabBar::tab:hover { background: rgba(255, 255, 255, 0.1); color: white; }
-        """)
-
-        self.tab_lists = []
-        for i in range(1, 4):
-            lst = DraggableListWidget(self, i)
-            self.tab_lists.append(lst)
-            self.tabs.addTab(lst, f"TAB {i}")
-
-        self.history_list = DraggableListWidget(self, 99)
-        self.history_list.setStyleSheet("""
-            QListWidget { background: rgba(0,0,0,0.2); border-radius: 8px; }
-            QListWidget::item { opacity: 0.7; }
-        """)
-        self.tab_lists.append(self.history_list)
-        self.tabs.addTab(self.history_list, "HISTORY")
+        self.tabs.setObjectName("Tabs")
+        bar = self.tabs.tabBar()
+        bar.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        bar.customContextMenuRequested.connect(self.show_tab_menu)
+        bar.tabBarDoubleClicked.connect(lambda index: self.rename_collection(self.tabs.widget(index)))
 
+        # Collection tabs in order, then HISTORY. Pages are empty shells
+        # until list_for() fills them.
+        self.pages = []
+        for collection_id, uid, name, position in self.db.collections():
+            self.pages.append(TabPage(collection_id, position))
+            self.tabs.addTab(self.pages[-1], name)
+        self.history_tab = TabPage(history=True)
+        self.tabs.addTab(self.history_tab, "HISTORY")
         self.frame_layout.addWidget(self.tabs)
         
         self.empty_lbl = QLabel("Drop YouTube links here")
         self.empty_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.empty_lbl.setStyleSheet("color: rgba(255,255,255,30); font-size: 12px; font-weight: bold; border:none;")
+        self.empty_lbl.setObjectName("EmptyLabel")
         self.frame_layout.addWidget(self.empty_lbl)
         self.empty_lbl.hide()
 
+        self.overlay = InstrumentationOverlay(self)
+
     def check_empty_state(self):
-        total_items = sum(lst.count() for lst in self.tab_lists)
-        if total_items == 0:
+        # Loaded lists usually settle it; the database is only asked when
+        # every one of them is empty.
+        if not any(lst.count() for lst in self.loaded_lists()) and not self.db.has_videos():
             self.empty_lbl.show()
             self.tabs.hide()
         else:
@@ -277,70 +487,468 @@ class LavidaApp(QMainWindow):
 
     def close_application(self):
         self.save_settings()
+        self.settings.set("current_tab", self.tabs.currentIndex())
+        self.settings.flush()
+        if self.report_frames: print(f"Frames: {self.frame_timer.stats()}")
+        if self.traced:
+            # The cache's and the input hook's counters go out with the spans.
+            instrumentation.record("cache.hit_rate", self.metadata_cache.stats()["hit_rate"])
+            if self.listener:
+                instrumentation.record("listener.events_per_s", self.listener.summary()["events_per_s"])
+            print(f"Spans: {instrumentation.RECORDER.stats()}")
+            instrumentation.RECORDER.disable()
+        if self.listener:
+            self.listener.stop()
+        if self.command_server: self.command_server.close()
+        # Unfinished expansions stay in the database and resume next time.
+        if self.expander: self.expander.shutdown()
+        if self.fetcher: self.fetcher.shutdown()
+        self.thumbnails.shutdown()
+        self.search_service.close()
+        self.db.close()
         QApplication.quit()
 
     def update_video_order(self, vid_id, new_order):
-        self.cursor.execute("UPDATE videos SET row_order = ? WHERE id = ?", (new_order, vid_id))
-        self.conn.commit()
+        self.db.set_order(vid_id, new_order)
+
+    def rebalance_video_order(self, orders):
+        self.db.set_orders(orders)
 
     def load_data(self):
-        for lst in self.tab_lists: lst.clear()
-        
-        self.cursor.execute("SELECT id, title, url, watched, tab_index FROM videos WHERE is_deleted=0 ORDER BY row_order ASC, id DESC")
-        for vid_id, title, url, watched, tab_index in self.cursor.fetchall():
-            target_index = tab_index if tab_index < 3 else 0
-            self.create_card_item(vid_id, title, url, watched, self.tab_lists[target_index])
+        # Tabs that are not loaded are read fresh when next shown anyway.
+        with instrumentation.span("tab.load_all"):
+            self.sync_collections()
+            for page in self.all_pages():
+                if page.list is not None:
+                    self.load_page(page)
+
+        self.check_empty_state()
+
+    def run_search(self):
+        self.search_generation = self.search_service.search(self.search_box.text())
+
+    def on_search_results(self, generation, ids):
+        if generation != self.search_generation:
+            return
+        self.search_ids = ids
+        set_state(self.search_box, "active", ids is not None)
+        self.apply_search_filter()
+
+    def apply_search_filter(self, *args):
+        # Only the visible list is filtered; others catch up when shown.
+        current = self.tabs.currentWidget()
+        if current is not None and current.list is not None:
+            current.list.set_filter(self.search_ids)
+
+    # -- tabs and collections -----------------------------------------------
+
+    def all_pages(self):
+        return self.pages + [self.history_tab]
+
+    def loaded_lists(self):
+        return [page.list for page in self.all_pages() if page.list is not None]
+
+    def page_for(self, collection_id):
+        return next((page for page in self.pages if page.collection_id == collection_id), None)
+
+    def tab_list(self, index):
+        return self.list_for(self.tabs.widget(index))
 
-        self.cursor.execute("SELECT id, title, url, watched FROM videos WHERE is_deleted=1 ORDER BY id DESC")
-        for vid_id, title, url, watched in self.cursor.fetchall():
-            self.create_card_item(vid_id, title, url, watched, self.history_list)
+    def list_for(self, page):
+        # The page's list, built and filled from the database on first use
+        # or after it was released.
+        if page.list is None:
+            lst = DraggableListWidget(self, page.collection_id)
+            if page.history:
+                lst.setProperty("history", True)
+                lst.video_model.set_pager(self.history_page, HISTORY_PAGE)
+                lst.video_model.sort_key = newest_first
+                lst.set_reorderable(False)
+            lst.verticalScrollBar().valueChanged.connect(self.prune_thumbnails)
+            page.set_list(lst)
+            self.load_page(page)
+        return page.list
 
+    def load_page(self, page):
+        lst = page.list
+        with instrumentation.span("tab.load"):
+            if page.history:
+                lst.video_model.load_first_page()
+            else:
+                lst.video_model.set_rows(VideoRow(vid_id, title, url, watched, row_order)
+                                         for vid_id, title, url, watched, row_order in self.db.live_videos(page.collection_id))
+        lst.loaded = True
+        lst.reset_filter()
+        if page is self.tabs.currentWidget():
+            lst.set_filter(self.search_ids)
+
+    def on_tab_changed(self, index):
+        if self.current_page is not None:
+            self.current_page.last_seen = time.monotonic()
+        self.current_page = self.tabs.widget(index)
+        if self.current_page is not None:
+            self.list_for(self.current_page)
+            self.apply_search_filter()
+            self.prune_thumbnails()
+
+    def release_idle_tabs(self):
+        # Tabs unseen for TAB_IDLE_MS hand back their rows and widgets.
+        cutoff = time.monotonic() - TAB_IDLE_MS / 1000
+        for page in self.all_pages():
+            if page is not self.current_page and page.list is not None and page.last_seen < cutoff:
+                page.release()
+
+    def sync_collections(self):
+        # Brings the tabs in line with the collections table after an import:
+        # its names, its collections, and its order.
+        rows = self.db.collections()
+        ids = {row[0] for row in rows}
+        for page in [page for page in self.pages if page.collection_id not in ids]:
+            self.remove_page(page)
+        for position, (collection_id, uid, name, order) in enumerate(rows):
+            page = self.page_for(collection_id)
+            if page is None:
+                page = TabPage(collection_id, order)
+                self.pages.insert(position, page)
+                self.tabs.insertTab(position, page, name)
+                continue
+            page.position = order
+            if self.pages.index(page) != position:
+                self.pages.remove(page)
+                self.pages.insert(position, page)
+                self.tabs.tabBar().moveTab(self.tabs.indexOf(page), position)
+            self.tabs.setTabText(position, name)
+
+    def remove_page(self, page):
+        if page is self.current_page:
+            self.current_page = None
+        page.release()
+        self.pages.remove(page)
+        self.tabs.removeTab(self.tabs.indexOf(page))
+        page.deleteLater()
+
+    def show_tab_menu(self, pos):
+        bar = self.tabs.tabBar()
+        page = self.tabs.widget(bar.tabAt(pos))
+        menu = QMenu(self)
+        menu.addAction("New collection", self.new_collection)
+        menu.addAction("Select all watched", self.select_watched)
+        if self.expansions:
+            menu.addAction("Stop adding playlists", self.cancel_expansions)
+        if page is not None and not page.history:
+            menu.addAction("Rename", lambda: self.rename_collection(page))
+            remove = menu.addAction("Remove", lambda: self.remove_collection(page))
+            remove.setEnabled(len(self.pages) > 1)
+        menu.exec(bar.mapToGlobal(pos))
+
+    def new_collection(self):
+        name, ok = QInputDialog.getText(self, "New collection", "Name:", text=f"TAB {len(self.pages) + 1}")
+        if not ok or not name.strip():
+            return
+        position = max((page.position for page in self.pages), default=-1) + 1
+        collection_id = self.db.create_collection(name.strip(), position)
+        if collection_id is None:
+            return
+        self.pages.append(TabPage(collection_id, position))
+        self.tabs.insertTab(len(self.pages) - 1, self.pages[-1], name.strip())
+        self.tabs.setCurrentWidget(self.pages[-1])
+
+    def rename_collection(self, page):
+        if page is None or page.history:
+            return
+        index = self.tabs.indexOf(page)
+        name, ok = QInputDialog.getText(self, "Rename collection", "Name:", text=self.tabs.tabText(index))
+        if not ok or not name.strip():
+            return
+        self.db.rename_collection(page.collection_id, name.strip())
+        self.tabs.setTabText(index, name.strip())
+
+    def remove_collection(self, page):
+        if len(self.pages) <= 1:
+            return
+        name = self.tabs.tabText(self.tabs.indexOf(page))
+        answer = QMessageBox.question(self, "Remove collection", f"Remove {name}? Its links move to HISTORY.")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self.db.delete_collection(page.collection_id)
+        self.remove_page(page)
+        if self.history_tab.list is not None:
+            self.load_page(self.history_tab)
         self.check_empty_state()
 
-    def create_card_item(self, vid_id, title, url, watched, target_list, insert_top=False):
-        if insert_top:
-            item = QListWidgetItem()
-            target_list.insertItem(0, item)
+    def history_page(self, last_row, limit):
+        records = self.db.history_page(last_row.vid_id if last_row else None, limit)
+        return [VideoRow(vid_id, title, url, watched, row_order)
+                for vid_id, title, url, watched, row_order in records]
+
+    def purge_history(self):
+        # Retention: if set, HISTORY keeps the newest `history_max_rows` rows
+        # and nothing older than `history_max_days`. Purges go in batches so
+        # a long-neglected history never stalls the UI, and each batch is one
+        # removal (or reset) per list.
+        max_rows = self.settings.get_int("history_max_rows", HISTORY_MAX_ROWS)
+        max_days = self.settings.get_int("history_max_days", HISTORY_MAX_DAYS)
+        expired = self.db.expired_history(max_rows, max_days * 24 * 3600, PURGE_BATCH)
+        if not expired:
+            return
+        self.db.purge(expired)
+        for model, rows in self.group_by_model(expired).items():
+            model.remove_rows(rows)
+
+        if len(expired) == PURGE_BATCH:
+            QTimer.singleShot(0, self.purge_history)
         else:
-            item = QListWidgetItem(target_list)
-            
-        item.setSizeHint(QSize(0, 40))
-        item.setData(Qt.ItemDataRole.UserRole, url)
-        item.setData(Qt.ItemDataRole.UserRole + 1, vid_id)
-        item.setData(Qt.ItemDataRole.UserRole + 2, watched)
-        item.setData(Qt.ItemDataRole.UserRole + 3, title)
-        card = VideoCard(vid_id, title, url, watched, self, item)
-        target_list.setItemWidget(item, card)
-
-    def mark_as_watched(self, vid_id, card_widget):
-        self.cursor.execute("UPDATE videos SET watched = 1 WHERE id = ?", (vid_id,))
-        self.conn.commit()
-        card_widget.set_watched_style()
-
-    def mark_as_unwatched(self, vid_id, card_widget):
-        self.cursor.execute("UPDATE videos SET watched = 0 WHERE id = ?", (vid_id,))
-        self.conn.commit()
-        card_widget.set_unwatched_style()
-
-    def delete_video(self, vid_id, item):
-        list_widget = item.listWidget()
+            self.db.compact()
+
+    def run_commands(self, requests):
+        # Requests from the command socket (src/ipc.py), batched by
+        # CommandServer. Lookups run first, every write of the batch goes
+        # into one transaction, and queries are answered once it is queued
+        # so they see it. A request with bad arguments, or one that fails,
+        # gets an error reply; the rest of the batch still runs.
+        replies = [None] * len(requests)
+        # collection_id -> (urls, indexes of the requests that sent them)
+        adds, updates = {}, []
+        for i, request in enumerate(requests):
+            try:
+                replies[i] = self.queue_command(i, request, adds, updates)
+            except Exception as e:
+                replies[i] = command_failed(request, e)
+
+        with self.db.batch():
+            # YouTube video id -> rows the batch adds. They are not written
+            # until the batch is, so `watched` matches against them as well
+            # as the rows find_live sees.
+            added = {}
+            for collection_id, (urls, senders) in adds.items():
+                try:
+                    urls = dedupe_urls(urls)
+                    for row in self.ingest_urls(urls, collection_id) if urls else ():
+                        added.setdefault(extract_video_id(row.url), []).append(row)
+                except Exception as e:
+                    for i in senders:
+                        replies[i] = command_failed(requests[i], e)
+            for i, video_ids, value in updates:
+                try:
+                    rows = [row for video_id in video_ids for row in added.get(video_id, ())]
+                    ids = list(dict.fromkeys(self.live_ids(video_ids) + [row.vid_id for row in rows]))
+                    for vid_id in ids:
+                        if value: self.mark_as_watched(vid_id)
+                        else: self.mark_as_unwatched(vid_id)
+                    # Rows of a large add may still be waiting for their
+                    # chunk to reach the model.
+                    for row in rows:
+                        row.watched = value
+                    replies[i] = {"ok": True, "updated": len(ids)}
+                except Exception as e:
+                    replies[i] = command_failed(requests[i], e)
+
+        for i, request in enumerate(requests):
+            if replies[i] is None:
+                try:
+                    replies[i] = self.answer_command(request)
+                except Exception as e:
+                    replies[i] = command_failed(request, e)
+        return replies
+
+    def queue_command(self, i, request, adds, updates):
+        # Checks a request and queues its writes. Returns its reply, or None
+        # for commands answered once the writes are queued.
+        command = request.get("cmd")
+        urls = request.get("urls", [])
+        if not isinstance(urls, list):
+            return {"ok": False, "error": "urls must be a list."}
+        if command == "add":
+            # Tabs are addressed by position, as they appear in the window.
+            tab = request.get("tab", 0)
+            if not is_int(tab) or tab not in range(len(self.pages)):
+                return {"ok": False, "error": f"No tab {tab!r}."}
+            urls = [url for url in urls if isinstance(url, str) and is_youtube_url(url)]
+            queued, senders = adds.setdefault(self.pages[tab].collection_id, ([], []))
+            queued.extend(urls)
+            senders.append(i)
+            return {"ok": True, "added": len(urls)}
+        if command == "watched":
+            value = request.get("watched", True)
+            if not isinstance(value, bool):
+                return {"ok": False, "error": "watched must be true or false."}
+            video_ids = [extract_video_id(url) for url in urls if isinstance(url, str)]
+            updates.append((i, [video_id for video_id in video_ids if video_id], value))
+            return None
+        if command == "query":
+            if not isinstance(request.get("text", ""), str):
+                return {"ok": False, "error": "text must be a string."}
+            limit = request.get("limit", 20)
+            if not is_int(limit) or limit < 1:
+                return {"ok": False, "error": "limit must be a positive integer."}
+            return None
+        if command == "import":
+            if not isinstance(request.get("path"), str) or not request["path"]:
+                return {"ok": False, "error": "path must be a file name."}
+            return None
+        if command in ("ping", "show"):
+            return None
+        return {"ok": False, "error": f"Unknown command: {command!r}"}
+
+    def live_ids(self, video_ids):
+        ids = []
+        for video_id in video_ids:
+            ids += [vid_id for vid_id, stored in self.db.find_live(video_id) if extract_video_id(stored) == video_id]
+        return ids
+
+    def answer_command(self, request):
+        command = request.get("cmd")
+        if command == "query":
+            rows = self.db.search_videos(request.get("text", ""), request.get("limit", 20))
+            positions = {page.collection_id: position for position, page in enumerate(self.pages)}
+            return {"ok": True, "results": [
+                {"id": vid_id, "title": title, "url": url, "watched": bool(watched), "tab": positions.get(tab)}
+                for vid_id, title, url, watched, tab in rows]}
+        if command == "import":
+            return self.import_changes(request["path"])
+        if command == "show":
+            self.show()
+            self.activateWindow()
+        return {"ok": True}
+
+    def import_changes(self, path):
+        # Any row may have changed, so every loaded tab is reloaded.
+        result = self.db.import_changes(path)
+        if "error" in result:
+            return {"ok": False, "error": result["error"]}
+        if result["applied"]:
+            self.load_data()
+        if result["fetches"]:
+            self.get_fetcher().fetch_many(result["fetches"])
+        return {"ok": True, "applied": result["applied"], "skipped": result["skipped"]}
+
+    # -- batch actions --------------------------------------------------------
+    # Each one is a single job for the writer and one model update per list.
+
+    def current_list(self):
+        page = self.tabs.currentWidget()
+        return page.list if page is not None else None
+
+    def select_watched(self):
+        lst = self.current_list()
+        if lst is not None:
+            lst.select_watched()
+
+    def show_batch_menu(self, lst, pos):
+        ids = lst.selected_ids()
+        page = self.tabs.currentWidget()
+        menu = QMenu(self)
+        menu.addAction(f"Mark {len(ids)} watched", lambda: self.batch_set_watched(ids, 1))
+        menu.addAction(f"Mark {len(ids)} unwatched", lambda: self.batch_set_watched(ids, 0))
+        move = menu.addMenu("Restore to" if page.history else "Move to")
+        for target in self.pages:
+            if target is not page:
+                move.addAction(self.tabs.tabText(self.tabs.indexOf(target)),
+                               lambda checked=False, collection_id=target.collection_id: self.batch_move(ids, collection_id))
+        menu.addAction("Purge" if page.history else "Send to HISTORY", lambda: self.batch_delete(ids))
+        menu.addSeparator()
+        menu.addAction("Select all watched", lst.select_watched)
+        undo = menu.addAction("Undo last batch", self.undo_batch)
+        undo.setEnabled(self.last_batch is not None)
+        menu.exec(pos)
+
+    def group_by_model(self, vid_ids):
+        groups = {}
+        for vid_id in vid_ids:
+            model, row = self.video_index.locate(vid_id)
+            if model: groups.setdefault(model, []).append(row)
+        return groups
+
+    def take_rows(self, vid_ids):
+        # Removes the rows from whichever lists show them and returns them.
+        rows = []
+        for model, model_rows in self.group_by_model(vid_ids).items():
+            rows += model.remove_rows(model_rows)
+        return rows
+
+    def batch_set_watched(self, vid_ids, watched):
+        if not vid_ids:
+            return
+        self.last_batch = self.db.snapshot(vid_ids)
+        self.db.set_watched_many(vid_ids, watched)
+        for model, rows in self.group_by_model(vid_ids).items():
+            model.set_watched_rows(rows, watched)
+
+    def batch_move(self, vid_ids, collection_id):
+        # Moved rows go to the top of the target, in their current order.
+        if not vid_ids:
+            return
+        self.last_batch = self.db.snapshot(vid_ids)
+        rows = self.take_rows(vid_ids)
+        for row, row_order in zip(rows, self.top_orders(collection_id, len(rows))):
+            row.row_order = row_order
+        self.db.move_videos([(row.row_order, row.vid_id) for row in rows], collection_id)
+        target = self.page_for(collection_id)
+        if target is not None and target.list is not None:
+            target.list.video_model.insert_sorted(rows)
+        self.check_empty_state()
+
+    def batch_delete(self, vid_ids):
+        # Sends live rows to HISTORY; rows already there are purged.
+        if not vid_ids:
+            return
+        self.last_batch = self.db.snapshot(vid_ids)
+        if self.tabs.currentWidget().history:
+            self.db.hard_delete_many(vid_ids)
+            self.take_rows(vid_ids)
+        else:
+            self.db.soft_delete_many(vid_ids)
+            self.take_rows(vid_ids)
+            if self.history_tab.list is not None:
+                self.load_page(self.history_tab)
+        self.check_empty_state()
+
+    def undo_batch(self):
+        if self.last_batch is None:
+            return
+        snapshot, self.last_batch = self.last_batch, None
+        # Live rows whose collection was removed since go to the top of the
+        # first tab instead of into a collection that no longer has a page.
+        collections = {page.collection_id for page in self.pages}
+        snapshot = [tuple(row) for row in snapshot]
+        orphans = sorted((i for i, row in enumerate(snapshot) if row[4] not in collections and not row[7]),
+                         key=lambda i: snapshot[i][5])
+        if orphans:
+            target = self.pages[0].collection_id
+            for i, row_order in zip(orphans, self.top_orders(target, len(orphans))):
+                snapshot[i] = snapshot[i][:4] + (target, row_order) + snapshot[i][6:]
+        self.db.restore_videos(snapshot)
+        # The rows may return to any tab; each loaded one is reloaded once.
+        self.load_data()
+
+    def mark_as_watched(self, vid_id):
+        self.db.set_watched(vid_id, 1)
+        model, row = self.video_index.locate(vid_id)
+        if model: model.set_watched(row, 1)
+
+    def mark_as_unwatched(self, vid_id):
+        self.db.set_watched(vid_id, 0)
+        model, row = self.video_index.locate(vid_id)
+        if model: model.set_watched(row, 0)
+
+    def delete_video(self, vid_id):
+        model, row = self.video_index.locate(vid_id)
+        if model is None:
+            return
         
-        if list_widget == self.history_list:
-            self.cursor.execute("DELETE FROM videos WHERE id = ?", (vid_id,))
-            self.conn.commit()
-            row = list_widget.row(item)
-            list_widget.takeItem(row)
+        history = self.history_tab.list.video_model if self.history_tab.list is not None else None
+        if model is history:
+            self.db.hard_delete(vid_id)
+            model.remove_rows([row])
         else:
-            self.cursor.execute("UPDATE videos SET is_deleted=1 WHERE id = ?", (vid_id,))
-            self.conn.commit()
+            self.db.soft_delete(vid_id)
             
-            row = list_widget.row(item)
-            list_widget.takeItem(row)
-            
-            title = item.data(Qt.ItemDataRole.UserRole + 3)
-            url = item.data(Qt.ItemDataRole.UserRole)
-            watched = item.data(Qt.ItemDataRole.UserRole + 2)
-            self.create_card_item(vid_id, title, url, watched, self.history_list)
+            model.remove_rows([row])
+            # Rows below the last loaded page show up when it is scrolled to;
+            # an unloaded HISTORY reads them when shown.
+            loaded = history.full_rows() if history is not None else None
+            if history is not None and not (history.has_more and loaded and vid_id < loaded[-1].vid_id):
+                history.insert_sorted([row])
 
         self.check_empty_state()
 
@@ -349,51 +957,268 @@ class LavidaApp(QMainWindow):
         else: event.ignore()
 
     def dropEvent(self, event):
-        url = ""
-        if event.mimeData().hasUrls(): url = event.mimeData().urls()[0].toString()
-        elif event.mimeData().hasText(): url = event.mimeData().text()
-        
-        if "youtube.com" in url or "youtu.be" in url:
-            if self.tabs.currentIndex() == 3: 
-                current_tab_index = 0
+        self.ingest_mime(event.mimeData())
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Paste):
+            self.ingest_mime(QApplication.clipboard().mimeData())
+        elif event.keyCombination() == QKeySequence(THEME_SHORTCUT)[0]:
+            self.cycle_theme()
+        elif event.keyCombination() == QKeySequence(LOW_POWER_SHORTCUT)[0]:
+            self.set_low_power(not self.low_power)
+        elif event.keyCombination() == QKeySequence(OVERLAY_SHORTCUT)[0]:
+            self.toggle_overlay()
+        elif event.keyCombination() == QKeySequence(SELECT_WATCHED_SHORTCUT)[0]:
+            self.select_watched()
+        elif event.matches(QKeySequence.StandardKey.Undo):
+            self.undo_batch()
+        elif event.key() == Qt.Key.Key_Delete and self.current_list() is not None:
+            self.batch_delete(self.current_list().selected_ids())
+        else:
+            super().keyPressEvent(event)
+
+    def set_theme(self, name):
+        self.theme.load(name)
+        self.theme.install()
+        self.glow.set_color(self.theme.color("glow"))
+        self.update()
+        for lst in self.loaded_lists():
+            lst.delegate.card_cache.clear()
+            lst.viewport().update()
+        self.settings.set("theme", self.theme.name)
+
+    def toggle_overlay(self):
+        # Recording runs only while the overlay is up, unless --trace
+        # turned it on for the whole session.
+        self.overlay.toggle()
+        if self.traced:
+            return
+        if self.overlay.isVisible():
+            instrumentation.RECORDER.clear()
+            instrumentation.RECORDER.enable()
+            self.stall_detector.start()
+        else:
+            self.stall_detector.stop()
+            instrumentation.RECORDER.disable()
+
+    def cycle_theme(self):
+        names = available_themes()
+        position = names.index(self.theme.name) if self.theme.name in names else -1
+        self.set_theme(names[(position + 1) % len(names)])
+
+    def set_low_power(self, enabled):
+        # No glow and geometry updates capped at LOW_POWER_FPS.
+        self.low_power = enabled
+        self.settings.set("low_power", enabled)
+        self.update()
+
+    def ingest_mime(self, mime):
+        urls = urls_from_mime(mime)
+        if not urls:
+            return
+
+        # Links dropped on HISTORY go to the first collection.
+        page = self.tabs.currentWidget()
+        if page.history:
+            page = self.pages[0]
+        self.ingest_urls(urls, page.collection_id)
+
+    def ingest_urls(self, urls, collection_id):
+        # The first URL ends up at the top of the tab; everything is written
+        # in one transaction and fetched as one batch. A tab that is not
+        # loaded reads the rows when it is shown. Playlist and channel links
+        # are expanded into their videos as pages arrive, above the rest.
+        paths = [list_page_path(url) for url in urls]
+        lists = list(dict.fromkeys(path for path in paths if path))
+        urls = [url for url, path in zip(urls, paths) if path is None]
+        rows = self.insert_urls(urls, collection_id) if urls else []
+        for path in reversed(lists):
+            self.expand_list(path, collection_id)
+        return rows
+
+    def insert_urls(self, urls, collection_id):
+        page = self.page_for(collection_id)
+        lst = page.list if page is not None else None
+        orders = self.top_orders(collection_id, len(urls))
+
+        new_rows, fetch_jobs = [], []
+        for url, row_order in zip(urls, orders):
+            vid_id = self.db.allocate_id()
+            cached_title = self.metadata_cache.get(extract_video_id(url))
+            new_rows.append(VideoRow(vid_id, cached_title or LOADING_TITLE, url, 0, row_order))
+            if cached_title is None:
+                fetch_jobs.append((vid_id, url))
+
+        self.db.insert_videos([(row.vid_id, row.url, row.title, collection_id, row.row_order) for row in new_rows], fetch_jobs)
+        if lst is not None:
+            self.insert_rows_chunked(lst.video_model, new_rows)
+        self.check_empty_state()
+        if fetch_jobs: self.get_fetcher().fetch_many(fetch_jobs)
+        return new_rows
+
+    def top_orders(self, collection_id, count):
+        # Sort keys for `count` rows placed above everything in a collection.
+        page = self.page_for(collection_id)
+        lst = page.list if page is not None else None
+        if lst is not None and lst.loaded:
+            rows = lst.video_model.full_rows()
+            top_order = rows[0].row_order if rows else 0
+        else:
+            top_order = self.db.min_order(collection_id)
+        # Lists still being expanded hold the slots below their first row.
+        for job in self.expansions.values():
+            if job["collection"] == collection_id:
+                top_order = min(top_order, job["first_order"])
+        return [top_order - ORDER_GAP * (count - i) for i in range(count)]
+
+    # -- playlist and channel expansion ---------------------------------------
+    # A list's rows take consecutive sort keys from a block of MAX_EXPANSION
+    # reserved above the top of the tab, so pages land in list order, below
+    # anything dropped since and above what was there before.
+
+    def expand_list(self, path, collection_id):
+        next_order = self.top_orders(collection_id, MAX_EXPANSION)[0]
+        expansion_id = self.db.start_expansion(path, collection_id, next_order)
+        if expansion_id is None:
+            return
+        self.track_expansion(expansion_id, collection_id, next_order, 0)
+        self.get_expander().start(expansion_id, path)
+
+    def track_expansion(self, expansion_id, collection_id, next_order, added):
+        self.expansions[expansion_id] = {"collection": collection_id, "first_order": next_order - ORDER_GAP * added,
+                                         "next_order": next_order, "added": added}
+        self.update_expansion_status()
+
+    def resume_expansions(self):
+        for expansion_id, path, collection_id, state, next_order, added in self.db.pending_expansions(MAX_FETCH_ATTEMPTS):
+            if self.page_for(collection_id) is None:
+                self.db.finish_expansion(expansion_id)
+                continue
+            self.track_expansion(expansion_id, collection_id, next_order, added)
+            # Pages can overlap; what the stored pages delivered is not
+            # delivered again.
+            urls = self.db.expansion_urls(collection_id, self.expansions[expansion_id]["first_order"], next_order)
+            self.get_expander().start(expansion_id, path, state, {extract_video_id(url) for url in urls})
+
+    def on_expansion_page(self, expansion_id, entries, state):
+        # One transaction per page: its rows, their titles for the cache and
+        # the state the next page needs, so a restart picks up after the
+        # last page on disk. Titles come with the page; only the odd entry
+        # without one is fetched.
+        job = self.expansions.get(expansion_id)
+        if job is None:
+            return
+        page = self.page_for(job["collection"])
+        if page is None:
+            self.stop_expansion(expansion_id)
+            return
+        entries = entries[:MAX_EXPANSION - job["added"]]
+        if job["added"] + len(entries) >= MAX_EXPANSION:
+            state = ""
+
+        new_rows, fetch_jobs, titles, now = [], [], [], time.time()
+        for video_id, title in entries:
+            vid_id = self.db.allocate_id()
+            url = canonical_url(video_id)
+            if title:
+                titles.append((video_id, title, now))
+                self.metadata_cache.remember(video_id, title, now)
             else:
-                current_tab_index = self.tabs.currentIndex()
-            
-            self.cursor.execute("SELECT MIN(row_order) FROM videos")
-            min_val = self.cursor.fetchone()[0]
-            new_order = (min_val if min_val is not None else 0) - 1
-            
-            self.cursor.execute("INSERT INTO videos (url, title, tab_index, row_order, is_deleted) VALUES (?, ?, ?, ?, 0)", (url, "Loading info...", current_tab_index, new_order))
-            self.conn.commit()
-            last_id = self.cursor.lastrowid
-            
-            self.create_card_item(last_id, "Loading info...", url, 0, self.tab_lists[current_tab_index], insert_top=True)
-            self.check_empty_state()
-            threading.Thread(target=self.fetch_title, args=(url, last_id, current_tab_index), daemon=True).start()
+                title = self.metadata_cache.get(video_id)
+                if title is None:
+                    fetch_jobs.append((vid_id, url))
+            new_rows.append(VideoRow(vid_id, title or LOADING_TITLE, url, 0, job["next_order"]))
+            job["next_order"] += ORDER_GAP
+        job["added"] += len(new_rows)
 
-    def fetch_title(self, url, vid_id, tab_index):
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=5)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title = url
-            if soup.title: title = soup.title.string.replace("- YouTube", "").strip()
-            self.update_title_signal.emit(title, vid_id, tab_index)
-        except: pass
-
-    def update_item_title(self, title, vid_id, tab_index):
-        self.cursor.execute("UPDATE videos SET title = ? WHERE id = ?", (title, vid_id))
-        self.conn.commit()
-        
-        target_list = self.tab_lists[tab_index] if tab_index < 3 else self.history_list
+        with self.db.batch():
+            if new_rows:
+                self.db.insert_videos([(row.vid_id, row.url, row.title, job["collection"], row.row_order) for row in new_rows],
+                                      fetch_jobs)
+            if titles:
+                self.db.cache_titles(titles)
+            self.db.expansion_progress(expansion_id, state or None, job["next_order"], job["added"])
+
+        lst = page.list
+        if lst is not None and lst.loaded and new_rows:
+            lst.video_model.insert_sorted(new_rows)
+        if not state:
+            self.stop_expansion(expansion_id)
+        self.update_expansion_status()
+        self.check_empty_state()
+        if fetch_jobs: self.get_fetcher().fetch_many(fetch_jobs)
+
+    def on_expansion_failed(self, expansion_id, error):
+        # Rows already stored stay; the list is tried again from where it
+        # stopped on the next start, up to MAX_FETCH_ATTEMPTS times.
+        self.db.record_expansion_failure(expansion_id, error)
+        self.expansions.pop(expansion_id, None)
+        self.update_expansion_status()
+
+    def stop_expansion(self, expansion_id):
+        if self.expander: self.expander.cancel(expansion_id)
+        self.db.finish_expansion(expansion_id)
+        self.expansions.pop(expansion_id, None)
+
+    def cancel_expansions(self):
+        for expansion_id in list(self.expansions):
+            self.stop_expansion(expansion_id)
+        self.update_expansion_status()
+
+    def update_expansion_status(self):
+        if self.expansions:
+            self.expand_btn.setText(f"+{sum(job['added'] for job in self.expansions.values())}  ✕")
+            self.expand_btn.show()
+        else:
+            self.expand_btn.hide()
+
+    def insert_rows_chunked(self, model, rows):
+        # Large batches are added a chunk per event-loop pass so painting
+        # and input keep up.
+        model.insert_sorted(rows[:INSERT_CHUNK])
+        if len(rows) > INSERT_CHUNK:
+            QTimer.singleShot(0, lambda: self.insert_rows_chunked(model, rows[INSERT_CHUNK:]))
+
+    def retry_pending_fetches(self, pending):
+        jobs = []
+        for vid_id, url, attempts in pending:
+            cached_title = self.metadata_cache.get(extract_video_id(url))
+            if cached_title:
+                self.update_item_title(cached_title, vid_id)
+            elif attempts >= MAX_FETCH_ATTEMPTS:
+                self.update_item_title(url, vid_id)
+            else:
+                jobs.append((vid_id, url))
+        if jobs: self.get_fetcher().fetch_many(jobs)
+
+    def on_title_fetched(self, vid_id, url, title):
+        # A page without a title comes back as its URL; that is shown but
+        # not cached, so the next drop of the link asks again.
+        if title != url:
+            self.metadata_cache.put(extract_video_id(url), title)
+        self.update_item_title(title, vid_id)
+
+    def on_fetch_failed(self, vid_id, url, error):
+        self.db.record_fetch_failure(vid_id, url, error)
+
+    def update_item_title(self, title, vid_id):
+        self.db.set_title(vid_id, title)
         
-        for i in range(target_list.count()):
-            item = target_list.item(i)
-            widget = target_list.itemWidget(item)
-            if widget and widget.vid_id == vid_id:
-                item.setData(Qt.ItemDataRole.UserRole + 3, title)
-                widget.title_lbl.setText(title)
-                break
+        model, row = self.video_index.locate(vid_id)
+        if model: model.set_title(row, title)
+
+    def prune_thumbnails(self):
+        # Downloads queued for rows no longer on screen are dropped.
+        lst = self.tabs.currentWidget().list if self.tabs.currentWidget() is not None else None
+        if lst is not None:
+            self.thumbnails.prune(lst.visible_thumbnails())
+
+    def on_thumbnail_ready(self, video_id):
+        # Repaint is cheap: only the rows on screen are drawn, and bursts of
+        # ready thumbnails coalesce into one update.
+        lst = self.tabs.currentWidget().list
+        if lst is not None:
+            lst.viewport().update()
 
     def toggle_visibility(self):
         if self.isHidden():
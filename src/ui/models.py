@@ -0,0 +1,233 @@
+import bisect
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+from src.urls import extract_video_id
+
+URL_ROLE = Qt.ItemDataRole.UserRole
+ID_ROLE = Qt.ItemDataRole.UserRole + 1
+WATCHED_ROLE = Qt.ItemDataRole.UserRole + 2
+TITLE_ROLE = Qt.ItemDataRole.UserRole + 3
+THUMB_ROLE = Qt.ItemDataRole.UserRole + 4
+
+class VideoRow:
+    __slots__ = ("vid_id", "title", "url", "watched", "row_order")
+
+    def __init__(self, vid_id, title, url, watched, row_order=0):
+        self.vid_id = vid_id
+        self.title = title
+        self.url = url
+        self.watched = watched
+        self.row_order = row_order
+
+def live_order(row):
+    # LIVE_SQL's ORDER BY row_order ASC, id DESC.
+    return (row.row_order, -row.vid_id)
+
+def newest_first(row):
+    return -row.vid_id
+
+class VideoIndex:
+    # vid_id -> (model, row) for whichever list model currently holds the
+    # video, shown or filtered out. Positions are not stored: every list is
+    # kept in its sort order, so the model finds a row by bisection.
+    # Persistent indexes did the same job, but Qt renumbers every one of
+    # them on each insert and removal.
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, model, rows):
+        for row in rows:
+            self.entries[row.vid_id] = (model, row)
+
+    def discard(self, vid_id, model=None):
+        # With `model`, only that model's entry goes: a row that moved to
+        # another list keeps the entry the other list gave it.
+        entry = self.entries.get(vid_id)
+        if entry is not None and (model is None or entry[0] is model):
+            del self.entries[vid_id]
+
+    def locate(self, vid_id):
+        return self.entries.get(vid_id, (None, None))
+
+    def __contains__(self, vid_id):
+        return vid_id in self.entries
+
+class VideoListModel(QAbstractListModel):
+    # `rows` is what the view shows. While a search filter is set the full
+    # list is kept in `all_rows` and `rows` holds only the matches, so
+    # filtering is one reset rather than a hidden flag per view row. Both
+    # lists stay in sort order.
+    def __init__(self, parent=None, registry=None, sort_key=live_order):
+        super().__init__(parent)
+        self.rows = []
+        self.all_rows = None
+        self.registry = registry if registry is not None else VideoIndex()
+        self.sort_key = sort_key
+        self.pager = None
+        self.page_size = 0
+        self.has_more = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, TITLE_ROLE): return row.title
+        if role == URL_ROLE: return row.url
+        if role == ID_ROLE: return row.vid_id
+        if role == WATCHED_ROLE: return row.watched
+        if role == THUMB_ROLE: return extract_video_id(row.url) if row.url else None
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable |
+                Qt.ItemFlag.ItemIsDragEnabled)
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    # Paged models (HISTORY) hold the rows loaded so far; the view asks for
+    # the next page when it is scrolled to the bottom.
+    def set_pager(self, pager, page_size):
+        # pager(last_row_or_None, page_size) -> [VideoRow, ...]
+        self.pager = pager
+        self.page_size = page_size
+
+    def load_first_page(self):
+        self.set_rows(self.pager(None, self.page_size))
+        self.has_more = len(self.rows) >= self.page_size
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.pager is not None and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        rows = self.full_rows()
+        rows = self.pager(rows[-1] if rows else None, self.page_size)
+        self.has_more = len(rows) >= self.page_size
+        self.insert_sorted(rows)
+
+    def full_rows(self):
+        return self.rows if self.all_rows is None else self.all_rows
+
+    def position_of(self, row, rows=None):
+        # Where `row` sits in `rows` (the shown rows by default), or -1. A row
+        # out of place (between a move and its new sort key) falls back to a
+        # scan; rows are only moved while nothing is filtered.
+        rows = self.rows if rows is None else rows
+        position = bisect.bisect_left(rows, self.sort_key(row), key=self.sort_key)
+        if position < len(rows) and rows[position] is row:
+            return position
+        if self.all_rows is not None:
+            return -1
+        return next((position for position, candidate in enumerate(rows) if candidate is row), -1)
+
+    def set_filter(self, ids):
+        # None shows every row again.
+        rows = self.full_rows()
+        self.beginResetModel()
+        if ids is None:
+            self.rows, self.all_rows = rows, None
+        else:
+            self.rows, self.all_rows = [row for row in rows if row.vid_id in ids], rows
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        # Also drops any filter; the view sets it again.
+        for row in self.full_rows():
+            self.registry.discard(row.vid_id, self)
+        self.beginResetModel()
+        self.rows, self.all_rows = list(rows), None
+        self.endResetModel()
+        self.registry.add(self, self.rows)
+
+    def clear(self):
+        self.set_rows([])
+
+    def insert_sorted(self, rows):
+        # `rows` are neighbours in sort order. They are shown even while a
+        # filter is set, as the hidden-row filter did for rows added to it.
+        if not rows:
+            return
+        key = self.sort_key(rows[0])
+        if self.all_rows is not None:
+            position = bisect.bisect_left(self.all_rows, key, key=self.sort_key)
+            self.all_rows[position:position] = rows
+        position = bisect.bisect_left(self.rows, key, key=self.sort_key)
+        self.beginInsertRows(QModelIndex(), position, position + len(rows) - 1)
+        self.rows[position:position] = rows
+        self.endInsertRows()
+        self.registry.add(self, rows)
+
+    def remove_rows(self, rows):
+        # Removes rows, shown or filtered out, and returns them in list
+        # order. One contiguous run of shown rows is a single range removal;
+        # anything else is one reset, since every separate removal shifts
+        # every row after it.
+        rows = sorted(rows, key=self.sort_key)
+        if not rows:
+            return []
+        if self.all_rows is not None:
+            for row in rows:
+                position = self.position_of(row, self.all_rows)
+                if position >= 0:
+                    del self.all_rows[position]
+        positions = sorted(position for position in map(self.position_of, rows) if position >= 0)
+        for row in rows:
+            self.registry.discard(row.vid_id, self)
+        if not positions:
+            return rows
+        first, last = positions[0], positions[-1]
+        if last - first + 1 == len(positions):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+        else:
+            doomed = set(positions)
+            self.beginResetModel()
+            self.rows = [row for position, row in enumerate(self.rows) if position not in doomed]
+            self.endResetModel()
+        return rows
+
+    def move_row(self, source, destination):
+        # destination uses beginMoveRows semantics: the row lands before
+        # whatever currently sits at `destination`.
+        if destination in (source, source + 1):
+            return source
+        self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), destination)
+        row = self.rows.pop(source)
+        final = destination if destination < source else destination - 1
+        self.rows.insert(final, row)
+        self.endMoveRows()
+        return final
+
+    def rows_changed(self, rows, role):
+        # One dataChanged over the span of shown rows instead of one per row.
+        positions = [position for position in map(self.position_of, rows) if position >= 0]
+        if positions:
+            self.dataChanged.emit(self.index(min(positions)), self.index(max(positions)), [role])
+
+    def row_changed(self, row, role):
+        position = self.position_of(row)
+        if position >= 0:
+            index = self.index(position)
+            self.dataChanged.emit(index, index, [role])
+
+    def set_title(self, row, title):
+        row.title = title
+        self.row_changed(row, TITLE_ROLE)
+
+    def set_watched_rows(self, rows, watched):
+        for row in rows:
+            row.watched = watched
+        self.rows_changed(rows, WATCHED_ROLE)
+
+    def set_watched(self, row, watched):
+        row.watched = watched
+        self.row_changed(row, WATCHED_ROLE)
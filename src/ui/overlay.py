@@ -0,0 +1,70 @@
+import time
+
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import QLabel
+
+from src import instrumentation
+
+STALL_INTERVAL_MS = 50
+STALL_THRESHOLD_MS = 100
+OVERLAY_REFRESH_MS = 500
+
+class StallDetector:
+    # A heartbeat on the GUI event loop. A beat that arrives more than
+    # STALL_THRESHOLD_MS late means the loop was blocked for that long,
+    # whatever blocked it; the lateness is recorded as "gui.stall".
+    def __init__(self, parent, interval=STALL_INTERVAL_MS, threshold=STALL_THRESHOLD_MS):
+        self.interval = interval / 1000
+        self.threshold = threshold
+        self.timer = QTimer(parent)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.beat)
+        self.last_beat = None
+
+    def start(self):
+        self.last_beat = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def beat(self):
+        now = time.perf_counter()
+        late = (now - self.last_beat - self.interval) * 1000
+        self.last_beat = now
+        if late > self.threshold:
+            instrumentation.record("gui.stall", late)
+
+class InstrumentationOverlay(QLabel):
+    # p50/p99 of every span in the ring buffer, drawn over the window and
+    # refreshed while shown.
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setObjectName("Overlay")
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.TextFormat.PlainText)
+        self.timer = QTimer(self)
+        self.timer.setInterval(OVERLAY_REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        if self.isVisible():
+            self.timer.stop()
+            self.hide()
+        else:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.timer.start()
+
+    def refresh(self):
+        stats = instrumentation.RECORDER.stats()
+        lines = [f"{'span':<16}{'n':>6}{'p50':>9}{'p99':>9}"]
+        lines += [f"{name[:16]:<16}{s['count']:>6}{s['p50']:>9.2f}{s['p99']:>9.2f}" for name, s in stats.items()]
+        if not stats:
+            lines.append("no samples yet")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(14, 44)
@@ -0,0 +1,96 @@
+import json
+import os
+from string import Template
+
+from PyQt6.QtGui import QColor, QFont
+from PyQt6.QtWidgets import QApplication
+
+THEME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes")
+DEFAULT_THEME = "default"
+
+# One stylesheet for the whole application, filled from the theme palette.
+# Widgets are matched by object name and dynamic properties; none of them
+# carries a stylesheet of its own.
+STYLESHEET = Template("""
+QWidget { font-family: '$font_family', sans-serif; }
+QFrame#MainFrame {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 $frame_top, stop:1 $frame_bottom);
+    border-radius: 12px;
+    border: 2px solid $accent;
+}
+QLabel#TitleLabel { color: $accent; font-weight: 900; font-size: 18px; letter-spacing: 2px; border: none; background: transparent; }
+QLabel#DisableLabel { color: $faint_text; font-size: 10px; font-weight: bold; margin-right: 4px; }
+QLabel#EmptyLabel { color: $empty_text; font-size: 12px; font-weight: bold; border: none; }
+QPushButton#CloseButton { background-color: $control; color: $bright_text; border-radius: 12px; font-weight: bold; border: none; font-size: 12px; }
+QPushButton#CloseButton:hover { background-color: $danger; }
+QPushButton#ExpandButton { background: $accent_soft; color: $accent; border: 1px solid $accent_border; border-radius: 9px; padding: 1px 8px; font-size: 10px; font-weight: bold; margin-right: 6px; }
+QPushButton#ExpandButton:hover { background-color: $danger; color: $bright_text; }
+QLineEdit#SearchBox { background: $control; color: $text; border: 1px solid $control_border; border-radius: 11px; padding: 3px 10px; font-size: 11px; }
+QLineEdit#SearchBox:focus, QLineEdit#SearchBox[active="true"] { border: 1px solid $accent_border; }
+QTabWidget#Tabs::pane { border: 0; background: transparent; margin-top: 15px; }
+QTabWidget#Tabs QTabBar::tab { background: $control; color: $muted_text; padding: 4px 8px; min-width: 34px; height: 22px; margin-right: 8px; border-radius: 11px; font-weight: bold; font-size: 11px; border: 1px solid transparent; }
+QTabWidget#Tabs QTabBar::tab:selected { background: $accent_soft; color: $accent; border: 1px solid $accent_border; }
+QTabWidget#Tabs QTabBar::tab:hover { background: $control_hover; color: $bright_text; }
+QListView#VideoList { background: transparent; border: none; outline: none; }
+QListView#VideoList[history="true"] { background: $history_background; border-radius: 8px; }
+QMenu { background: $frame_bottom; color: $text; border: 1px solid $accent_border; padding: 4px; }
+QMenu::item { padding: 4px 14px; border-radius: 4px; }
+QMenu::item:selected { background: $accent_soft; color: $accent; }
+QMenu::item:disabled { color: $muted_text; }
+QLabel#Overlay { background: $history_background; color: $accent; border: 1px solid $accent_border; border-radius: 6px; padding: 6px; font-family: monospace; font-size: 10px; }
+""")
+
+# name -> (pixel size, weight, strike out)
+FONTS = {
+    "title": (12, QFont.Weight.Medium, False),
+    "watched": (12, QFont.Weight.Medium, True),
+    "delete": (14, QFont.Weight.Bold, False),
+}
+
+def available_themes():
+    return sorted(name[:-5] for name in os.listdir(THEME_DIR) if name.endswith(".json"))
+
+def set_state(widget, name, value):
+    # Flip a dynamic property the stylesheet selects on; only this widget
+    # is re-polished.
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+    widget.update()
+
+class Theme:
+    # A palette loaded from themes/<name>.json, with the colours and fonts
+    # derived from it built once instead of on every paint.
+    def __init__(self, name=DEFAULT_THEME):
+        self.load(name)
+
+    def load(self, name):
+        if name not in available_themes():
+            name = DEFAULT_THEME
+        with open(os.path.join(THEME_DIR, name + ".json"), encoding="utf-8") as f:
+            self.palette = json.load(f)
+        self.name = name
+        self.colors = {}
+        self.fonts = {}
+
+    def install(self, app=None):
+        (app or QApplication.instance()).setStyleSheet(STYLESHEET.substitute(self.palette))
+
+    def color(self, key):
+        color = self.colors.get(key)
+        if color is None:
+            color = self.colors[key] = QColor(self.palette[key])
+        return color
+
+    def font(self, key):
+        font = self.fonts.get(key)
+        if font is None:
+            size, weight, strike = FONTS[key]
+            font = QFont(self.palette["font_family"])
+            font.setPixelSize(size)
+            font.setWeight(weight)
+            font.setStrikeOut(strike)
+            self.fonts[key] = font
+        return font
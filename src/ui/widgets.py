@@ -1,150 +1,397 @@
+import time
 import webbrowser
-from PyQt6.QtWidgets import (QWidget, QLabel, QPushButton, QHBoxLayout, QFrame, 
-                             QListWidget, QAbstractItemView, QListWidgetItem)
-from PyQt6.QtCore import Qt, QSize, QRectF
-from PyQt6.QtGui import QColor, QCursor, QPainter, QBrush
-
-class DragHandle(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setFixedSize(12, 24) 
-        self.setCursor(Qt.CursorShape.SizeAllCursor)
-        
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setBrush(QBrush(QColor(255, 255, 255, 80)))
-        painter.setPen(Qt.PenStyle.NoPen)
-        
-        dot_size = 2.0
-        gap = 4.0
-        rows = 3
-        cols = 2
-        
-        content_width = cols * dot_size + (cols - 1) * gap
-        content_height = rows * dot_size + (rows - 1) * gap
-        
-        start_x = (self.width() - content_width) / 2
-        start_y = (self.height() - content_height) / 2
-        
-        for row in range(rows):
-            for col in range(cols):
-                x = start_x + col * (dot_size + gap)
-                y = start_y + row * (dot_size + gap)
-                painter.drawEllipse(QRectF(x, y, dot_size, dot_size))
-
-class VideoCard(QFrame):
-    def __init__(self, vid_id, title, url, watched, parent_window, list_item):
-        super().__init__()
-        self.vid_id = vid_id
-        self.url = url
-        self.watched = watched
+from PyQt6.QtWidgets import QListView, QAbstractItemView, QStyledItemDelegate, QStyle, QVBoxLayout, QWidget
+from PyQt6.QtCore import Qt, QSize, QRect, QRectF, QEvent, QPoint, QItemSelection, QItemSelectionModel
+from PyQt6.QtGui import QCursor, QPainter, QBrush, QPen, QPixmap, QDrag
+
+from src import instrumentation
+from src.ordering import order_between, spaced_orders
+from src.thumbnails import THUMB_SIZE
+from src.ui.models import VideoListModel, URL_ROLE, ID_ROLE, WATCHED_ROLE, TITLE_ROLE, THUMB_ROLE
+
+CARD_HEIGHT = 40
+CARD_CACHE_LIMIT = 16
+
+# Flag combinations are Python enum operations in PyQt6; build them once.
+TITLE_ALIGN = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft
+MOUSE_OVER = QStyle.StateFlag.State_MouseOver
+SELECTING = Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier
+
+def paint_drag_handle(painter, rect, color):
+    painter.setBrush(QBrush(color))
+    painter.setPen(Qt.PenStyle.NoPen)
+
+    dot_size = 2.0
+    gap = 4.0
+    rows = 3
+    cols = 2
+
+    content_width = cols * dot_size + (cols - 1) * gap
+    content_height = rows * dot_size + (rows - 1) * gap
+
+    start_x = rect.x() + (rect.width() - content_width) / 2
+    start_y = rect.y() + (rect.height() - content_height) / 2
+
+    for row in range(rows):
+        for col in range(cols):
+            x = start_x + col * (dot_size + gap)
+            y = start_y + row * (dot_size + gap)
+            painter.drawEllipse(QRectF(x, y, dot_size, dot_size))
+
+class VideoCardDelegate(QStyledItemDelegate):
+    def __init__(self, parent_window, view):
+        super().__init__(view)
         self.parent_window = parent_window
-        self.list_item = list_item
-
-        self.setObjectName("VideoCard")
-        self.setStyleSheet("""
-            QFrame#VideoCard {
-                background-color: rgba(30, 30, 46, 0.6);
-                border: 1px solid rgba(255, 255, 255, 0.05);
-                border-radius: 6px;
-            }
-            QFrame#VideoCard:hover {
-                background-color: rgba(40, 40, 60, 0.9);
-                border: 1px solid rgba(0, 212, 255, 0.5);
-            }
-        """)
-
-        self.layout = QHBoxLayout(self)
-        self.layout.setContentsMargins(5, 2, 4, 2) 
-        self.layout.setSpacing(2)
-
-        self.drag_handle = DragHandle()
-        self.layout.addWidget(self.drag_handle)
-
-        self.title_lbl = QLabel(title)
-        self.title_lbl.setStyleSheet("border: none; background: transparent; color: #e0e0e0; font-family: 'Segoe UI'; font-size: 12px; font-weight: 500; margin-left: 2px;")
-        if watched: self.set_watched_style()
-        self.layout.addWidget(self.title_lbl, stretch=1)
-
-        self.del_btn = QPushButton("×")
-        self.del_btn.setFixedSize(18, 18)
-        self.del_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.del_btn.setStyleSheet("""
-            QPushButton { background-color: transparent; color: #555; border-radius: 9px; border: none; font-weight: bold; font-size: 14px; padding-bottom: 2px; }
-            QPushButton:hover { background-color: rgba(255, 71, 87, 0.8); color: white; }
-        """)
-        self.del_btn.clicked.connect(self.delete_clicked)
-        self.layout.addWidget(self.del_btn)
-
-    def set_watched_style(self):
-        font = self.title_lbl.font()
-        font.setStrikeOut(True)
-        self.title_lbl.setFont(font)
-        self.title_lbl.setStyleSheet("border: none; background: transparent; color: #555;")
-
-    def set_unwatched_style(self):
-        font = self.title_lbl.font()
-        font.setStrikeOut(False)
-        self.title_lbl.setFont(font)
-        self.title_lbl.setStyleSheet("border: none; background: transparent; color: #e0e0e0;")
-
-    def delete_clicked(self):
-        self.parent_window.delete_video(self.vid_id, self.list_item)
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-             child = self.childAt(event.pos())
-             if child != self.drag_handle:
-                if self.url:
-                    webbrowser.open(self.url)
-                    self.parent_window.mark_as_watched(self.vid_id, self)
-        elif event.button() == Qt.MouseButton.RightButton:
-            self.parent_window.mark_as_unwatched(self.vid_id, self)
-        elif event.button() == Qt.MouseButton.MiddleButton:
-            self.delete_clicked()
-        super().mousePressEvent(event)
-
-class DraggableListWidget(QListWidget):
-    def __init__(self, parent_window, tab_index):
+        self.view = view
+        self.pressed_delete = None
+        self.card_cache = {}
+
+    def sizeHint(self, option, index):
+        return QSize(0, CARD_HEIGHT)
+
+    # Card geometry mirrors the old VideoCard layout: 5/2/4/2 margins,
+    # a 12x24 handle, the thumbnail, the stretching title and an 18x18
+    # delete button.
+    def handle_rect(self, rect):
+        return QRect(rect.x() + 5, rect.center().y() - 11, 12, 24)
+
+    def thumb_rect(self, rect):
+        return QRect(rect.x() + 5 + 12 + 4, rect.center().y() - THUMB_SIZE.height() // 2 + 1, THUMB_SIZE.width(), THUMB_SIZE.height())
+
+    def delete_rect(self, rect):
+        return QRect(rect.right() - 4 - 17, rect.center().y() - 8, 18, 18)
+
+    def title_rect(self, rect):
+        left = self.thumb_rect(rect).right() + 1 + 6
+        right = self.delete_rect(rect).left() - 2
+        return QRect(left, rect.y() + 2, right - left, rect.height() - 4)
+
+    def hit_zone(self, rect, pos):
+        if self.delete_rect(rect).contains(pos): return "delete"
+        if self.handle_rect(rect).contains(pos): return "handle"
+        return "card"
+
+    def card_pixmap(self, rect, hovered):
+        # The antialiased card and its handle are the costly part of a paint;
+        # each size and state is rendered once and then blitted.
+        ratio = self.view.devicePixelRatioF()
+        key = (rect.width(), rect.height(), hovered, ratio)
+        pixmap = self.card_cache.get(key)
+        if pixmap is not None:
+            return pixmap
+        if len(self.card_cache) >= CARD_CACHE_LIMIT:
+            self.card_cache.clear()
+
+        with instrumentation.span("card.render"):
+            theme = self.parent_window.theme
+            local = QRect(0, 0, rect.width(), rect.height())
+            pixmap = QPixmap(round(local.width() * ratio), round(local.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setBrush(theme.color("card_hover" if hovered else "card"))
+            painter.setPen(QPen(theme.color("card_hover_border" if hovered else "card_border"), 1))
+            painter.drawRoundedRect(QRectF(local).adjusted(0.5, 0.5, -0.5, -0.5), 6, 6)
+            paint_drag_handle(painter, self.handle_rect(local), theme.color("handle"))
+            painter.end()
+        self.card_cache[key] = pixmap
+        return pixmap
+
+    def paint(self, painter, option, index):
+        theme = self.parent_window.theme
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = option.rect
+        hovered = bool(option.state & MOUSE_OVER)
+        painter.drawPixmap(rect.topLeft(), self.card_pixmap(rect, hovered))
+
+        watched = index.data(WATCHED_ROLE)
+        self.paint_thumbnail(painter, self.thumb_rect(rect), index.data(THUMB_ROLE), watched)
+
+        title_rect = self.title_rect(rect)
+        painter.setFont(theme.font("watched" if watched else "title"))
+        painter.setPen(theme.color("watched_text" if watched else "text"))
+        title = painter.fontMetrics().elidedText(index.data(TITLE_ROLE) or "", Qt.TextElideMode.ElideRight, title_rect.width())
+        painter.drawText(title_rect, TITLE_ALIGN, title)
+
+        del_rect = self.delete_rect(rect)
+        del_hovered = hovered and del_rect.contains(self.view.viewport().mapFromGlobal(QCursor.pos()))
+        if del_hovered:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(theme.color("delete_hover"))
+            painter.drawEllipse(QRectF(del_rect))
+        painter.setFont(theme.font("delete"))
+        painter.setPen(theme.color("bright_text" if del_hovered else "delete_text"))
+        painter.drawText(del_rect.adjusted(0, 0, 0, -2), Qt.AlignmentFlag.AlignCenter, "×")
+        painter.restore()
+
+    def paint_thumbnail(self, painter, rect, video_id, watched):
+        # Only painted rows ask for a thumbnail, so only visible ones are
+        # ever downloaded or decoded; until then a placeholder is drawn.
+        pixmap = self.parent_window.thumbnails.pixmap(video_id) if video_id else None
+        if pixmap is None:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(self.parent_window.theme.color("thumb_placeholder"))
+            painter.drawRoundedRect(QRectF(rect), 3, 3)
+            return
+        if watched:
+            painter.setOpacity(0.4)
+        painter.drawPixmap(rect, pixmap)
+        painter.setOpacity(1.0)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease):
+            return False
+
+        vid_id = index.data(ID_ROLE)
+        zone = self.hit_zone(option.rect, event.position().toPoint())
+        button = event.button()
+
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            if button == Qt.MouseButton.LeftButton and self.pressed_delete is not None:
+                pressed, self.pressed_delete = self.pressed_delete, None
+                if zone == "delete" and pressed == vid_id:
+                    self.parent_window.delete_video(vid_id)
+                return True
+            return False
+
+        if button == Qt.MouseButton.LeftButton:
+            if zone == "delete":
+                self.pressed_delete = vid_id
+                return True
+            if zone == "card" and not event.modifiers() & SELECTING:
+                url = index.data(URL_ROLE)
+                if url:
+                    webbrowser.open(url)
+                    self.parent_window.mark_as_watched(vid_id)
+        elif button == Qt.MouseButton.RightButton:
+            # On a multi-row selection the right button opens the batch menu
+            # instead (DraggableListWidget.contextMenuEvent).
+            if not (self.view.selectionModel().isSelected(index) and self.view.selection_size() > 1):
+                self.parent_window.mark_as_unwatched(vid_id)
+        elif button == Qt.MouseButton.MiddleButton:
+            self.parent_window.delete_video(vid_id)
+            return True
+        return False
+
+class DraggableListWidget(QListView):
+    def __init__(self, parent_window, collection_id):
         super().__init__()
         self.parent_window = parent_window
-        self.tab_index = tab_index
-        
+        self.collection_id = collection_id
+        self.loaded = False
+        self.filter_ids = None
+        self.reorderable = True
+        self.drag_row = None
+        self.drop_line = None
+
+        self.video_model = VideoListModel(self, parent_window.video_index)
+        self.setModel(self.video_model)
+        self.delegate = VideoCardDelegate(parent_window, self)
+        self.setItemDelegate(self.delegate)
+
         self.setDragEnabled(True)
         self.setAcceptDrops(True)
         self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
         self.setDefaultDropAction(Qt.DropAction.MoveAction)
-        
+        # Ctrl/Shift-click and Ctrl+A select; dragging still moves one row.
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setUniformItemSizes(True)
+        self.setMouseTracking(True)
+        self.viewport().setAttribute(Qt.WidgetAttribute.WA_Hover)
+
         self.setSpacing(3)
-        self.setStyleSheet("""
-            QListWidget { background: transparent; border: none; outline: none; }
-            QListWidget::item { background: transparent; border: none; padding: 0px; }
-            QListWidget::item:hover { background: transparent; }
-            QListWidget::item:selected { background: transparent; }
-        """)
+        self.setObjectName("VideoList")
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
 
+    def count(self):
+        return self.video_model.rowCount()
+
+    def set_reorderable(self, reorderable):
+        # HISTORY stays newest first: its rows are found by bisection on
+        # that order and each page is read after the last row loaded.
+        self.reorderable = reorderable
+        self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove if reorderable
+                             else QAbstractItemView.DragDropMode.NoDragDrop)
+        self.setDragEnabled(reorderable and self.filter_ids is None)
+
+    def reset_filter(self):
+        # The model was reset, which also dropped its filter.
+        self.filter_ids = None
+
+    def set_filter(self, ids):
+        if ids is self.filter_ids:
+            return
+        self.filter_ids = ids
+        with instrumentation.span("search.filter"):
+            self.video_model.set_filter(ids)
+        # Reordering a filtered list would compute keys from hidden neighbours.
+        self.setDragEnabled(self.reorderable and ids is None)
+
+    def selected_ids(self):
+        # In list order; rows filtered out by a search are never included.
+        rows = self.video_model.rows
+        return [rows[index.row()].vid_id for index in sorted(self.selectedIndexes(), key=lambda index: index.row())]
+
+    def visible_thumbnails(self):
+        # Thumbnail ids of the rows on screen. The viewport's edges may fall
+        # in the spacing between cards, so each end looks a little further in.
+        rect = self.viewport().rect()
+        x = rect.center().x()
+        def row_near(y, step):
+            for offset in range(2 * self.spacing() + 1):
+                index = self.indexAt(QPoint(x, y + offset * step))
+                if index.isValid():
+                    return index.row()
+            return None
+        first = row_near(rect.top(), 1)
+        if first is None:
+            return set()
+        last = row_near(rect.bottom(), -1)
+        last = self.count() - 1 if last is None else last
+        return {self.video_model.index(row).data(THUMB_ROLE) for row in range(first, last + 1)}
+
+    def selection_size(self):
+        # Counted from the ranges, without building an index per row.
+        return sum(selection_range.height() for selection_range in self.selectionModel().selection())
+
+    def select_watched(self):
+        # One selection range per run of watched rows.
+        selection = QItemSelection()
+        rows, model, start = self.video_model.rows, self.video_model, None
+        for position in range(len(rows) + 1):
+            watched = position < len(rows) and rows[position].watched
+            if watched and start is None:
+                start = position
+            elif not watched and start is not None:
+                selection.select(model.index(start), model.index(position - 1))
+                start = None
+        self.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect)
+
+    def contextMenuEvent(self, event):
+        if self.selection_size() > 1:
+            self.parent_window.show_batch_menu(self, event.globalPos())
+            event.accept()
+        else:
+            event.ignore()
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        index = self.indexAt(event.position().toPoint())
+        if not index.isValid():
+            self.viewport().unsetCursor()
+            return
+        rect = self.visualRect(index)
+        zone = self.delegate.hit_zone(rect, event.position().toPoint())
+        if zone == "handle": self.viewport().setCursor(Qt.CursorShape.SizeAllCursor)
+        elif zone == "delete": self.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
+        else: self.viewport().unsetCursor()
+        self.viewport().update(rect)
+
+    def startDrag(self, supported_actions):
+        index = self.currentIndex()
+        if not index.isValid():
+            return
+        rect = self.visualRect(index)
+        drag = QDrag(self)
+        drag.setMimeData(self.video_model.mimeData([index]))
+        drag.setPixmap(self.viewport().grab(rect))
+        drag.setHotSpot(self.viewport().mapFromGlobal(QCursor.pos()) - rect.topLeft())
+        self.drag_row = index.row()
+        drag.exec(Qt.DropAction.MoveAction)
+        self.drag_row = None
+        self.drop_line = None
+        self.viewport().update()
+
+    def drop_row_at(self, pos):
+        index = self.indexAt(pos)
+        if not index.isValid():
+            return self.count()
+        rect = self.visualRect(index)
+        return index.row() + (1 if pos.y() > rect.center().y() else 0)
+
+    def dragEnterEvent(self, event):
+        if event.source() is self: event.accept()
+        else: event.ignore()
+
+    def dragMoveEvent(self, event):
+        if event.source() is not self:
+            event.ignore()
+            return
+        row = self.drop_row_at(event.position().toPoint())
+        if row < self.count():
+            self.drop_line = self.visualRect(self.video_model.index(row)).top() - 2
+        elif self.count():
+            self.drop_line = self.visualRect(self.video_model.index(self.count() - 1)).bottom() + 2
+        self.viewport().update()
+        event.accept()
+
+    def dragLeaveEvent(self, event):
+        self.drop_line = None
+        self.viewport().update()
+
     def dropEvent(self, event):
-        super().dropEvent(event)
-        for i in range(self.count()):
-            item = self.item(i)
-            if self.itemWidget(item) is None:
-                vid_id = item.data(Qt.ItemDataRole.UserRole + 1)
-                url = item.data(Qt.ItemDataRole.UserRole)
-                watched = item.data(Qt.ItemDataRole.UserRole + 2)
-                title = item.data(Qt.ItemDataRole.UserRole + 3)
-                if title is None: title = "Loading..."
-                
-                card = VideoCard(vid_id, title, url, watched, self.parent_window, item)
-                item.setSizeHint(QSize(0, 40))
-                self.setItemWidget(item, card)
-        
-        self.update_db_order()
-
-    def update_db_order(self):
-        for i in range(self.count()):
-            item = self.item(i)
-            vid_id = item.data(Qt.ItemDataRole.UserRole + 1)
-            if vid_id:
-                self.parent_window.update_video_order(vid_id, i)
\ No newline at end of file
+        if event.source() is not self or self.drag_row is None:
+            event.ignore()
+            return
+        destination = self.drop_row_at(event.position().toPoint())
+        final = self.video_model.move_row(self.drag_row, destination)
+        self.setCurrentIndex(self.video_model.index(final))
+        self.drop_line = None
+        # The model already moved the row; report a copy so the view does
+        # not remove the source row a second time.
+        event.setDropAction(Qt.DropAction.CopyAction)
+        event.accept()
+        self.update_db_order(final)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.drop_line is not None:
+            painter = QPainter(self.viewport())
+            painter.setPen(QPen(self.parent_window.theme.color("drop_line"), 2))
+            painter.drawLine(QPoint(4, self.drop_line), QPoint(self.viewport().width() - 4, self.drop_line))
+
+    def update_db_order(self, position):
+        if not self.reorderable:
+            return
+        rows = self.video_model.rows
+        before = rows[position - 1].row_order if position > 0 else None
+        after = rows[position + 1].row_order if position + 1 < len(rows) else None
+        new_order = order_between(before, after)
+
+        if new_order is None:
+            orders = spaced_orders(len(rows))
+            for row, order in zip(rows, orders):
+                row.row_order = order
+            self.parent_window.rebalance_video_order([(row.row_order, row.vid_id) for row in rows])
+        else:
+            rows[position].row_order = new_order
+            self.parent_window.update_video_order(rows[position].vid_id, new_order)
+
+class TabPage(QWidget):
+    # One tab: a collection, or HISTORY. The list inside is built when the
+    # tab is first shown and released again once it has gone unseen for a
+    # while, so only tabs in use hold rows and widgets.
+    def __init__(self, collection_id=None, position=0, history=False):
+        super().__init__()
+        self.collection_id = collection_id
+        self.position = position
+        self.history = history
+        self.list = None
+        self.last_seen = time.monotonic()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def set_list(self, lst):
+        self.list = lst
+        self.layout().addWidget(lst)
+
+    def release(self):
+        if self.list is None:
+            return
+        self.list.video_model.clear()
+        self.layout().removeWidget(self.list)
+        self.list.deleteLater()
+        self.list = None
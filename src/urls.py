@@ -0,0 +1,66 @@
+import re
+from urllib.parse import urlsplit, parse_qs
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com",
+                 "youtube-nocookie.com", "www.youtube-nocookie.com"}
+SHORT_HOSTS = {"youtu.be", "www.youtu.be"}
+PATH_PREFIXES = ("shorts", "embed", "live", "v", "e")
+
+VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+PLAYLIST_ID_RE = re.compile(r"^[A-Za-z0-9_-]{2,64}$")
+CHANNEL_ID_RE = re.compile(r"^UC[A-Za-z0-9_-]{22}$")
+# Watch later and liked videos are private; mixes (RD...) are generated
+# per viewer and have no page that lists them.
+PRIVATE_PLAYLISTS = {"WL", "LL"}
+
+def split_url(url):
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    return (parts.hostname or "").lower(), parts
+
+def is_youtube_url(url):
+    host, _ = split_url(url)
+    return host in YOUTUBE_HOSTS or host in SHORT_HOSTS
+
+def extract_video_id(url):
+    # youtu.be/ID, /watch?v=ID, /shorts/ID, /embed/ID, /live/ID ... -> ID
+    host, parts = split_url(url)
+    segments = [s for s in parts.path.split("/") if s]
+
+    candidate = None
+    if host in SHORT_HOSTS:
+        candidate = segments[0] if segments else None
+    elif host in YOUTUBE_HOSTS:
+        if segments[:1] == ["watch"]:
+            candidate = parse_qs(parts.query).get("v", [None])[0]
+        elif len(segments) >= 2 and segments[0] in PATH_PREFIXES:
+            candidate = segments[1]
+
+    if candidate and VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+def canonical_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+def list_page_path(url):
+    # Playlist and channel links -> path of the page listing their videos;
+    # None for anything else, including a video opened from a playlist
+    # (/watch?v=ID&list=...), which stays a single video.
+    host, parts = split_url(url)
+    if host not in YOUTUBE_HOSTS:
+        return None
+    segments = [s for s in parts.path.split("/") if s]
+    if segments == ["playlist"]:
+        list_id = parse_qs(parts.query).get("list", [None])[0]
+        if list_id and PLAYLIST_ID_RE.match(list_id) and list_id not in PRIVATE_PLAYLISTS and not list_id.startswith("RD"):
+            return f"/playlist?list={list_id}"
+    elif segments and segments[0].startswith("@") and len(segments[0]) > 1:
+        return f"/{segments[0]}/videos"
+    elif len(segments) >= 2 and segments[0] == "channel" and CHANNEL_ID_RE.match(segments[1]):
+        return f"/channel/{segments[1]}/videos"
+    elif len(segments) >= 2 and segments[0] in ("c", "user"):
+        return f"/{segments[0]}/{segments[1]}/videos"
+    return None
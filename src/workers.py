@@ -1,21 +1,175 @@
 import time
-from pynput import mouse
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QObject, pyqtSignal
 
-class GlobalInputListener(QThread):
+DEBOUNCE = 0.4
+DEFAULT_TRIGGERS = "scroll:x+"
+MODIFIERS = {"ctrl", "shift", "alt", "cmd"}
+
+class Trigger:
+    __slots__ = ("kind", "axis", "sign", "modifiers", "hotkey")
+
+    def __init__(self, kind, axis=None, sign=0, modifiers=frozenset(), hotkey=None):
+        self.kind = kind
+        self.axis = axis
+        self.sign = sign
+        self.modifiers = modifiers
+        self.hotkey = hotkey
+
+def parse_trigger(text):
+    # "scroll:x+"              horizontal scroll right (the original gesture)
+    # "scroll:y-:ctrl+shift"   scroll down while Ctrl and Shift are held
+    # "hotkey:<ctrl>+<alt>+l"  a global hotkey, in pynput's syntax
+    kind, _, rest = text.strip().partition(":")
+    if kind == "hotkey" and rest:
+        return Trigger("hotkey", hotkey=rest)
+    if kind == "scroll":
+        gesture, _, modifiers = rest.partition(":")
+        modifiers = frozenset(m for m in modifiers.split("+") if m)
+        if len(gesture) == 2 and gesture[0] in "xy" and gesture[1] in "+-" and modifiers <= MODIFIERS:
+            return Trigger("scroll", gesture[0], 1 if gesture[1] == "+" else -1, modifiers)
+    raise ValueError(f"Invalid gesture trigger: {text!r}")
+
+def parse_triggers(spec):
+    # Triggers are separated by ";".
+    return [parse_trigger(part) for part in spec.split(";") if part.strip()]
+
+def modifier_name(key):
+    # pynput Key.ctrl_l / Key.alt_gr / ... -> "ctrl" / "alt"; None otherwise.
+    name = getattr(key, "name", None)
+    if not name:
+        return None
+    name = name.split("_")[0]
+    return name if name in MODIFIERS else None
+
+class GlobalInputListener(QObject):
+    # System-wide gestures that toggle the window. pynput calls the hooks on
+    # its own threads for every scroll tick in every application, so on_scroll
+    # only compares against precomputed triggers and reads the clock when one
+    # matches. The scroll hook can be removed entirely with pause(). Its only
+    # bookkeeping is one integer count per tick; summary() builds the rest.
     toggle_signal = pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, triggers=DEFAULT_TRIGGERS, debounce=DEBOUNCE):
         super().__init__()
-        self.last_action_time = 0 
+        self.triggers = parse_triggers(triggers) if isinstance(triggers, str) else list(triggers)
+        self.debounce = debounce
+        self.x_triggers = tuple((t.sign, t.modifiers) for t in self.triggers if t.kind == "scroll" and t.axis == "x")
+        self.y_triggers = tuple((t.sign, t.modifiers) for t in self.triggers if t.kind == "scroll" and t.axis == "y")
+        self.hotkeys = [t.hotkey for t in self.triggers if t.kind == "hotkey"]
+        self.needs_modifiers = any(modifiers for _, modifiers in self.x_triggers + self.y_triggers)
+        self.held = set()
+        self.last_fired = float("-inf")
+        self.started = time.monotonic()
+        self.events = self.matched = self.fired = 0
+
+        self.running = False
+        self.paused = False
+        self.mouse_listener = None
+        self.keyboard_listeners = []
+
+    def start(self):
+        # pynput needs a display server and raises here without one.
+        from pynput import keyboard
+        self.running = True
+        self.started = time.monotonic()
+        self.events = self.matched = self.fired = 0
+        if not self.paused:
+            self.start_mouse()
+        if self.needs_modifiers:
+            self.keyboard_listeners.append(keyboard.Listener(on_press=self.on_press, on_release=self.on_release))
+        if self.hotkeys:
+            self.keyboard_listeners.append(keyboard.GlobalHotKeys({hotkey: self.fire for hotkey in self.hotkeys}))
+        for listener in self.keyboard_listeners:
+            listener.start()
+
+    def start_mouse(self):
+        if (self.x_triggers or self.y_triggers) and self.mouse_listener is None:
+            from pynput import mouse
+            self.mouse_listener = mouse.Listener(on_scroll=self.on_scroll)
+            self.mouse_listener.start()
+
+    def pause(self):
+        # Unhooks scroll; hotkeys stay active since they cost nothing between
+        # key presses.
+        self.paused = True
+        if self.mouse_listener is not None:
+            self.mouse_listener.stop()
+            self.mouse_listener = None
+
+    def resume(self):
+        self.paused = False
+        if self.running:
+            self.start_mouse()
 
-    def run(self):
-        with mouse.Listener(on_scroll=self.on_scroll) as listener:
-            listener.join()
+    def stop(self):
+        self.pause()
+        for listener in self.keyboard_listeners:
+            listener.stop()
+        self.keyboard_listeners = []
+        self.running = False
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {"events": self.events, "matched": self.matched, "fired": self.fired,
+                "events_per_s": round(self.events / elapsed, 1)}
 
     def on_scroll(self, x, y, dx, dy):
-        if dx > 0:
-            current_time = time.time()
-            if current_time - self.last_action_time > 0.4:
-                self.toggle_signal.emit()
-                self.last_action_time = current_time
\ No newline at end of file
+        self.events += 1
+        # Most ticks are on an axis no trigger listens to and stop here.
+        if dx and self.x_triggers:
+            triggers, value = self.x_triggers, dx
+        elif dy and self.y_triggers:
+            triggers, value = self.y_triggers, dy
+        else:
+            return
+        for sign, modifiers in triggers:
+            if value * sign > 0 and modifiers <= self.held:
+                self.matched += 1
+                self.fire()
+                return
+
+    def fire(self):
+        now = time.monotonic()
+        if now - self.last_fired > self.debounce:
+            self.last_fired = now
+            self.fired += 1
+            self.toggle_signal.emit()
+
+    def on_press(self, key):
+        name = modifier_name(key)
+        if name:
+            self.held.add(name)
+
+    def on_release(self, key):
+        name = modifier_name(key)
+        if name:
+            self.held.discard(name)
+
+class SyntheticKey:
+    def __init__(self, name):
+        self.name = name
+
+class SyntheticInputDriver:
+    # Feeds events straight into a listener's hooks, with no input device or
+    # display server, to measure what the hooks cost per event.
+    def __init__(self, listener):
+        self.listener = listener
+
+    def scroll(self, dx=0, dy=0, count=1):
+        on_scroll = self.listener.on_scroll
+        for _ in range(count):
+            on_scroll(0, 0, dx, dy)
+
+    def press(self, name):
+        self.listener.on_press(SyntheticKey(name))
+
+    def release(self, name):
+        self.listener.on_release(SyntheticKey(name))
+
+    def measure(self, events):
+        # events: [(dx, dy), ...]; returns seconds per event.
+        on_scroll = self.listener.on_scroll
+        started = time.perf_counter()
+        for dx, dy in events:
+            on_scroll(0, 0, dx, dy)
+        return (time.perf_counter() - started) / max(len(events), 1)
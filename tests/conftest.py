@@ -0,0 +1,91 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import pytest
+
+class Reply:
+    # A body given as several parts has all but the first held back until
+    # the server's `release` is set, so a test can tell whether a client
+    # read past the first.
+    def __init__(self, body=b"", status=200, content_type="text/html; charset=utf-8"):
+        self.parts = [body] if isinstance(body, bytes) else list(body)
+        self.status = status
+        self.content_type = content_type
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.answer(None)
+
+    def do_POST(self):
+        self.answer(json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null"))
+
+    def answer(self, payload):
+        parts = urlsplit(self.path)
+        self.server.hits.append((self.command, parts.path, parts.query, payload))
+        replies = self.server.routes.get((self.command, parts.path))
+        if not replies:
+            reply = Reply(b"", status=404)
+        else:
+            # Replies are used up in turn and the last one repeats.
+            reply = replies.pop(0) if len(replies) > 1 else replies[0]
+            if callable(reply):
+                reply = reply(payload)
+        self.send_response(reply.status)
+        self.send_header("Content-Type", reply.content_type)
+        self.send_header("Content-Length", str(sum(len(part) for part in reply.parts)))
+        self.end_headers()
+        try:
+            for n, part in enumerate(reply.parts):
+                if n and not self.server.release.wait(5):
+                    self.close_connection = True
+                    return
+                self.wfile.write(part)
+                self.wfile.flush()
+                self.server.sent.append(part)
+        except OSError:
+            self.close_connection = True
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.routes = {}
+        self.hits = []
+        self.sent = []
+        self.release = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def serve(self, method, path, *replies):
+        # A reply is a Reply, or a function of the request's JSON payload
+        # that returns one.
+        self.routes[(method, path)] = list(replies)
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
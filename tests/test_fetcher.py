@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from conftest import Reply
+from src.fetcher import CHUNK_SIZE, FetchError, MetadataFetcher, TitleParser, _TitleFound
+
+PADDING = b"x" * (4 * CHUNK_SIZE)
+
+def fetcher_for(server, **kwargs):
+    # The server's host counts as YouTube's, so titles go through oEmbed.
+    kwargs = dict(dict(retries=2, backoff=0, host_interval=0, timeout=2, oembed_endpoint=server.url + "/oembed",
+                       oembed_hosts={"127.0.0.1"}), **kwargs)
+    return MetadataFetcher(**kwargs)
+
+def oembed(title):
+    return Reply(json.dumps({"title": title, "type": "video"}).encode(), content_type="application/json")
+
+def paths(server):
+    return [path for _, path, _, _ in server.hits]
+
+@pytest.fixture
+def fetch_title(stub_server):
+    fetchers = []
+    def fetch_title(url, **kwargs):
+        fetchers.append(fetcher_for(stub_server, **kwargs))
+        return fetchers[-1].fetch_title(url)
+    yield fetch_title
+    for fetcher in fetchers:
+        fetcher.shutdown()
+
+def test_oembed_title(stub_server, fetch_title):
+    stub_server.serve("GET", "/oembed", oembed("Never Gonna Give You Up"))
+    assert fetch_title(stub_server.url + "/watch?v=dQw4w9WgXcQ") == "Never Gonna Give You Up"
+    assert paths(stub_server) == ["/oembed"]
+    assert "url=http" in stub_server.hits[0][2]
+
+def test_page_title_when_oembed_has_none(stub_server, fetch_title):
+    # Private videos have no oEmbed entry; the page is read instead.
+    stub_server.serve("GET", "/oembed", Reply(b"Not Found", status=404))
+    stub_server.serve("GET", "/watch", Reply(b"<html><head><title>Page title - YouTube</title></head></html>"))
+    assert fetch_title(stub_server.url + "/watch?v=dQw4w9WgXcQ") == "Page title"
+    assert paths(stub_server) == ["/oembed", "/watch"]
+
+def test_page_read_stops_at_title(stub_server, fetch_title):
+    # The rest of the page is held back; reading it would time out.
+    head = b"<html><head><title>\n  Early   title\n</title>" + PADDING
+    stub_server.serve("GET", "/page", Reply([head, PADDING * 16]))
+    assert fetch_title(stub_server.url + "/page", oembed_hosts=()) == "Early title"
+    assert stub_server.sent == [head]
+
+def test_page_read_stops_at_og_title(stub_server, fetch_title):
+    head = b'<html><head><meta property="og:title" content="Open Graph title">' + PADDING
+    stub_server.serve("GET", "/page", Reply([head, b"<title>Later title</title>" + PADDING * 16]))
+    assert fetch_title(stub_server.url + "/page", oembed_hosts=()) == "Open Graph title"
+    assert stub_server.sent == [head]
+
+def test_page_without_title_falls_back_to_url(stub_server, fetch_title):
+    stub_server.serve("GET", "/page", Reply(b"<html><head></head><body>" + PADDING + b"<title>Too late</title>"))
+    assert fetch_title(stub_server.url + "/page", oembed_hosts=()) == stub_server.url + "/page"
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_retries_server_errors_and_rate_limits(stub_server, fetch_title, status):
+    stub_server.serve("GET", "/oembed", Reply(b"", status=status), Reply(b"", status=status), oembed("Third time"))
+    assert fetch_title(stub_server.url + "/watch?v=dQw4w9WgXcQ") == "Third time"
+    assert paths(stub_server) == ["/oembed"] * 3
+
+def test_gives_up_after_retries(stub_server, fetch_title):
+    stub_server.serve("GET", "/oembed", Reply(b"", status=503))
+    with pytest.raises(FetchError, match="HTTP 503"):
+        fetch_title(stub_server.url + "/watch?v=dQw4w9WgXcQ", retries=1)
+    assert paths(stub_server) == ["/oembed"] * 2
+
+@pytest.mark.parametrize("status", [400, 403, 404, 410])
+def test_no_retry_on_client_errors(stub_server, fetch_title, status):
+    stub_server.serve("GET", "/page", Reply(b"", status=status), Reply(b"<title>Second try</title>"))
+    with pytest.raises(FetchError, match=f"HTTP {status}"):
+        fetch_title(stub_server.url + "/page", oembed_hosts=())
+    assert paths(stub_server) == ["/page"]
+
+def test_title_parser_across_chunks():
+    parser = TitleParser()
+    parser.feed("<html><head><ti")
+    parser.feed("tle>Split ")
+    with pytest.raises(_TitleFound):
+        parser.feed("title</title><meta property='og:title' content='Ignored'>")
+    assert parser.title == "Split title"
+
+def test_title_parser_stops_at_body():
+    # No <title> or og:title before the body means there is none to find.
+    parser = TitleParser()
+    parser.feed("<html><head><title>   </title>")
+    with pytest.raises(_TitleFound):
+        parser.feed("<body><title>Not a title</title>")
+    assert parser.title is None
@@ -0,0 +1,110 @@
+import json
+import os
+from urllib.parse import parse_qs
+
+import pytest
+
+from conftest import Reply
+from src.fetcher import FetchError, MetadataFetcher
+from src.playlists import PlaylistExpander, client_state, initial_data, page_entries
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PLAYLIST_TOKENS = ["4qmFsgJhEiRWTFBMZml4dHVyZRoUQ0FGNkJsQkZPa05IUVNnQkNBRQ%3D%3D",
+                   "4qmFsgJhEiRWTFBMZml4dHVyZRoUQ0FKNkJsQkZPa05IUVNnQkNBSQ%3D%3D"]
+CHANNEL_TOKEN = "4qmFsgKrARIYVUNmaXh0dXJlGo4BOGdaZ0dsZ2FWZ3BTUTJkWlVVRTFTMFJJUkZaWlNFVldSVXRQZWc"
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+def serve_fixtures(server, pages, continuations):
+    # List pages by path and continuations by token, as YouTube would
+    # serve them; unknown tokens get a 400.
+    for path, name in pages.items():
+        server.serve("GET", path, Reply(fixture(name).encode()))
+    def browse(payload):
+        name = continuations.get(payload["continuation"])
+        if name is None:
+            return Reply(b"{}", status=400, content_type="application/json")
+        return Reply(fixture(name).encode(), content_type="application/json")
+    server.serve("POST", "/youtubei/v1/browse", browse)
+
+def expand(server, path, state=None, videos=()):
+    # The real MetadataFetcher, so the expander's own requests are tested.
+    fetcher = MetadataFetcher(retries=0, host_interval=0, timeout=2)
+    expander = PlaylistExpander(fetcher, base_url=server.url, browse_endpoint=server.url + "/youtubei/v1/browse")
+    pages, failures = [], []
+    expander.page_ready.connect(lambda expansion_id, entries, state: pages.append((entries, state)))
+    expander.expansion_failed.connect(lambda expansion_id, error: failures.append(error))
+    expander.run(1, path, state, videos)
+    expander.shutdown()
+    fetcher.shutdown()
+    return pages, failures
+
+def posts(server):
+    return [(parse_qs(query), payload) for method, _, query, payload in server.hits if method == "POST"]
+
+def test_playlist_page_in_page_order():
+    html = fixture("playlist_page.html")
+    entries, token = page_entries(initial_data(html))
+    # The header's play button also names a video; only list items count.
+    assert entries == [("dQw4w9WgXcQ", "First video"), ("9bZkp7q19f0", "Second video"),
+                       ("dQw4w9WgXcQ", "First video"), ("kJQP7kiw5Fk", "Third video")]
+    assert token == PLAYLIST_TOKENS[0]
+    assert client_state(html) == {"key": "AIzaSyFixtureKey0000000000000000000", "version": "2.20241008.01.00"}
+
+def test_continuation_pages():
+    entries, token = page_entries(json.loads(fixture("playlist_continuation_1.json")))
+    assert [video_id for video_id, _ in entries] == ["9bZkp7q19f0", "JGwWNGJdvx8", "OPf0YbXqDm0"]
+    assert token == PLAYLIST_TOKENS[1]
+    entries, token = page_entries(json.loads(fixture("playlist_continuation_2.json")))
+    assert entries == [("RgKAFK5djSk", "Sixth video"), ("fRh_vgS2dFE", "Seventh video")]
+    assert token is None
+
+def test_playlist_expands_in_order_without_duplicates(stub_server):
+    serve_fixtures(stub_server, {"/playlist": "playlist_page.html"},
+                   dict(zip(PLAYLIST_TOKENS, ["playlist_continuation_1.json", "playlist_continuation_2.json"])))
+    pages, failures = expand(stub_server, "/playlist?list=PLfixture")
+    assert failures == []
+    videos = [video_id for entries, _ in pages for video_id, _ in entries]
+    assert videos == ["dQw4w9WgXcQ", "9bZkp7q19f0", "kJQP7kiw5Fk", "JGwWNGJdvx8", "OPf0YbXqDm0", "RgKAFK5djSk", "fRh_vgS2dFE"]
+    # Each page but the last hands on what the next request needs.
+    states = [json.loads(state) if state else None for _, state in pages]
+    assert [state and state["continuation"] for state in states] == PLAYLIST_TOKENS + [None]
+    assert [payload["continuation"] for _, payload in posts(stub_server)] == PLAYLIST_TOKENS
+    assert all(params["key"] == ["AIzaSyFixtureKey0000000000000000000"] for params, _ in posts(stub_server))
+    assert all(payload["context"]["client"]["clientVersion"] == "2.20241008.01.00" for _, payload in posts(stub_server))
+
+def test_channel_videos_tab(stub_server):
+    serve_fixtures(stub_server, {"/@fixture/videos": "channel_videos.html"}, {CHANNEL_TOKEN: "channel_continuation_1.json"})
+    pages, failures = expand(stub_server, "/@fixture/videos")
+    assert failures == []
+    assert [entry for entries, _ in pages for entry in entries] == [
+        ("hT_nvWreIhg", "Channel video one"), ("CevxZvSJLk8", "Channel video two"),
+        ("YQHsXMglC9A", "Channel video three"), ("09R8_2nJtjg", "Channel video four")]
+
+def test_resume_from_saved_state(stub_server):
+    serve_fixtures(stub_server, {}, {PLAYLIST_TOKENS[1]: "playlist_continuation_2.json"})
+    state = json.dumps({"key": "k", "version": "2.20241008.01.00", "continuation": PLAYLIST_TOKENS[1]})
+    pages, failures = expand(stub_server, "/playlist?list=PLfixture", state)
+    assert failures == []
+    assert pages == [([("RgKAFK5djSk", "Sixth video"), ("fRh_vgS2dFE", "Seventh video")], "")]
+    # Nothing but the continuation is fetched again.
+    assert [(method, path) for method, path, _, _ in stub_server.hits] == [("POST", "/youtubei/v1/browse")]
+
+def test_resume_skips_videos_already_added(stub_server):
+    # The last page repeats a video the stored pages already delivered.
+    serve_fixtures(stub_server, {}, {PLAYLIST_TOKENS[1]: "playlist_continuation_2.json"})
+    state = json.dumps({"key": "k", "version": "2.20241008.01.00", "continuation": PLAYLIST_TOKENS[1]})
+    pages, failures = expand(stub_server, "/playlist?list=PLfixture", state, {"dQw4w9WgXcQ", "RgKAFK5djSk"})
+    assert pages == [([("fRh_vgS2dFE", "Seventh video")], "")]
+
+def test_rejected_continuation_fails_the_expansion(stub_server):
+    serve_fixtures(stub_server, {"/playlist": "playlist_page.html"}, {})
+    pages, failures = expand(stub_server, "/playlist?list=PLfixture")
+    assert len(pages) == 1
+    assert len(failures) == 1 and "HTTP 400" in failures[0]
+
+def test_page_without_initial_data():
+    with pytest.raises(FetchError):
+        initial_data("<html><body>Before you continue to YouTube</body></html>")
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from src.database import HOT_QUERIES
+from src.migrations import MIGRATIONS, migrate, query_plan, scans_table
+
+# The schema as the app created it before migrations existed.
+BASELINE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS videos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT,
+        title TEXT,
+        watched INTEGER DEFAULT 0,
+        tab_index INTEGER DEFAULT 0,
+        row_order INTEGER DEFAULT 0,
+        is_deleted INTEGER DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+"""
+ROWS = 2000
+
+def fill(conn):
+    # Tabs 0-4 (the old window showed 3 and up in the first), a tenth of
+    # the rows in HISTORY.
+    conn.executemany("INSERT INTO videos (url, title, watched, tab_index, row_order, is_deleted) VALUES (?, ?, ?, ?, ?, ?)",
+                     [(f"https://youtu.be/{n:011d}", f"Video {n}", n % 3 == 0, n % 5, n * 1024, n % 10 == 0)
+                      for n in range(ROWS)])
+
+def fresh_database(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrate(conn)
+    conn.execute("BEGIN")
+    fill(conn)
+    conn.execute("COMMIT")
+    return conn
+
+def baseline_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    fill(conn)
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrate(conn)
+    return conn
+
+@pytest.mark.parametrize("analyze", [False, True], ids=["no-stats", "analyzed"])
+@pytest.mark.parametrize("build", [fresh_database, baseline_database], ids=["fresh", "baseline"])
+def test_hot_queries_never_scan_videos(tmp_path, build, analyze):
+    conn = build(str(tmp_path / "lavida.db"))
+    if analyze:
+        conn.execute("ANALYZE")
+    plans = {name: query_plan(conn, sql, params) for name, (sql, params) in HOT_QUERIES.items()}
+    conn.close()
+    assert {name: plan for name, plan in plans.items() if scans_table(plan)} == {}
+
+def test_baseline_rows_survive_migration(tmp_path):
+    conn = baseline_database(str(tmp_path / "lavida.db"))
+    live, = conn.execute("SELECT COUNT(*) FROM videos WHERE is_deleted = 0").fetchone()
+    version, = conn.execute("PRAGMA user_version").fetchone()
+    conn.close()
+    assert live == ROWS - ROWS // 10
+    assert version == len(MIGRATIONS)
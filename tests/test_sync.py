@@ -0,0 +1,125 @@
+import gzip
+import json
+import sqlite3
+import time
+
+import pytest
+
+from src import journal
+from src.database import VideoRepository
+from src.migrations import migrate
+
+STATE_SQL = """
+    SELECT v.uid, v.url, v.title, v.watched, c.uid, v.row_order, v.is_deleted
+    FROM videos v LEFT JOIN collections c ON c.id = v.tab_index ORDER BY v.uid
+"""
+
+def tick():
+    # Edits on different machines are apart in time; keep their stamps so.
+    time.sleep(0.01)
+
+def sync(source, target, path):
+    source.flush()
+    journal.export_changes(source.conn, str(path))
+    return target.import_changes(str(path))
+
+def state(repo):
+    repo.flush()
+    return repo.query(STATE_SQL)
+
+@pytest.fixture
+def machines(tmp_path):
+    # Two databases sharing three videos, as if B had imported A's library.
+    a = VideoRepository(str(tmp_path / "a.db"))
+    b = VideoRepository(str(tmp_path / "b.db"))
+    a.insert_videos([(a.allocate_id(), f"https://youtu.be/{n:011d}", f"Video {n}", 0, n * 1024) for n in range(3)])
+    sync(a, b, tmp_path / "start.changes")
+    yield a, b
+    a.close()
+    b.close()
+
+def ids_by_url(repo):
+    return {url: vid_id for vid_id, url in repo.query("SELECT id, url FROM videos")}
+
+def test_concurrent_edits_converge(machines, tmp_path):
+    a, b = machines
+    assert state(a) == state(b)
+    a_ids, b_ids = ids_by_url(a), ids_by_url(b)
+    first, second, third = sorted(a_ids)
+
+    # Each field is written on both machines; the later write must win on both.
+    a.set_title(a_ids[first], "Title from A"); tick()
+    b.set_title(b_ids[first], "Title from B"); tick()
+    b.set_watched(b_ids[second], 1); tick()
+    a.set_watched(a_ids[second], 0); tick()
+    a.soft_delete(a_ids[third]); tick()
+    b.move_videos([(-5, b_ids[third])], 1); tick()
+    b.set_order(b_ids[first], 7); tick()
+    a.set_order(a_ids[first], 5)
+
+    sync(a, b, tmp_path / "a.changes")
+    sync(b, a, tmp_path / "b.changes")
+    assert state(a) == state(b)
+
+    rows = {url: (title, watched, collection, row_order, deleted) for _, url, title, watched, collection, row_order, deleted in state(a)}
+    assert rows[first] == ("Title from B", 0, "0", 5, 0)
+    assert rows[second][1] == 0
+    assert rows[third][2:] == ("1", -5, 0)
+
+    # Syncing again changes nothing on either side.
+    assert sync(a, b, tmp_path / "again.changes")["applied"] == 0
+    assert sync(b, a, tmp_path / "again.changes")["applied"] == 0
+    assert state(a) == state(b)
+
+def test_stale_change_is_skipped(machines, tmp_path):
+    a, b = machines
+    uid = a.query("SELECT uid FROM videos ORDER BY id LIMIT 1")[0][0]
+    url = a.query("SELECT url FROM videos WHERE uid = ?", (uid,))[0][0]
+    b.set_title(ids_by_url(b)[url], "Newer title")
+    b.flush()
+
+    path = tmp_path / "stale.changes"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": journal.FORMAT, "version": journal.VERSION, "origin": "c"}) + "\n")
+        f.write(json.dumps(["c", 1, uid, "title", {"title": "Older title"}, time.time() - 3600]) + "\n")
+    result = b.import_changes(str(path))
+    assert (result["applied"], result["skipped"]) == (0, 1)
+    assert b.query("SELECT title FROM videos WHERE uid = ?", (uid,))[0][0] == "Newer title"
+
+def test_equal_stamps_break_ties_by_origin(tmp_path):
+    # Same `at` from two machines: the greater origin wins, in either order.
+    at = time.time()
+    changes = [["m1", 1, "u", "insert", {"url": "https://youtu.be/00000000001", "title": "First", "tab": "0", "order": 0, "watched": 0}, at - 1],
+               ["m1", 2, "u", "title", {"title": "From m1"}, at],
+               ["m2", 1, "u", "title", {"title": "From m2"}, at]]
+    titles = []
+    for order in (changes, changes[:1] + changes[:0:-1]):
+        path = tmp_path / "tie.changes"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"format": journal.FORMAT, "version": journal.VERSION, "origin": "m1"}) + "\n")
+            for change in order:
+                f.write(json.dumps(change) + "\n")
+        conn = sqlite3.connect(str(tmp_path / f"tie{len(titles)}.db"), isolation_level=None)
+        migrate(conn)
+        journal.import_changes(conn, str(path))
+        titles.append(conn.execute("SELECT title FROM videos WHERE uid = 'u'").fetchone()[0])
+        conn.close()
+    assert titles == ["From m2", "From m2"]
+
+def test_undo_round_trips(machines, tmp_path):
+    # Undo of a batch that took one row out of HISTORY for good and sent a
+    # live one there: both go back where they were, on both machines.
+    a, b = machines
+    ids = ids_by_url(a)
+    first, second, _ = sorted(ids)
+    a.soft_delete(ids[first]); tick()
+    snapshot = a.snapshot([ids[first], ids[second]])
+    a.hard_delete(ids[first])
+    a.soft_delete(ids[second]); tick()
+    sync(a, b, tmp_path / "batch.changes")
+
+    a.restore_videos(snapshot)
+    sync(a, b, tmp_path / "undo.changes")
+    assert state(a) == state(b)
+    deleted = {url: is_deleted for _, url, _, _, _, _, is_deleted in state(b)}
+    assert (deleted[first], deleted[second]) == (1, 0)